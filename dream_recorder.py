@@ -8,13 +8,24 @@ import os
 import logging
 import gevent
 import io
+import re
+import time
+import mimetypes
 import argparse
 
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, Response, render_template, jsonify, request, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
 from flask_socketio import SocketIO, emit
 from functions.dream_db import DreamDB
-from functions.audio import create_wav_file, process_audio
-from functions.config_loader import load_config, get_config
+from functions.backgrounds import MANIFEST_FILENAME, backgrounds_dir, manifest_path
+from functions.video import raw_video_path, thumb_asset_filenames, thumb_assets
+from functions.audio import create_wav_file, decode_audio_chunk, StreamingTranscoder, create_dream_queue, create_veo_tracker, enqueue_recording
+from functions.recording_buffer import RecordingBuffer
+from functions.config_loader import ConfigError, load_config, get_config, subscribe, watch_config
+from functions.notification_outbox import NotificationOutbox
+from functions import metrics
+from functions.metrics import SOCKET_EVENTS, counted
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, get_config()["LOG_LEVEL"]))
@@ -35,16 +46,42 @@ recording_state = {
 
 # Video playback state
 video_playback_state = {
-    'current_index': 0,  # Index of the current video being played
+    'current_dream_id': None,  # ID of the dream currently playing
     'is_playing': False  # Whether a video is currently playing
 }
 
+# Dream library pagination
+DREAMS_PAGE_SIZE = 24
+MAX_DREAMS_PAGE_SIZE = 100
+
+# Media caching. Generated files are written once under a timestamped name and never change,
+# so browsers may keep them for a year without revalidating; anything else is revalidated by ETag.
+IMMUTABLE_MEDIA_PATTERN = re.compile(r'_\d{8}_\d{6}(_\w+)?\.\w+$')
+IMMUTABLE_MEDIA_MAX_AGE = 365 * 24 * 3600
+# Internal nginx locations used when MEDIA_SERVER is "nginx"
+X_ACCEL_MEDIA_PREFIX = '/internal/media/'
+X_ACCEL_THUMBS_PREFIX = '/internal/thumbs/'
+X_ACCEL_BACKGROUNDS_PREFIX = '/internal/backgrounds/'
+
 # Audio buffer for storing chunks
 audio_buffer = io.BytesIO()
 wav_file = None
 
-# List to store incoming audio chunks
-audio_chunks = []
+# Incoming audio chunks, kept in RAM up to RECORDING_MEMORY_LIMIT_MB and then on disk
+audio_chunks = RecordingBuffer()
+
+# ffmpeg decoder fed with chunks while recording
+transcoder = None
+
+# Stops a recording that runs past MAX_RECORDING_SECONDS
+recording_timer = None
+
+# Sequence tracking for numbered audio frames
+audio_stream_state = {
+    'next_seq': 0,  # Sequence number expected for the next chunk
+    'dropped': 0,   # Chunks skipped over by a gap in the sequence
+    'reordered': 0, # Chunks that arrived after a later one
+}
 
 # =============================
 # Flask App & Extensions Initialization
@@ -64,25 +101,96 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='gevent')
 # Initialize DreamDB
 dream_db = DreamDB()
 
+# Persistent job queue for the dream pipeline (workers start in the main block)
+veo_tracker = create_veo_tracker(socketio, logger)
+notification_outbox = NotificationOutbox(logger=logger)
+dream_queue = create_dream_queue(socketio, dream_db, recording_state, logger, veo_tracker=veo_tracker,
+                                 notification_outbox=notification_outbox)
+
+@subscribe
+def on_config_change(config, previous):
+    """Apply a changed config.json to the parts of the app that keep copies of its values."""
+    logging.getLogger().setLevel(getattr(logging, config["LOG_LEVEL"]))
+    notification_outbox.reload_notifiers(config)
+    socketio.emit('reload_config')
+
 # =============================
 # Core Logic / Helper Functions
 # =============================
 
-def initiate_recording():
+def initiate_recording(sid=None):
     """Handles the common state changes and buffer resets for starting recording."""
-    global audio_buffer, wav_file, audio_chunks
+    global audio_buffer, wav_file, audio_chunks, transcoder, recording_timer
     recording_state['is_recording'] = True
     recording_state['status'] = 'recording'
     recording_state['transcription'] = '' # Reset transcription
     recording_state['video_prompt'] = ''  # Reset video prompt
     # Reset audio storage
     audio_buffer = io.BytesIO() 
-    audio_chunks = []
+    audio_chunks = RecordingBuffer(
+        memory_limit=int(get_config().get('RECORDING_MEMORY_LIMIT_MB', 8)) * 1024 * 1024
+    )
+    audio_stream_state.update(next_seq=0, dropped=0, reordered=0)
     wav_file = None # Ensure wav_file is reset before creating a new one
     wav_file = create_wav_file(audio_buffer)
+    try:
+        transcoder = StreamingTranscoder(logger=logger)
+    except Exception as e:
+        transcoder = None
+        if logger:
+            logger.warning(f"Streaming transcode unavailable, will transcode after recording: {str(e)}")
+    cancel_recording_timer()
+    max_seconds = float(get_config().get('MAX_RECORDING_SECONDS', 900))
+    if max_seconds > 0:
+        recording_timer = gevent.spawn_later(max_seconds, stop_overlong_recording, sid, max_seconds)
     if logger:
         logger.debug("Initiated recording: state set, buffers reset, wav file created.")
 
+def cancel_recording_timer():
+    global recording_timer
+    if recording_timer is not None:
+        recording_timer.kill(block=False)
+        recording_timer = None
+
+def finish_recording(sid):
+    """Stop recording and queue what was recorded for the dream pipeline. Returns False if not recording."""
+    global transcoder
+    if not recording_state['is_recording']:
+        return False
+    cancel_recording_timer()
+    recording_state['is_recording'] = False
+    recording_state['status'] = 'processing'
+    if logger and (audio_stream_state['dropped'] or audio_stream_state['reordered']):
+        logger.warning(
+            f"Audio stream had {audio_stream_state['dropped']} dropped and "
+            f"{audio_stream_state['reordered']} reordered chunks"
+        )
+    if logger:
+        logger.info(
+            f"Finalizing recording: {audio_chunks.size} bytes in {len(audio_chunks)} chunks"
+            f"{' (spilled to disk)' if audio_chunks.spilled else ''}. Queueing dream pipeline for SID: {sid}"
+        )
+
+    # Finish the recording and queue the dream pipeline without blocking the socket handler
+    gevent.spawn(
+        enqueue_recording, dream_queue, sid, audio_chunks, transcoder, logger
+    )
+    transcoder = None
+    return True
+
+def stop_overlong_recording(sid, max_seconds):
+    """Stop a recording that reached MAX_RECORDING_SECONDS, whether or not the client is still sending."""
+    global recording_timer
+    # This greenlet is the timer; don't let finish_recording kill it
+    recording_timer = None
+    if finish_recording(sid):
+        if logger:
+            logger.warning(f"Recording reached the {max_seconds:.0f}s limit and was stopped")
+        # Tell the recording client to stop its recorder too; its stop_recording will then be ignored
+        if sid:
+            socketio.emit('recording_state', {'status': 'processing'}, room=sid)
+        socketio.emit('state_update', recording_state)
+
 def init_sample_dreams_if_missing():
     """Attempt to initialize sample dreams by running the init_sample_dreams script."""
     import subprocess
@@ -103,6 +211,7 @@ def init_sample_dreams_if_missing():
 # =============================
 
 @socketio.on('connect')
+@counted(SOCKET_EVENTS, event='connect')
 def handle_connect(auth=None):
     """Handle new client connection."""
     if logger:
@@ -110,16 +219,18 @@ def handle_connect(auth=None):
     emit('state_update', recording_state)
 
 @socketio.on('disconnect')
+@counted(SOCKET_EVENTS, event='disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
     if logger:
         logger.info('Client disconnected')
 
 @socketio.on('start_recording')
+@counted(SOCKET_EVENTS, event='start_recording')
 def handle_start_recording():
     """Socket event to start recording."""
     if not recording_state['is_recording']:
-        initiate_recording()
+        initiate_recording(request.sid)
         emit('state_update', recording_state)
         if logger:
             logger.info('Started recording via socket event')
@@ -128,36 +239,50 @@ def handle_start_recording():
             logger.warning('Start recording event received, but already recording.')
 
 @socketio.on('stream_recording')
+@counted(SOCKET_EVENTS, event='stream_recording')
 def handle_audio_data(data):
     """Handle incoming audio data chunks from the client during recording."""
+    global transcoder
     if recording_state['is_recording']:
         try:
-            # Convert the received data to bytes
-            audio_bytes = bytes(data['data'])
-            # Store the chunk
-            audio_chunks.append(audio_bytes)
+            # Binary attachment or legacy JSON int array
+            seq, audio_bytes = decode_audio_chunk(data)
+            if seq is None:
+                audio_chunks.append(audio_bytes)
+                if transcoder:
+                    transcoder.write(audio_bytes)
+                return
+            expected = audio_stream_state['next_seq']
+            if seq >= expected:
+                if seq > expected:
+                    audio_stream_state['dropped'] += seq - expected
+                    if logger:
+                        logger.warning(f"Audio chunk gap: expected seq {expected}, got {seq}")
+                audio_stream_state['next_seq'] = seq + 1
+                audio_chunks.append(audio_bytes, seq)
+                if transcoder:
+                    transcoder.write(audio_bytes)
+            else:
+                # A late chunk fills an earlier gap; keep the container bytes in order
+                audio_stream_state['reordered'] += 1
+                audio_stream_state['dropped'] = max(0, audio_stream_state['dropped'] - 1)
+                if logger:
+                    logger.warning(f"Audio chunk out of order: seq {seq} arrived after {expected - 1}")
+                audio_chunks.append(audio_bytes, seq)
+                # The decoder has already consumed later bytes; transcode after recording instead
+                if transcoder:
+                    transcoder.abort()
+                    transcoder = None
         except Exception as e:
             if logger:
                 logger.error(f"Error handling audio data: {str(e)}")
             emit('error', {'message': f"Error handling audio data: {str(e)}"})
 
 @socketio.on('stop_recording')
+@counted(SOCKET_EVENTS, event='stop_recording')
 def handle_stop_recording():
     """Socket event to stop recording and trigger processing."""
-    if recording_state['is_recording']:
-        sid = request.sid # Get SID before changing state
-
-        # Finalize the recording
-        recording_state['is_recording'] = False
-        recording_state['status'] = 'processing'
-        if logger:
-            logger.info(f"Finalizing recording. Status set to processing. Triggering process_audio for SID: {sid}")
-
-        # Process the audio in a background task, passing all required arguments
-        gevent.spawn(
-            process_audio, sid, socketio, dream_db, recording_state, audio_chunks, logger
-        )
-
+    if finish_recording(request.sid):
         # Emit the comprehensive state update after finalizing
         emit('state_update', recording_state)
         if logger:
@@ -167,42 +292,36 @@ def handle_stop_recording():
             logger.warning('Stop recording event received, but not currently recording.')
 
 @socketio.on('show_previous_dream')
+@counted(SOCKET_EVENTS, event='show_previous_dream')
 def handle_show_previous_dream():
     import time
     current_time = time.time()
     last_interaction = video_playback_state.get("last_interaction_time", 0)
     if current_time - last_interaction > 5:
         video_playback_state["is_playing"] = False
-        video_playback_state["current_index"] = 0
+        video_playback_state["current_dream_id"] = None
         if logger:
             logger.info("Auto-reset playback state due to timeout")
     video_playback_state["last_interaction_time"] = current_time
     """Socket event handler for showing previous dream."""
     try:
-        # Get the most recent dreams
-        dreams = dream_db.get_all_dreams()
-        if not dreams:
+        # If we're currently playing a video, show the next older one in the history,
+        # otherwise start with the most recent dream
+        current_id = video_playback_state['current_dream_id'] if video_playback_state['is_playing'] else None
+        dream = dream_db.get_previous_dream(current_id)
+        if not dream:
             if logger:
                 logger.warning("No dreams found to cycle through.")
             return None
-        # If we're currently playing a video, show the next one in sequence
-        if video_playback_state['is_playing']:
-            video_playback_state['current_index'] += 1
-            if video_playback_state['current_index'] >= len(dreams):
-                video_playback_state['current_index'] = 0  # Wrap around
-        else:
-            # If not playing, start with the most recent dream
-            video_playback_state['current_index'] = 0
-            video_playback_state['is_playing'] = True
-        # Get the dream at the current index
-        dream = dreams[video_playback_state['current_index']]
+        video_playback_state['current_dream_id'] = dream['id']
+        video_playback_state['is_playing'] = True
         # Emit the video URL to the client
         socketio.emit('play_video', {
             'video_url': f"/media/video/{dream['video_filename']}",
             'loop': True  # Enable looping for the video
         })
         if logger:
-            logger.info(f"Emitted play_video for dream index {video_playback_state['current_index']}: {dream['video_filename']}")
+            logger.info(f"Emitted play_video for dream {dream['id']}: {dream['video_filename']}")
 
         if not dream:
             socketio.emit('error', {'message': 'No dreams found'})
@@ -213,11 +332,12 @@ def handle_show_previous_dream():
 
 
 @socketio.on("reset_playback_state")
+@counted(SOCKET_EVENTS, event='reset_playback_state')
 def handle_reset_playback_state():
     """Reset video playback state to allow starting fresh."""
     global video_playback_state
     video_playback_state["is_playing"] = False
-    video_playback_state["current_index"] = 0
+    video_playback_state["current_dream_id"] = None
     if logger:
         logger.info("Playback state reset")
 
@@ -225,19 +345,31 @@ def handle_reset_playback_state():
 # Flask Route Handlers
 # =============================
 
+def with_thumb_assets(dreams):
+    """Add each dream's resized thumbnails and scrub strip, as `thumb_srcset`, `thumb_strip` and `thumb_strip_frames`."""
+    for dream in dreams:
+        assets = thumb_assets(dream.get('thumb_filename'))
+        dream['thumb_srcset'] = assets['srcset']
+        dream['thumb_strip'] = assets['strip']
+        dream['thumb_strip_frames'] = assets['strip_frames']
+    return dreams
+
 # -- Page Routes --
 @app.route('/')
 def index():
     """Serve the main HTML page."""
+    # Without a built manifest the client falls back to the full-size JPEGs
+    background_manifest = f"/backgrounds/{MANIFEST_FILENAME}" if os.path.exists(manifest_path()) else ''
     return render_template('index.html', 
                          is_development=app.config['DEBUG'],
-                         total_background_images=int(get_config()["TOTAL_BACKGROUND_IMAGES"]))
+                         total_background_images=int(get_config()["TOTAL_BACKGROUND_IMAGES"]),
+                         background_manifest=background_manifest)
 
 @app.route('/dreams')
 def dreams():
-    """Display the dreams library page."""
-    dreams = dream_db.get_all_dreams()
-    return render_template('dreams.html', dreams=dreams)
+    """Display the dreams library page. Further pages are loaded from /api/dreams on scroll."""
+    dreams, next_cursor = dream_db.get_dreams_page(limit=DREAMS_PAGE_SIZE)
+    return render_template('dreams.html', dreams=with_thumb_assets(dreams), next_cursor=next_cursor)
 
 # -- API Routes --
 @app.route('/api/config')
@@ -257,12 +389,19 @@ def api_get_config():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def emit_device_event(event_type):
+    """Notify all clients of a button event, logging its latency since the GPIO service detected it."""
+    detected_at = (request.get_json(silent=True) or {}).get('detected_at')
+    socketio.emit('device_event', {'eventType': event_type, 'detectedAt': detected_at})
+    if detected_at and logger:
+        logger.info(f"GPIO {event_type}: {(time.time() - float(detected_at)) * 1000:.1f} ms from detection to clients")
+
 @app.route('/api/gpio_single_tap', methods=['POST'])
 def gpio_single_tap():
     """API endpoint for single tap from GPIO controller."""
     try:
         # Notify all clients of a single tap event
-        socketio.emit('device_event', {'eventType': 'single_tap'})
+        emit_device_event('single_tap')
         return jsonify({'status': 'success'})
     except Exception as e:
         if logger:
@@ -274,7 +413,7 @@ def gpio_double_tap():
     """API endpoint for double tap from GPIO controller."""
     try:
         # Notify all clients of a double tap event
-        socketio.emit('device_event', {'eventType': 'double_tap'})
+        emit_device_event('double_tap')
         return jsonify({'status': 'success'})
     except Exception as e:
         if logger:
@@ -287,13 +426,38 @@ def gpio_long_tap():
     try:
         logger.info("Long tap received from GPIO")
         # Notify all clients of a long tap event
-        socketio.emit('device_event', {'eventType': 'long_tap'})
+        emit_device_event('long_tap')
         return jsonify({'status': 'success'})
     except Exception as e:
         if logger:
             logger.error(f"Error in API gpio_double_tap: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/dreams')
+def api_get_dreams():
+    """Get one page of dreams, newest first, for the library's infinite scroll."""
+    try:
+        limit = min(max(int(request.args.get('limit', DREAMS_PAGE_SIZE)), 1), MAX_DREAMS_PAGE_SIZE)
+        dreams, next_cursor = dream_db.get_dreams_page(limit=limit, before=request.args.get('before'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = {'dreams': with_thumb_assets(dreams), 'next_cursor': next_cursor}
+    if not request.args.get('before'):
+        response['total'] = dream_db.count_dreams()
+    return jsonify(response)
+
+@app.route('/api/dreams/search')
+def api_search_dreams():
+    """Search the dream prompts. Returns one page of matches, best first, with highlighted snippets."""
+    try:
+        limit = min(max(int(request.args.get('limit', DREAMS_PAGE_SIZE)), 1), MAX_DREAMS_PAGE_SIZE)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    dreams, total = dream_db.search_dreams(request.args.get('q', ''), limit=limit, offset=offset)
+    next_offset = offset + len(dreams) if offset + len(dreams) < total else None
+    return jsonify({'dreams': with_thumb_assets(dreams), 'total': total, 'next_offset': next_offset})
+
 @app.route('/api/dreams/<int:dream_id>', methods=['DELETE'])
 def delete_dream(dream_id):
     """Delete a dream and its associated files."""
@@ -302,6 +466,8 @@ def delete_dream(dream_id):
         dream = dream_db.get_dream(dream_id)
         if not dream:
             return jsonify({'success': False, 'message': 'Dream not found'}), 404
+        # Looked up first: deleting the dream also drops its reprocessing record
+        raw_filename = dream_db.raw_video_filename(dream)
         # Delete the dream from the database
         if dream_db.delete_dream(dream_id):
             # Delete associated files
@@ -310,10 +476,16 @@ def delete_dream(dream_id):
                 video_path = os.path.join(get_config()['VIDEOS_DIR'], dream['video_filename'])
                 if os.path.exists(video_path):
                     os.remove(video_path)
-                # Delete thumbnail file
-                thumb_path = os.path.join(get_config()['THUMBS_DIR'], dream['thumb_filename'])
-                if os.path.exists(thumb_path):
-                    os.remove(thumb_path)
+                # Delete the unfiltered download kept for reprocessing
+                raw_path = raw_video_path(raw_filename)
+                if raw_path and os.path.exists(raw_path):
+                    os.remove(raw_path)
+                # Delete thumbnail file and its resized copies
+                if dream['thumb_filename']:
+                    for thumb_name in [dream['thumb_filename']] + thumb_asset_filenames(dream['thumb_filename']):
+                        thumb_path = os.path.join(get_config()['THUMBS_DIR'], thumb_name)
+                        if os.path.exists(thumb_path):
+                            os.remove(thumb_path)
                 # Delete audio file
                 audio_path = os.path.join(get_config()['RECORDINGS_DIR'], dream['audio_filename'])
                 if os.path.exists(audio_path):
@@ -340,26 +512,78 @@ def clock_config_path():
 
 @app.route('/api/notify_config_reload', methods=['POST'])
 def notify_config_reload():
-    """Notify all clients to reload config."""
-    load_config()
-    socketio.emit('reload_config')
+    """Reload config.json and notify all clients to reload config.
+
+    Rarely needed now that config.json is watched, but kept for scripts that poke it.
+    """
+    previous = get_config()
+    try:
+        config = load_config()
+    except ConfigError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if dict(config) == dict(previous):
+        # on_config_change only runs for real changes; the caller still asked for a reload
+        socketio.emit('reload_config')
     return jsonify({'status': 'reload event emitted'})
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose pipeline, Socket.IO and database timings in the Prometheus text format."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 # -- Media Routes --
+def send_media(directory, filename, accel_prefix, immutable=None):
+    """Send a file from `directory` with range, ETag and cache headers, or hand it to nginx.
+
+    `immutable` defaults to whether the filename is timestamped. Raises NotFound
+    if the file does not exist or lies outside `directory`.
+    """
+    if immutable is None:
+        immutable = IMMUTABLE_MEDIA_PATTERN.search(filename) is not None
+    max_age = IMMUTABLE_MEDIA_MAX_AGE if immutable else 0
+    if get_config().get('MEDIA_SERVER', 'flask') == 'nginx':
+        path = safe_join(os.path.join(app.root_path, directory), filename)
+        if path is None or not os.path.isfile(path):
+            raise NotFound()
+        # nginx answers ranges and conditional requests from the internal location
+        response = Response(status=200)
+        response.headers['X-Accel-Redirect'] = accel_prefix + filename
+        response.content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    else:
+        response = send_from_directory(directory, filename, conditional=True, etag=True, max_age=max_age)
+        # Werkzeug only sets this on 206 replies; players look for it on the first 200 to enable seeking
+        response.accept_ranges = 'bytes'
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
 @app.route('/media/<path:filename>')
 def serve_media(filename):
     """Serve media files (audio and video) from the media directory."""
     try:
-        return send_file(os.path.join('media', filename))
-    except FileNotFoundError:
+        return send_media('media', filename, X_ACCEL_MEDIA_PREFIX)
+    except NotFound:
+        return "File not found", 404
+
+@app.route('/backgrounds/<path:filename>')
+def serve_background(filename):
+    """Serve built background images, named by content hash, and their manifest."""
+    try:
+        return send_media(backgrounds_dir(), filename, X_ACCEL_BACKGROUNDS_PREFIX,
+                          immutable=filename != MANIFEST_FILENAME)
+    except NotFound:
         return "File not found", 404
 
 @app.route('/media/thumbs/<path:filename>')
 def serve_thumbnail(filename):
     """Serve thumbnail files from the thumbs directory."""
     try:
-        return send_file(os.path.join(get_config()['THUMBS_DIR'], filename))
-    except FileNotFoundError:
+        return send_media(get_config()['THUMBS_DIR'], filename, X_ACCEL_THUMBS_PREFIX)
+    except NotFound:
         return "Thumbnail not found", 404
 
 # =============================
@@ -371,6 +595,13 @@ if __name__ == '__main__':  # pragma: no cover
     parser = argparse.ArgumentParser()
     parser.add_argument('--reload', action='store_true', help='Enable auto-reloader')
     args = parser.parse_args()
+    # Start the pipeline workers and resume any jobs and VEO 3 operations interrupted by a restart
+    veo_tracker.start()
+    notification_outbox.start()
+    gevent.spawn(watch_config)
+    # Fill in columns added by schema migrations for older dreams, a batch at a time
+    gevent.spawn(dream_db.run_backfills)
+    dream_queue.start()
     # Start the Flask-SocketIO server
     socketio.run(
         app, 
@@ -0,0 +1,107 @@
+import json
+import time
+import hashlib
+from functions.config_loader import get_config
+from functions.dream_db import get_connection_pool
+from functions.metrics import API_CACHE_REQUESTS
+
+class ApiCache:
+    """A persistent least-recently-used cache for Whisper and GPT results.
+
+    Entries are keyed by a hash of everything that determines the result (the
+    audio bytes, or the transcription plus the GPT settings), so a retried or
+    reprocessed dream reuses earlier results. Once the cache holds more than
+    API_CACHE_MAX_ENTRIES, the least recently used entries are dropped, and
+    entries older than API_CACHE_TTL_DAYS are treated as misses.
+    """
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = get_config()['DB_PATH']
+        self.db_path = db_path
+        self._pool = get_connection_pool(db_path)
+        self._init_db()
+
+    def _init_db(self):
+        """Create the api_cache table if it doesn't exist."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS api_cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_api_cache_last_used ON api_cache (last_used)')
+
+    @staticmethod
+    def make_key(kind, *parts):
+        """Hash `parts` (bytes, or anything JSON-serialisable) into a cache key for `kind`."""
+        digest = hashlib.sha256(kind.encode())
+        for part in parts:
+            data = part if isinstance(part, bytes) else json.dumps(part, sort_keys=True).encode()
+            # Length-prefix each part so ('ab', 'c') and ('a', 'bc') hash differently
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return f"{kind}:{digest.hexdigest()}"
+
+    def get(self, kind, key):
+        """Return the cached value for `key`, or None, and count the hit or miss."""
+        ttl_days = float(get_config().get('API_CACHE_TTL_DAYS', 30))
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            if ttl_days > 0:
+                # An expired entry is dropped here and recomputed by the caller
+                cursor.execute(
+                    "DELETE FROM api_cache WHERE key = ? AND created_at < datetime('now', ?)",
+                    (key, f'-{ttl_days} days')
+                )
+            cursor.execute('SELECT value FROM api_cache WHERE key = ?', (key,))
+            row = cursor.fetchone()
+            if row is not None:
+                cursor.execute('UPDATE api_cache SET last_used = ? WHERE key = ?', (time.time(), key))
+        API_CACHE_REQUESTS.inc(kind=kind, result='hit' if row is not None else 'miss')
+        return json.loads(row['value']) if row is not None else None
+
+    def put(self, kind, key, value):
+        """Store `value` (JSON-serialisable) under `key`, evicting the oldest entries past the limit."""
+        max_entries = int(get_config().get('API_CACHE_MAX_ENTRIES', 500))
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT OR REPLACE INTO api_cache (key, kind, value, last_used) VALUES (?, ?, ?, ?)',
+                (key, kind, json.dumps(value), time.time())
+            )
+            cursor.execute(
+                'DELETE FROM api_cache WHERE key IN '
+                '(SELECT key FROM api_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (max_entries,)
+            )
+
+    def get_or_compute(self, kind, key, compute):
+        """Return the cached value for `key`, or call `compute()` and cache its result unless it is None."""
+        if int(get_config().get('API_CACHE_MAX_ENTRIES', 500)) <= 0:
+            return compute()
+        value = self.get(kind, key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(kind, key, value)
+        return value
+
+    def clear(self):
+        """Remove every entry."""
+        with self._pool.connection() as conn:
+            conn.execute('DELETE FROM api_cache')
+
+_cache = None
+
+def get_api_cache():
+    """Return the shared ApiCache for the configured database."""
+    global _cache
+    if _cache is None:
+        _cache = ApiCache()
+    return _cache
@@ -1,20 +1,64 @@
-import wave
+import io
 import os
-import tempfile
+import subprocess
+import threading
+import time
+import functools
 import ffmpeg
 import wave
 
 from datetime import datetime
-from functions.video import generate_video
-from functions.config_loader import get_config
-from openai import OpenAI
-from functions.email_notifier import EmailNotifier
+from functions.video import request_video, process_video_and_thumbnail, process_thumbnail, video_metadata, available_encoders
+from functions.config_loader import get_config, subscribe
+from functions.job_queue import JobQueue, PermanentJobError
+from functions.api_cache import ApiCache, get_api_cache
+from functions.veo_tracker import VeoOperationTracker
+from functions.metrics import STEP_SECONDS
+
+_openai_client = None
+
+# Config keys that change what trimmed_upload sends, and so the transcription cache key
+VAD_SETTINGS = ('VAD_ENABLED', 'VAD_PADDING_SECONDS', 'VAD_MAX_GAP_SECONDS')
+# Upload the original unless trimming keeps less than this fraction of the recording
+MIN_TRIM_RATIO = 0.9
+TRIMMED_UPLOAD_BITRATE = '24k'
+# Voice activity detection reads archived recordings decoded to PCM at this rate
+ANALYSIS_SAMPLE_RATE = 16000
+
+# Formats recordings can be archived in under RECORDINGS_DIR, as ffmpeg.output()
+# arguments. Opus goes in .ogg, which browsers and mimetypes both know.
+ARCHIVE_FORMATS = {
+    'opus': {'extension': 'ogg', 'acodec': 'libopus', 'application': 'voip'},
+    'flac': {'extension': 'flac', 'acodec': 'flac', 'sample_fmt': 's16', 'compression_level': 8},
+    'wav': {'extension': 'wav', 'acodec': 'pcm_s16le'},
+}
+# Lossless and built into every ffmpeg, so it stands in when Opus isn't available
+FALLBACK_ARCHIVE_FORMAT = 'flac'
 
-# Initialize OpenAI client
-client = OpenAI(
-    api_key=get_config()["OPENAI_API_KEY"],
-    http_client=None
-)
+class NoSpeechError(PermanentJobError, ValueError):
+    """The recording holds no speech; transcribing it again won't change that."""
+
+def get_openai_client():
+    """Return the shared OpenAI client, creating it on first use.
+
+    The openai package takes a few hundred milliseconds to import, so it is
+    only loaded once a recording needs transcribing.
+    """
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+        _openai_client = OpenAI(
+            api_key=get_config()["OPENAI_API_KEY"],
+            http_client=None
+        )
+    return _openai_client
+
+@subscribe
+def _drop_openai_client(config, previous):
+    """Recreate the client with the new key if OPENAI_API_KEY changed."""
+    global _openai_client
+    if config.get('OPENAI_API_KEY') != previous.get('OPENAI_API_KEY'):
+        _openai_client = None
 
 def create_wav_file(audio_buffer):
     """Create a new WAV file in the audio buffer with the correct format."""
@@ -24,35 +68,109 @@ def create_wav_file(audio_buffer):
     wav_file.setframerate(int(get_config()['AUDIO_FRAME_RATE']))
     return wav_file
 
-def save_wav_file(audio_data, filename=None, logger=None):
-    """Save the WAV file locally for debugging. Converts WebM to WAV using ffmpeg."""
+def decode_audio_chunk(data):
+    """Decode a `stream_recording` payload into (seq, audio_bytes).
+
+    Binary frames arrive as a Socket.IO attachment (bytes). Older clients send
+    the chunk as a JSON array of ints, which is still accepted as a fallback.
+    `seq` is None when the client does not number its chunks.
+    """
+    chunk = data['data']
+    # bytes attachments are used as-is; JSON int arrays need rebuilding
+    audio_bytes = chunk if isinstance(chunk, bytes) else bytes(chunk)
+    seq = data.get('seq')
+    return (int(seq) if seq is not None else None), audio_bytes
+
+def archive_format(name=None):
+    """The archive format to record in: `name` or AUDIO_ARCHIVE_FORMAT, if ffmpeg can encode it.
+
+    An unknown name (the config loader has already warned about it) falls back
+    to FALLBACK_ARCHIVE_FORMAT rather than failing every recording.
+    """
+    if name is None:
+        name = get_config().get('AUDIO_ARCHIVE_FORMAT', 'opus')
+    settings = ARCHIVE_FORMATS.get(name)
+    if settings is None:
+        return FALLBACK_ARCHIVE_FORMAT
+    encoders = available_encoders('A')
+    if encoders and settings['acodec'] not in encoders:
+        return FALLBACK_ARCHIVE_FORMAT
+    return name
+
+def recording_filename(fmt=None):
+    """A new timestamped filename for a recording in the archive format."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"recording_{timestamp}.{ARCHIVE_FORMATS[archive_format(fmt)]['extension']}"
+
+def format_of(filename):
+    """The archive format a recording was saved in, from its extension."""
+    extension = os.path.splitext(filename)[1][1:].lower()
+    for name, settings in ARCHIVE_FORMATS.items():
+        if settings['extension'] == extension:
+            return name
+    raise ValueError(f"Not an archived recording: {filename}")
+
+def archive_output(stream, path, fmt=None, metadata=None):
+    """ffmpeg output writing `stream` to `path` as a mono speech-rate archive in `fmt`.
+
+    `metadata` is a dict of tags (dream_id, title, ...) to store in the file.
+    """
+    config = get_config()
+    settings = dict(ARCHIVE_FORMATS[archive_format(fmt)])
+    del settings['extension']
+    if settings['acodec'] == 'libopus':
+        settings['audio_bitrate'] = config.get('AUDIO_ARCHIVE_BITRATE', '24k')
+    for n, (key, value) in enumerate((metadata or {}).items()):
+        settings[f'metadata:g:{n}'] = f'{key}={value}'
+    return ffmpeg.output(stream, path, ac=1, ar=int(config.get('AUDIO_ARCHIVE_SAMPLE_RATE', 16000)), **settings)
+
+def recording_tags(dream_id, recorded_at=None):
+    """Metadata tags that tie an archived recording to its dream."""
+    return {
+        'dream_id': dream_id,
+        'title': f'Dream {dream_id}',
+        'date': (recorded_at or datetime.now()).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+def tag_recording(path, tags, logger=None):
+    """Rewrite the tags of an archived recording without re-encoding it. Returns True on success."""
+    root, extension = os.path.splitext(path)
+    temp_path = f'{root}.tagging{extension}'
+    stream = ffmpeg.input(path)
+    settings = {f'metadata:g:{n}': f'{key}={value}' for n, (key, value) in enumerate(tags.items())}
+    try:
+        ffmpeg.run(ffmpeg.output(stream, temp_path, acodec='copy', **settings),
+                   overwrite_output=True, capture_stdout=True, capture_stderr=True)
+        os.replace(temp_path, path)
+        return True
+    except (ffmpeg.Error, OSError) as e:
+        if logger:
+            detail = e.stderr.decode(errors='replace').strip() if isinstance(e, ffmpeg.Error) else str(e)
+            logger.warning(f"Could not tag {path}: {detail}")
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        return False
+
+def save_recording(webm_path, filename=None, logger=None):
+    """Convert a whole WebM recording to the archive format in RECORDINGS_DIR. Returns the filename."""
     if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"recording_{timestamp}.wav"
+        filename = recording_filename()
     # Ensure the recordings directory exists
     os.makedirs(get_config()['RECORDINGS_DIR'], exist_ok=True)
     filepath = os.path.join(get_config()['RECORDINGS_DIR'], filename)
-    # Create a temporary file for the WebM data
-    with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as temp_webm:
-        temp_webm.write(audio_data)
-        temp_webm_path = temp_webm.name
-    try:
-        # Convert WebM to WAV using ffmpeg
-        stream = ffmpeg.input(temp_webm_path)
-        stream = ffmpeg.output(stream, filepath, acodec='pcm_s16le', ac=1, ar=44100)
+    stream = ffmpeg.input(webm_path)
+    stream = archive_output(stream, filepath, format_of(filename))
+    with STEP_SECONDS.time(step='audio_archive'):
         ffmpeg.run(stream, overwrite_output=True, quiet=True)
-        logger.info(f"Saved WAV file to {filepath}")
-        return filename
-    finally:
-        # Clean up temporary file
-        try:
-            os.unlink(temp_webm_path)
-        except:
-            pass
+    if logger:
+        logger.info(f"Saved recording to {filepath}")
+    return filename
 
     """Generate an enhanced video prompt from the transcription using GPT."""
     try:
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model=get_config()['GPT_MODEL'],
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -67,101 +185,394 @@ def save_wav_file(audio_data, filename=None, logger=None):
             logger.error(f"Error generating video prompt: {str(e)}")
         return None
 
-def process_audio(sid, socketio, dream_db, recording_state, audio_chunks, logger = None):
-    """Process the recorded audio and generate video, then update state and emit events."""
-    try:
-        audio_data = b''.join(audio_chunks)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        wav_filename = f"recording_{timestamp}.wav"
-        wav_filename = save_wav_file(audio_data, wav_filename, logger)
-        # Create a temporary file for the audio
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_file.write(audio_data)
-            temp_file_path = temp_file.name
-        # Transcribe the audio using OpenAI's Whisper API
-        with open(temp_file_path, 'rb') as audio_file:
-            transcription = client.audio.transcriptions.create(
-                model=get_config()['WHISPER_MODEL'],
-                file=audio_file
-            )
-        # Update the transcription in the global state
-        recording_state['transcription'] = transcription.text
-        # Emit the transcription
-        if sid:
-            socketio.emit('transcription_update', {'text': transcription.text}, room=sid)
-        else:
-            socketio.emit('transcription_update', {'text': transcription.text})
-        # Generate video prompt
-        video_prompt = generate_video_prompt(transcription=transcription.text, logger=logger, config=get_config())
-        if not video_prompt:
-            raise Exception("Failed to generate video prompt")
-        recording_state['video_prompt'] = video_prompt
-        if sid:
-            socketio.emit('video_prompt_update', {'text': video_prompt}, room=sid)
-        else:
-            socketio.emit('video_prompt_update', {'text': video_prompt})
-        # Generate video
-        video_filename, thumb_filename = generate_video(prompt=video_prompt, logger=logger)
-        # Save to database
-        DreamData = None
+class StreamingTranscoder:
+    """Transcode WebM/Opus chunks to the archive format with a long-lived ffmpeg process while recording.
+
+    Chunks are piped to ffmpeg as they arrive, so by the time recording stops the
+    file in RECORDINGS_DIR is already written and `finish` only has to flush it.
+    """
+
+    def __init__(self, filename=None, logger=None):
+        if filename is None:
+            filename = recording_filename()
+        self.filename = filename
+        self.logger = logger
+        self.failed = False
+        # A write blocked on a full pipe must finish before `finish` closes it
+        self._lock = threading.Lock()
+        os.makedirs(get_config()['RECORDINGS_DIR'], exist_ok=True)
+        self.filepath = os.path.join(get_config()['RECORDINGS_DIR'], filename)
+        stream = ffmpeg.input('pipe:0')
+        stream = archive_output(stream, self.filepath, format_of(filename))
+        stream = stream.global_args('-loglevel', 'error', '-nostats')
+        args = ffmpeg.compile(stream, overwrite_output=True)
+        # Only errors go to stderr, so the pipe cannot fill up on a long recording
+        self.process = subprocess.Popen(
+            args, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        if logger:
+            logger.debug(f"Started streaming transcode to {self.filepath}")
+
+    def write(self, chunk):
+        """Feed one encoded chunk to the decoder."""
+        with self._lock:
+            if self.failed or self.process.stdin.closed:
+                return
+            try:
+                self.process.stdin.write(chunk)
+            except (BrokenPipeError, OSError, ValueError) as e:
+                self.failed = True
+                if self.logger:
+                    self.logger.warning(f"Streaming transcode stopped accepting audio: {str(e)}")
+
+    def finish(self, timeout=30):
+        """Close the input and wait for the recording. Returns the filename, or None on failure."""
+        with self._lock:
+            try:
+                self.process.stdin.close()
+            except (BrokenPipeError, OSError):
+                self.failed = True
         try:
-            from functions.dream_db import DreamData
-        except ImportError:
+            with STEP_SECONDS.time(step='audio_finalize'):
+                self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.failed = True
+        stderr = self.process.stderr.read().decode(errors='replace') if self.process.stderr else ''
+        if self.failed or self.process.returncode != 0:
+            if self.logger:
+                self.logger.warning(f"Streaming transcode failed: {stderr.strip()}")
+            self._remove_output()
+            return None
+        if self.logger:
+            self.logger.info(f"Saved recording to {self.filepath}")
+        return self.filename
+
+    def abort(self):
+        """Stop the decoder and discard any partial output."""
+        self.failed = True
+        try:
+            self.process.kill()
+            self.process.wait()
+        except OSError:
             pass
-        dream_data = DreamData(
-            user_prompt=recording_state['transcription'],
-            generated_prompt=recording_state['video_prompt'],
-            audio_filename=wav_filename,
-            video_filename=video_filename,
-            thumb_filename=thumb_filename,
-            status='completed',
+        self._remove_output()
+
+    def _remove_output(self):
+        try:
+            os.unlink(self.filepath)
+        except OSError:
+            pass
+
+def _emit(socketio, event, data, sid=None):
+    """Emit to the recording client if known, otherwise broadcast."""
+    if sid:
+        socketio.emit(event, data, room=sid)
+    else:
+        socketio.emit(event, data)
+
+def ingest_recording(audio_chunks, transcoder=None, logger=None):
+    """Finish the archived recording and spool the WebM to JOBS_DIR so the pipeline can resume from disk.
+
+    `audio_chunks` is the RecordingBuffer the chunks were collected in; it is
+    written out chunk by chunk and closed. Returns the initial pipeline payload.
+    """
+    audio_filename = transcoder.finish() if transcoder else None
+    filename = audio_filename or recording_filename()
+    jobs_dir = get_config().get('JOBS_DIR', 'media/jobs')
+    os.makedirs(jobs_dir, exist_ok=True)
+    audio_path = os.path.join(jobs_dir, os.path.splitext(filename)[0] + '.webm')
+    try:
+        with open(audio_path, 'wb') as f:
+            audio_chunks.write_to(f)
+    finally:
+        audio_chunks.close()
+    if audio_filename is None:
+        # Without a streaming transcode, convert the spooled WebM
+        audio_filename = save_recording(audio_path, filename, logger)
+    return {'audio_path': audio_path, 'audio_filename': audio_filename}
+
+def _audio_filename(payload):
+    # Jobs persisted before recordings were compressed name the file `wav_filename`
+    return payload.get('audio_filename') or payload['wav_filename']
+
+def analysis_source(path):
+    """`path` as something the wave module can read: WAV recordings as they are,
+    compressed ones decoded in memory to 16-bit mono PCM at ANALYSIS_SAMPLE_RATE."""
+    if format_of(path) == 'wav':
+        return path
+    stream = ffmpeg.output(ffmpeg.input(path), 'pipe:1', f='s16le', acodec='pcm_s16le', ac=1, ar=ANALYSIS_SAMPLE_RATE)
+    pcm, _ = ffmpeg.run(stream, capture_stdout=True, capture_stderr=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(ANALYSIS_SAMPLE_RATE)
+        wav.writeframes(pcm)
+    return buffer
+
+# =============================
+# Dream pipeline stages
+# =============================
+# Each stage takes the payload produced by the previous one plus a context dict
+# (socketio, dream_db, recording_state, logger) and returns the updated payload.
+# Payloads are plain JSON so the job queue can persist them between stages.
+
+def trimmed_upload(payload, logger=None):
+    """Cut the silence out of the archived recording and encode what's left for Whisper.
+
+    Returns (filename, bytes) to upload, or None to upload the spooled WebM
+    as it is: when trimming is disabled, the recording can't be read, or trimming
+    would save little. Raises ValueError if the recording holds no speech.
+    """
+    config = get_config()
+    if not config.get('VAD_ENABLED', True):
+        return None
+    # Imported here so numpy isn't loaded at startup
+    from functions.vad import analyse_wav, read_ranges
+    recording_path = os.path.join(config['RECORDINGS_DIR'], _audio_filename(payload))
+    try:
+        with STEP_SECONDS.time(step='vad'):
+            source = analysis_source(recording_path)
+            analysis = analyse_wav(
+                source,
+                padding=float(config.get('VAD_PADDING_SECONDS', 0.3)),
+                max_gap=float(config.get('VAD_MAX_GAP_SECONDS', 1.5)),
+            )
+    except ffmpeg.Error as e:
+        if logger:
+            logger.warning(f"Voice activity detection skipped, could not decode {recording_path}: "
+                           f"{e.stderr.decode(errors='replace').strip()}")
+        return None
+    except (OSError, EOFError, ValueError, wave.Error) as e:
+        if logger:
+            logger.warning(f"Voice activity detection skipped for {recording_path}: {str(e)}")
+        return None
+    if logger:
+        logger.info(
+            f"Voice activity: {analysis['speech_seconds']:.1f}s of speech in {analysis['duration']:.1f}s, "
+            f"keeping {analysis['kept_seconds']:.1f}s"
         )
-        dream_db.save_dream(dream_data.model_dump())
-        
-        # Send email notification for new dream
+    if analysis['speech_seconds'] < float(config.get('VAD_MIN_SPEECH_SECONDS', 0.5)):
+        raise NoSpeechError("No speech detected in the recording")
+    if analysis['kept_seconds'] > analysis['duration'] * MIN_TRIM_RATIO:
+        return None
+    pcm = read_ranges(source, analysis['ranges'])
+    # Opus at speech bitrate: smaller than the browser's WebM for the same audio
+    stream = ffmpeg.input('pipe:0', f='s16le', ar=analysis['sample_rate'], ac=analysis['channels'])
+    stream = ffmpeg.output(stream, 'pipe:1', f='ogg', acodec='libopus', ac=1, ar=16000,
+                           audio_bitrate=TRIMMED_UPLOAD_BITRATE, application='voip')
+    try:
+        with STEP_SECONDS.time(step='vad_encode'):
+            data, _ = ffmpeg.run(stream, input=pcm, capture_stdout=True, capture_stderr=True)
+    except ffmpeg.Error as e:
+        if logger:
+            logger.warning(f"Could not encode trimmed audio, uploading the original: {e.stderr.decode(errors='replace').strip()}")
+        return None
+    return 'recording.ogg', data
+
+def transcribe_stage(payload, ctx):
+    """Transcribe the spooled recording with OpenAI's Whisper API, with its silence trimmed."""
+    logger = ctx['logger']
+    with open(payload['audio_path'], 'rb') as f:
+        audio_data = f.read()
+    model = get_config()['WHISPER_MODEL']
+    vad_settings = [get_config().get(name) for name in VAD_SETTINGS]
+
+    def transcribe():
+        upload = trimmed_upload(payload, logger) or ('recording.webm', audio_data)
+        if logger:
+            logger.info(f"Uploading {len(upload[1])} bytes to Whisper (recording is {len(audio_data)} bytes)")
+        with STEP_SECONDS.time(step='whisper'):
+            return get_openai_client().audio.transcriptions.create(model=model, file=upload).text
+
+    key = ApiCache.make_key('transcription', audio_data, model, vad_settings)
+    text = get_api_cache().get_or_compute('transcription', key, transcribe)
+    ctx['recording_state']['transcription'] = text
+    _emit(ctx['socketio'], 'transcription_update', {'text': text}, payload.get('sid'))
+    payload['transcription'] = text
+    return payload
+
+def prompt_stage(payload, ctx):
+    """Turn the transcription into a video prompt with GPT."""
+    video_prompt = generate_video_prompt(transcription=payload['transcription'], logger=ctx['logger'], config=get_config())
+    if not video_prompt:
+        raise Exception("Failed to generate video prompt")
+    ctx['recording_state']['video_prompt'] = video_prompt
+    _emit(ctx['socketio'], 'video_prompt_update', {'text': video_prompt}, payload.get('sid'))
+    payload['video_prompt'] = video_prompt
+    return payload
+
+def generate_stage(payload, ctx):
+    """Generate the video with VEO 3 and download it."""
+    tracker = ctx.get('veo_tracker')
+    if tracker is None:
+        payload['video_filename'] = request_video(prompt=payload['video_prompt'], logger=ctx['logger'])
+        return payload
+    # Keyed by the spooled recording, so a job resumed after a restart reattaches to its operation
+    key = os.path.basename(payload['audio_path'])
+    result = tracker.submit(key, payload['video_prompt'], meta={'sid': payload.get('sid')})
+    payload['video_filename'] = result.get()
+    return payload
+
+def post_process_stage(payload, ctx):
+    """Apply the dream filters and cut the thumbnail in a single FFmpeg pass."""
+    video_path = os.path.join(get_config()['VIDEOS_DIR'], payload['video_filename'])
+    payload['thumb_filename'] = process_video_and_thumbnail(video_path, ctx['logger'])
+    return payload
+
+def thumbnail_stage(payload, ctx):
+    """Create the square thumbnail if post-processing didn't already produce one."""
+    if payload.get('thumb_filename'):
+        return payload
+    video_path = os.path.join(get_config()['VIDEOS_DIR'], payload['video_filename'])
+    payload['thumb_filename'] = process_thumbnail(video_path, ctx['logger'])
+    return payload
+
+def persist_stage(payload, ctx):
+    """Save the dream, notify the client and remove the spooled recording."""
+    logger = ctx['logger']
+    recording_state = ctx['recording_state']
+    # Imported here: pydantic is slow to import and only needed once a dream is saved
+    from functions.dream_data import DreamData
+    duration, file_size = video_metadata(os.path.join(get_config()['VIDEOS_DIR'], payload['video_filename']))
+    dream_data = DreamData(
+        user_prompt=payload['transcription'],
+        generated_prompt=payload['video_prompt'],
+        audio_filename=_audio_filename(payload),
+        video_filename=payload['video_filename'],
+        thumb_filename=payload.get('thumb_filename'),
+        status='completed',
+        duration=duration,
+        file_size=file_size,
+    )
+    payload['dream_id'] = ctx['dream_db'].save_dream(dream_data.model_dump())
+    # Stamp the dream id into the recording so the archive can be matched up without the database
+    tag_recording(os.path.join(get_config()['RECORDINGS_DIR'], dream_data.audio_filename),
+                  recording_tags(payload['dream_id']), logger)
+
+    # Queue notifications; the outbox delivers them in the background
+    outbox = ctx.get('notification_outbox')
+    if outbox is not None:
         try:
-            config = get_config()
-            email_notifier = EmailNotifier(config)
+            outbox.enqueue({
+                'id': payload['dream_id'],
+                'transcription': payload['transcription'],
+                'video_filename': payload['video_filename'],
+                'recorded_at': time.time(),
+            })
         except Exception as e:
             if logger:
-                logger.error(f"Failed to send email notification: {str(e)}")
-        recording_state['status'] = 'complete'
-        recording_state['video_url'] = f"/media/video/{video_filename}"
-        # Emit the video ready event to trigger playback
-        if sid:
-            socketio.emit('video_ready', {'url': recording_state['video_url']}, room=sid)
-        else:
-            socketio.emit('video_ready', {'url': recording_state['video_url']})
-        if logger:
-            logger.info(f"Audio processed and video generated for SID: {sid}")
+                logger.error(f"Failed to queue notification: {str(e)}")
+    recording_state['status'] = 'complete'
+    recording_state['video_url'] = f"/media/video/{payload['video_filename']}"
+    # Emit the video ready event to trigger playback
+    _emit(ctx['socketio'], 'video_ready', {'url': recording_state['video_url']}, payload.get('sid'))
+    try:
+        os.unlink(payload['audio_path'])
+    except OSError:
+        pass
+    if logger:
+        logger.info(f"Audio processed and video generated for SID: {payload.get('sid')}")
+    return payload
+
+DREAM_STAGES = [
+    ('transcribe', transcribe_stage),
+    ('prompt', prompt_stage),
+    ('generate', generate_stage),
+    ('post_process', post_process_stage),
+    ('thumbnail', thumbnail_stage),
+    ('persist', persist_stage),
+]
+
+# Default number of jobs allowed in each stage at once, overridable with JOB_CONCURRENCY_<STAGE>
+DEFAULT_STAGE_CONCURRENCY = {
+    'transcribe': 2,
+    'prompt': 2,
+    'generate': 2,
+    'post_process': 1,
+    'thumbnail': 1,
+    'persist': 1,
+}
+
+def _pipeline_error(ctx, payload, error):
+    # The job has used up its retries; nothing will read the spooled WebM again
+    if payload.get('audio_path'):
+        try:
+            os.unlink(payload['audio_path'])
+        except OSError:
+            pass
+    ctx['recording_state']['status'] = 'error'
+    ctx['socketio'].emit('error', {'message': str(error)})
+
+def _veo_progress(socketio, operation):
+    _emit(socketio, 'video_progress', {
+        'status': operation['status'],
+        'polls': operation['polls'],
+        'elapsed': int(time.time() - operation['submitted_at']),
+    }, operation['meta'].get('sid'))
+
+def create_veo_tracker(socketio, logger=None):
+    """Build the tracker that polls VEO 3 operations and reports progress to the recording's client."""
+    return VeoOperationTracker(logger=logger, on_progress=functools.partial(_veo_progress, socketio))
+
+def create_dream_queue(socketio, dream_db, recording_state, logger=None, veo_tracker=None, notification_outbox=None):
+    """Build the persistent job queue that runs the dream pipeline stages."""
+    ctx = {
+        'socketio': socketio, 'dream_db': dream_db, 'recording_state': recording_state,
+        'logger': logger, 'veo_tracker': veo_tracker, 'notification_outbox': notification_outbox,
+    }
+    config = get_config()
+    queue = JobQueue(
+        logger=logger, on_error=functools.partial(_pipeline_error, ctx),
+        max_attempts=int(config.get('JOB_MAX_ATTEMPTS', 3)),
+        retry_delay=float(config.get('JOB_RETRY_DELAY_SECONDS', 30)),
+        retention_days=float(config.get('JOB_RETENTION_DAYS', 7)),
+    )
+    for name, stage in DREAM_STAGES:
+        concurrency = config.get(f'JOB_CONCURRENCY_{name.upper()}', DEFAULT_STAGE_CONCURRENCY[name])
+        queue.add_stage(name, functools.partial(stage, ctx=ctx), concurrency=int(concurrency))
+    return queue
+
+def enqueue_recording(dream_queue, sid, audio_chunks, transcoder=None, logger=None):
+    """Ingest a finished recording and queue it for the dream pipeline."""
+    try:
+        payload = ingest_recording(audio_chunks, transcoder, logger)
+        payload['sid'] = sid
+        return dream_queue.enqueue(payload)
     except Exception as e:
-        recording_state['status'] = 'error'
-        socketio.emit('error', {'message': str(e)})
         if logger:
-            logger.error(f"Error processing audio: {str(e)}")
-    finally:
-        # Clean up
-        audio_chunks = []
-        # Remove temporary file if it exists
-        if 'temp_file_path' in locals():
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+            logger.error(f"Error queueing recording: {str(e)}")
+        if dream_queue.on_error:
+            dream_queue.on_error({'sid': sid}, e)
+        return None
+
 def generate_video_prompt(transcription, logger=None, config=None):
-    """Generate an enhanced video prompt from the transcription using GPT."""
+    """Generate an enhanced video prompt from the transcription using GPT.
+
+    Results are cached by the transcription and the GPT settings, so a retry reuses them.
+    """
     try:
         system_prompt = get_config()['GPT_SYSTEM_PROMPT']
-        response = client.chat.completions.create(
-            model=get_config()['GPT_MODEL'],
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"{transcription}"}
-            ],
-            temperature=float(get_config()['GPT_TEMPERATURE']),
-            max_tokens=int(get_config()['GPT_MAX_TOKENS'])
-        )
-        return response.choices[0].message.content.strip()
+        model = get_config()['GPT_MODEL']
+        temperature = float(get_config()['GPT_TEMPERATURE'])
+        max_tokens = int(get_config()['GPT_MAX_TOKENS'])
+
+        def complete():
+            with STEP_SECONDS.time(step='gpt'):
+                response = get_openai_client().chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": f"{transcription}"}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            return response.choices[0].message.content.strip()
+
+        key = ApiCache.make_key('prompt', transcription, model, system_prompt, temperature, max_tokens)
+        return get_api_cache().get_or_compute('prompt', key, complete)
     except Exception as e:
         if logger:
             logger.error(f"Error generating video prompt: {str(e)}")
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import re
+import ffmpeg
+from functions.config_loader import get_config
+from functions.video import THUMB_FORMATS
+
+# The kiosk display's native resolution; backgrounds are cropped to fill it
+BACKGROUND_WIDTH = 1280
+BACKGROUND_HEIGHT = 400
+MANIFEST_FILENAME = 'manifest.json'
+SOURCE_DIR = 'static/images/background'
+# Names build_background writes: `<n>_<hash>.<fmt>`, and `.<n>.tmp.<fmt>` while
+# encoding. Cleanup only ever removes files matching these.
+BUILT_FILENAME = re.compile(rf"(\d+_[0-9a-f]{{12}}|\.\d+\.tmp)\.({'|'.join(THUMB_FORMATS)})")
+
+def backgrounds_dir():
+    return get_config().get('BACKGROUNDS_DIR', 'media/backgrounds')
+
+def manifest_path():
+    return os.path.join(backgrounds_dir(), MANIFEST_FILENAME)
+
+def load_manifest():
+    """Return the built background manifest, or None if `dreamctl build-backgrounds` hasn't been run."""
+    try:
+        with open(manifest_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_settings(fmt):
+    """Everything that determines a built background besides its source image."""
+    return {'width': BACKGROUND_WIDTH, 'height': BACKGROUND_HEIGHT, 'format': fmt, 'encoding': THUMB_FORMATS[fmt]}
+
+def build_background(source_path, fmt):
+    """Scale and crop one source image to the display size, named by content hash.
+
+    Returns the manifest entry: {'file', 'bytes', 'sha256', 'source_sha256'}.
+    """
+    source_sha256 = file_sha256(source_path)
+    number = os.path.splitext(os.path.basename(source_path))[0]
+    tmp_path = os.path.join(backgrounds_dir(), f".{number}.tmp.{fmt}")
+    stream = ffmpeg.input(source_path)
+    stream = stream.filter('scale', BACKGROUND_WIDTH, BACKGROUND_HEIGHT, force_original_aspect_ratio='increase')
+    stream = stream.filter('crop', BACKGROUND_WIDTH, BACKGROUND_HEIGHT)
+    try:
+        ffmpeg.run(
+            ffmpeg.output(stream, tmp_path, vframes=1, **THUMB_FORMATS[fmt]),
+            overwrite_output=True, quiet=True
+        )
+        with open(tmp_path, 'rb') as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        # The hash in the name lets the browser cache each file forever
+        filename = f"{number}_{sha256[:12]}.{fmt}"
+        os.replace(tmp_path, os.path.join(backgrounds_dir(), filename))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {'file': filename, 'bytes': len(data), 'sha256': sha256, 'source_sha256': source_sha256}
@@ -1,10 +1,87 @@
 import os
 import json
+import ctypes
+import ctypes.util
+import logging
+import struct
+import time
+from types import MappingProxyType
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "config.json"
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.template.json')
+
+# Converters for the "type" of each entry in config.template.json
+TYPE_CONVERTERS = {
+    'integer': lambda value: _to_int(value),
+    'float': float,
+    'boolean': lambda value: _to_bool(value),
+    'string': str,
+    'url': str,
+}
+
 _config = None
+_template = None
+_subscribers = []
+
+class ConfigError(ValueError):
+    """Raised when config.json can't be read or a value doesn't match its template type."""
+
+def _to_int(value):
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{value!r} is not an integer")
+    return int(value)
+
+def _to_bool(value):
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false', '1', '0', 'yes', 'no'):
+        return value.strip().lower() in ('true', '1', 'yes')
+    if isinstance(value, (bool, int)):
+        return bool(value)
+    raise ValueError(f"{value!r} is not a boolean")
+
+def load_template():
+    """The config.template.json entries by name, or {} if the template is missing."""
+    global _template
+    if _template is None:
+        try:
+            with open(TEMPLATE_PATH, "r") as f:
+                _template = {item['name']: item for item in json.load(f)}
+        except (OSError, ValueError):
+            _template = {}
+    return _template
+
+def build_config(raw):
+    """Return an immutable snapshot of `raw` with template defaults filled in and values converted once.
+
+    Keys the template doesn't describe are passed through as they are.
+    """
+    config = {}
+    for name, item in load_template().items():
+        if 'default' in item:
+            config[name] = item['default']
+    config.update(raw)
+    for name, value in config.items():
+        item = load_template().get(name)
+        if item is None or value is None:
+            continue
+        converter = TYPE_CONVERTERS.get(item.get('type'))
+        if converter is not None:
+            try:
+                config[name] = converter(value)
+            except (TypeError, ValueError) as e:
+                raise ConfigError(f"{name}: expected {item['type']}, got {value!r}") from e
+        if item.get('options') and config[name] not in item['options']:
+            logger.warning(f"{name}: {config[name]!r} is not one of {item['options']}")
+    return MappingProxyType(config)
 
 def load_config():
+    """Read config.json into a new snapshot, make it current and notify subscribers if it changed.
+
+    Raises ConfigError if the file can't be parsed or a value has the wrong type;
+    the previous snapshot then stays current.
+    """
     global _config
     # Load API keys from .env
     load_dotenv()
@@ -13,19 +90,112 @@ def load_config():
         "GOOGLE_AI_API_KEY": os.getenv("GOOGLE_AI_API_KEY"),
     }
 
-    # Determine which config to load
-    config_file = "config.json"
-
-    with open(config_file, "r") as f:
-        config = json.load(f)
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            raw = json.load(f)
+    except ValueError as e:
+        raise ConfigError(f"{CONFIG_FILE}: {str(e)}") from e
 
     # Merge API keys into config
-    config.update(api_keys)
-    _config = config
-    return config
+    raw.update(api_keys)
+    previous, _config = _config, build_config(raw)
+    if previous is not None and dict(_config) != dict(previous):
+        logger.info(f"Loaded changed {CONFIG_FILE}")
+        for callback in list(_subscribers):
+            try:
+                callback(_config, previous)
+            except Exception as e:
+                logger.error(f"Config subscriber {getattr(callback, '__name__', callback)} failed: {str(e)}")
+    return _config
 
 def get_config():
-    global _config
+    """The current config snapshot, a read-only mapping with values already converted to their template types."""
     if _config is None:
         return load_config()
-    return _config 
\ No newline at end of file
+    return _config
+
+def subscribe(callback):
+    """Call `callback(new_config, old_config)` after every reload, e.g. to drop caches built from config values."""
+    _subscribers.append(callback)
+    return callback
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct('iIII')
+
+def _inotify_fd(directory):
+    """An inotify descriptor watching `directory` for finished writes and renames, or None if unavailable."""
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        return None
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        return None
+    # Watch the directory: editors often save by writing a new file and renaming it over the old one
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def _names_changed(fd):
+    names = set()
+    try:
+        data = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return names
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        names.add(data[offset:offset + length].rstrip(b'\0').decode(errors='replace'))
+        offset += length
+    return names
+
+def _reload():
+    try:
+        load_config()
+    except (OSError, ConfigError) as e:
+        # Mid-save or a typo: keep serving the last good config
+        logger.error(f"Not reloading {CONFIG_FILE}: {str(e)}")
+
+def watch_config(poll_interval=2.0):
+    """Reload config.json whenever it changes on disk. Runs forever; spawn it in a greenlet.
+
+    Uses inotify where available, otherwise checks the file's mtime every
+    `poll_interval` seconds.
+    """
+    # Imported here so scripts that never watch the config don't need gevent
+    from gevent.socket import wait_read
+    get_config()
+    directory = os.path.dirname(os.path.abspath(CONFIG_FILE))
+    name = os.path.basename(CONFIG_FILE)
+    fd = _inotify_fd(directory)
+    if fd is None:
+        logger.info(f"inotify unavailable, polling {CONFIG_FILE} every {poll_interval}s")
+        last_mtime = _mtime()
+        while True:
+            time.sleep(poll_interval)
+            mtime = _mtime()
+            if mtime != last_mtime:
+                last_mtime = mtime
+                _reload()
+    try:
+        while True:
+            wait_read(fd)
+            if name in _names_changed(fd):
+                _reload()
+    finally:
+        os.close(fd)
+
+def _mtime():
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class DreamData(BaseModel):
+    user_prompt: str
+    generated_prompt: str
+    audio_filename: str
+    video_filename: str
+    thumb_filename: Optional[str] = None
+    status: Optional[str] = 'completed'
+    duration: Optional[float] = None
+    file_size: Optional[int] = None
@@ -1,57 +1,346 @@
 import sqlite3
 import json
+import html
+import re
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 import logging
-from pydantic import BaseModel
-from typing import Optional
 import os
+import time
 from functions.config_loader import get_config
+from functions.metrics import DB_QUERY_SECONDS, timed
 import shutil
 
 logger = logging.getLogger(__name__)
 
-class DreamData(BaseModel):
-    user_prompt: str
-    generated_prompt: str
-    audio_filename: str
-    video_filename: str
-    thumb_filename: Optional[str] = None
-    status: Optional[str] = 'completed'
+def __getattr__(name):
+    # DreamData lives in its own module so importing the database doesn't import pydantic
+    if name == 'DreamData':
+        from functions.dream_data import DreamData
+        return DreamData
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Full-text index over the prompts. External content: the text stays in `dreams`
+# and the triggers keep the index in step with every insert, update and delete.
+SEARCH_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS dreams_fts USING fts5(
+        user_prompt, generated_prompt,
+        content='dreams', content_rowid='id', tokenize='porter unicode61', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dreams_fts_insert AFTER INSERT ON dreams BEGIN
+        INSERT INTO dreams_fts (rowid, user_prompt, generated_prompt)
+        VALUES (new.id, new.user_prompt, new.generated_prompt);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dreams_fts_delete AFTER DELETE ON dreams BEGIN
+        INSERT INTO dreams_fts (dreams_fts, rowid, user_prompt, generated_prompt)
+        VALUES ('delete', old.id, old.user_prompt, old.generated_prompt);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dreams_fts_update AFTER UPDATE OF user_prompt, generated_prompt ON dreams BEGIN
+        INSERT INTO dreams_fts (dreams_fts, rowid, user_prompt, generated_prompt)
+        VALUES ('delete', old.id, old.user_prompt, old.generated_prompt);
+        INSERT INTO dreams_fts (rowid, user_prompt, generated_prompt)
+        VALUES (new.id, new.user_prompt, new.generated_prompt);
+    END
+    """,
+)
+# bm25 column weights: what the dreamer said counts for more than GPT's rewrite of it
+SEARCH_RANKING = 'bm25(2.0, 1.0)'
+# snippet() wraps matches in these control characters, which don't occur in prompts, so the snippet
+# can be HTML-escaped first and the markers swapped for <mark> after
+MATCH_START, MATCH_END = '\x02', '\x03'
+SNIPPET_TOKENS = 12
+# Broad queries rank only their newest this-many matches by relevance, then
+# list the rest newest first
+SEARCH_RANK_WINDOW = 1000
+
+# Dreams handled per backfill batch, and seconds to rest between batches so
+# the app stays responsive while a backfill runs
+BACKFILL_BATCH_SIZE = 25
+BACKFILL_PAUSE = 0.5
+
+def _create_dreams(cursor):
+    # The schema DreamDB created before migrations existed, so a version 0
+    # database made by that code passes through unchanged
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dreams (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_prompt TEXT NOT NULL,
+            generated_prompt TEXT NOT NULL,
+            audio_filename TEXT NOT NULL,
+            video_filename TEXT NOT NULL,
+            thumb_filename TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT
+        )
+    ''')
+    # Newest-first library pages walk this index instead of sorting the table
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dreams_created_at ON dreams (created_at DESC, id DESC)')
+
+def _add_video_metadata(cursor):
+    cursor.execute('ALTER TABLE dreams ADD COLUMN duration REAL')
+    cursor.execute('ALTER TABLE dreams ADD COLUMN file_size INTEGER')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS backfills (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            completed_at TIMESTAMP
+        )
+    ''')
+    # Existing dreams get their metadata from run_backfills, after startup
+    cursor.execute("INSERT OR IGNORE INTO backfills (name) VALUES ('video_metadata')")
+
+def _create_reprocess_state(cursor):
+    # Written by scripts/reprocess_dreams.py, which created it itself before this
+    # migration. Kept here so deleting a dream can find its raw download, which
+    # keeps its original name after reprocessing gives the dream a new video.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reprocess_state (
+            dream_id INTEGER PRIMARY KEY,
+            raw_filename TEXT NOT NULL,
+            input_hash TEXT NOT NULL,
+            params_hash TEXT NOT NULL,
+            video_filename TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+# (version, description, function applying it to a cursor). Append new
+# migrations with the next version; never edit or reorder released ones.
+MIGRATIONS = (
+    (1, 'create the dreams table', _create_dreams),
+    (2, 'add video duration and file size', _add_video_metadata),
+    (3, 'track the raw downloads of reprocessed dreams', _create_reprocess_state),
+)
+
+def _video_metadata_batch(dreams):
+    # Imported here: functions.video pulls in ffmpeg, which the database doesn't otherwise need
+    from functions.video import video_metadata
+    updates = {}
+    for dream in dreams:
+        if dream.get('duration') is not None:
+            continue
+        path = os.path.join(get_config()['VIDEOS_DIR'], dream['video_filename'])
+        duration, file_size = video_metadata(path)
+        if duration is not None or file_size is not None:
+            updates[dream['id']] = {'duration': duration, 'file_size': file_size}
+    return updates
+
+# Backfills scheduled by migrations, by name: each takes a batch of dream rows
+# and returns {dream id: {column: value}} for the rows it could fill in
+BACKFILLS = {
+    'video_metadata': _video_metadata_batch,
+}
+
+# Applied to every pooled connection. WAL lets page loads read while the
+# pipeline writes; NORMAL sync is durable across app crashes in WAL mode.
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -8000',
+)
+# Prepared statements kept per connection by the sqlite3 module
+STATEMENT_CACHE_SIZE = 256
+
+class ConnectionPool:
+    """A small pool of long-lived SQLite connections, safe to share between greenlets.
+
+    Each `connection()` checks a connection out for the duration of the block,
+    commits on success and rolls back on error, so one greenlet never sees
+    another's open transaction.
+    """
+
+    def __init__(self, db_path, size=4):
+        self.db_path = db_path
+        self.size = max(1, int(size))
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path, timeout=30, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if not create:
+            # Wait for another greenlet to hand its connection back
+            return self._idle.get()
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        """Close the idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_connection_pool(db_path):
+    """Return the shared ConnectionPool for a database file."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path, size=get_config().get('DB_POOL_SIZE', 4))
+        return pool
 
 class DreamDB:
     def __init__(self, db_path=None):
         if db_path is None:
             db_path = get_config()['DB_PATH']
         self.db_path = db_path
+        self._pool = get_connection_pool(db_path)
+        self._recent = None  # IDs of the newest VIDEO_HISTORY_LIMIT dreams for playback, loaded on first use
+        self.search_enabled = False  # Set by _init_search when SQLite has FTS5
         self._init_db()
     
     def _init_db(self):
-        """Initialize the database and create tables if they don't exist. If the dreams table is created, also initialize sample dreams."""
-        with sqlite3.connect(self.db_path) as conn:
+        """Bring the database up to the latest schema version. If the dreams table is created, also initialize sample dreams."""
+        with self._pool.connection() as conn:
             cursor = conn.cursor()
             # Check if the dreams table exists
             cursor.execute("""
                 SELECT name FROM sqlite_master WHERE type='table' AND name='dreams';
             """)
             table_exists = cursor.fetchone() is not None
-            # Create the table if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS dreams (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_prompt TEXT NOT NULL,
-                    generated_prompt TEXT NOT NULL,
-                    audio_filename TEXT NOT NULL,
-                    video_filename TEXT NOT NULL,
-                    thumb_filename TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT
-                )
-            ''')
-            conn.commit()
-            # If the table did not exist before, initialize sample dreams
-            if not table_exists:
-                self._init_sample_dreams()
+        self.migrate()
+        with self._pool.connection() as conn:
+            # Not a numbered migration: whether the index can exist depends on the
+            # SQLite build rather than the schema version, so it is checked every start
+            self._init_search(conn.cursor())
+        # If the table did not exist before, initialize sample dreams
+        if not table_exists:
+            self._init_sample_dreams()
+
+    def schema_version(self):
+        """The schema version the database is at, from PRAGMA user_version. 0 is a database from before migrations."""
+        with self._pool.connection() as conn:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def migrate(self):
+        """Apply the migrations in MIGRATIONS newer than the database's schema version, in order.
+
+        Each migration runs in its own transaction together with the bump of
+        PRAGMA user_version, so a failed migration leaves the database at the
+        previous version and is retried on the next start. Returns the new version.
+        """
+        for version, description, migration in MIGRATIONS:
+            with self._pool.connection() as conn:
+                # IMMEDIATE takes the write lock first, so when two processes start
+                # together the second one sees the version the first one committed
+                conn.execute('BEGIN IMMEDIATE')
+                current = conn.execute('PRAGMA user_version').fetchone()[0]
+                if current >= version:
+                    continue
+                cursor = conn.cursor()
+                migration(cursor)
+                cursor.execute(f'PRAGMA user_version = {int(version)}')
+            if logger:
+                logger.info(f"Migrated {self.db_path} to schema version {version}: {description}")
+        return self.schema_version()
+
+    def run_backfills(self, batch_size=BACKFILL_BATCH_SIZE, pause=BACKFILL_PAUSE):
+        """Run the backfills scheduled by migrations until they're done. Blocks; spawn it in a greenlet.
+
+        Dreams are handled `batch_size` at a time, oldest first, with `pause`
+        seconds between batches. The last dream id handled is stored with each
+        batch's results, so a backfill interrupted by a restart resumes where it
+        stopped instead of starting over.
+        """
+        for name, compute in BACKFILLS.items():
+            while True:
+                with self._pool.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('SELECT last_id, completed_at FROM backfills WHERE name = ?', (name,))
+                    state = cursor.fetchone()
+                    if state is None or state['completed_at'] is not None:
+                        break
+                    cursor.execute(
+                        'SELECT * FROM dreams WHERE id > ? ORDER BY id LIMIT ?', (state['last_id'], batch_size)
+                    )
+                    rows = [self._row_to_dict(row) for row in cursor.fetchall()]
+                if not rows:
+                    with self._pool.connection() as conn:
+                        conn.execute('UPDATE backfills SET completed_at = CURRENT_TIMESTAMP WHERE name = ?', (name,))
+                    if logger:
+                        logger.info(f"Backfill {name} finished")
+                    break
+                # Computed outside the transaction: it may be slow and mustn't hold the write lock
+                updates = compute(rows)
+                with self._pool.connection() as conn:
+                    for dream_id, values in updates.items():
+                        assignments = ', '.join(f"{column} = ?" for column in values)
+                        conn.execute(f"UPDATE dreams SET {assignments} WHERE id = ?", [*values.values(), dream_id])
+                    conn.execute('UPDATE backfills SET last_id = ? WHERE name = ?', (rows[-1]['id'], name))
+                if logger:
+                    logger.info(f"Backfill {name}: updated {len(updates)} of {len(rows)} dreams up to id {rows[-1]['id']}")
+                time.sleep(pause)
+
+    def _init_search(self, cursor):
+        """Create the full-text index and its triggers, backfilling it from existing dreams the first time."""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='dreams_fts'")
+        index_exists = cursor.fetchone() is not None
+        try:
+            for statement in SEARCH_SCHEMA:
+                cursor.execute(statement)
+        except sqlite3.OperationalError as e:
+            # Python builds against a system SQLite, which may lack FTS5
+            if logger:
+                logger.warning(f"Dream search disabled, SQLite has no FTS5: {str(e)}")
+            return
+        if not index_exists:
+            # Index the dreams recorded before search existed
+            cursor.execute("INSERT INTO dreams_fts (dreams_fts) VALUES ('rebuild')")
+            if logger:
+                logger.info("Built the dream search index")
+        self.search_enabled = True
 
     def _init_sample_dreams(self):
         """Copy sample dreams and insert them into the database if missing."""
@@ -91,6 +380,7 @@ class DreamDB:
                         logger.warning(f"Could not copy sample thumb {src_thumb} to {dst_thumb}: {e}")
             # Insert into DB if not present
             if sample['video_dest'] not in existing_videos:
+                from functions.dream_data import DreamData
                 dream_data = DreamData(
                     user_prompt='',
                     generated_prompt='',
@@ -106,6 +396,7 @@ class DreamDB:
                 if logger:
                     logger.info(f"Sample dream {i} already exists in DB")
     
+    @timed(DB_QUERY_SECONDS, query='save_dream')
     def save_dream(self, dream_data):
         """Save a new dream record to the database."""
         required_fields = ['user_prompt', 'generated_prompt', 'audio_filename', 'video_filename']
@@ -113,28 +404,34 @@ class DreamDB:
             if field not in dream_data:
                 raise ValueError(f"Missing required field: {field}")
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO dreams (
                     user_prompt, generated_prompt, audio_filename, video_filename,
-                    thumb_filename, status
-                ) VALUES (?, ?, ?, ?, ?, ?)
+                    thumb_filename, status, duration, file_size
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 dream_data['user_prompt'],
                 dream_data['generated_prompt'],
                 dream_data['audio_filename'],
                 dream_data['video_filename'],
                 dream_data.get('thumb_filename'),
-                dream_data.get('status', 'completed')
+                dream_data.get('status', 'completed'),
+                dream_data.get('duration'),
+                dream_data.get('file_size')
             ))
             conn.commit()
-            return cursor.lastrowid
+            dream_id = cursor.lastrowid
+            if self._recent is not None:
+                self._recent.insert(0, dream_id)
+                del self._recent[self._history_limit():]
+            return dream_id
     
+    @timed(DB_QUERY_SECONDS, query='get_dream')
     def get_dream(self, dream_id):
         """Get a single dream by ID."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM dreams WHERE id = ?', (dream_id,))
             row = cursor.fetchone()
@@ -142,14 +439,176 @@ class DreamDB:
                 return self._row_to_dict(row)
             return None
     
+    @timed(DB_QUERY_SECONDS, query='get_all_dreams')
     def get_all_dreams(self):
         """Get all dreams, ordered by creation date (newest first)."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._pool.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM dreams ORDER BY created_at DESC')
+            cursor.execute('SELECT * FROM dreams ORDER BY created_at DESC, id DESC')
             return [self._row_to_dict(row) for row in cursor.fetchall()]
-    
+
+    @timed(DB_QUERY_SECONDS, query='get_dreams_page')
+    def get_dreams_page(self, limit=24, before=None):
+        """Get up to `limit` dreams older than the `before` cursor, newest first.
+
+        Returns (dreams, next_cursor). Pass next_cursor back as `before` to get the
+        following page; it is None once the last page has been returned.
+        """
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            if before:
+                created_at, dream_id = self.decode_cursor(before)
+                cursor.execute(
+                    'SELECT * FROM dreams WHERE (created_at, id) < (?, ?) '
+                    'ORDER BY created_at DESC, id DESC LIMIT ?',
+                    (created_at, dream_id, limit + 1)
+                )
+            else:
+                cursor.execute('SELECT * FROM dreams ORDER BY created_at DESC, id DESC LIMIT ?', (limit + 1,))
+            rows = cursor.fetchall()
+        dreams = [self._row_to_dict(row) for row in rows[:limit]]
+        next_cursor = self.encode_cursor(dreams[-1]) if len(rows) > limit else None
+        return dreams, next_cursor
+
+    @timed(DB_QUERY_SECONDS, query='count_dreams')
+    def count_dreams(self):
+        """Get the total number of dreams."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM dreams')
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def search_query(text):
+        """Turn free text into an FTS5 query matching every word, the last one as a prefix.
+
+        Returns None if `text` has no words. Quoting each word keeps FTS5
+        operators and punctuation in user input from being parsed as syntax.
+        A single letter isn't treated as a prefix: it would match nearly
+        every dream and only the 2- and 3-letter prefixes are indexed.
+        """
+        words = re.findall(r'\w+', text or '')
+        if not words:
+            return None
+        query = ' '.join(f'"{word}"' for word in words)
+        return query + '*' if len(words[-1]) >= 2 else query
+
+    @staticmethod
+    def highlight(snippet):
+        """HTML-escape a snippet and wrap its matches in <mark>."""
+        return html.escape(snippet or '').replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+    @timed(DB_QUERY_SECONDS, query='search_dreams')
+    def search_dreams(self, text, limit=24, offset=0):
+        """Find dreams whose prompts contain every word of `text`, best match first.
+
+        Only the newest SEARCH_RANK_WINDOW matches are ranked; any older ones
+        come after them, newest first.
+
+        Returns (dreams, total). Each dream has a `snippet` of HTML with the
+        matches in <mark>, taken from whichever prompt matched best. Without
+        FTS5, falls back to a LIKE scan: matches are unranked, newest first.
+        """
+        if not self.search_enabled:
+            return self._search_like(text, limit, offset)
+        query = self.search_query(text)
+        if query is None:
+            return [], 0
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM dreams_fts WHERE dreams_fts MATCH ?', (query,))
+            total = cursor.fetchone()[0]
+            # Scoring every match is what makes a broad query slow, so only the
+            # newest SEARCH_RANK_WINDOW matches are ranked; older ones follow newest first
+            oldest = 0
+            if total > SEARCH_RANK_WINDOW:
+                cursor.execute(
+                    'SELECT rowid FROM dreams_fts WHERE dreams_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?',
+                    (query, SEARCH_RANK_WINDOW - 1)
+                )
+                oldest = cursor.fetchone()[0]
+            select = (
+                'SELECT dreams.*, snippet(dreams_fts, -1, ?, ?, ?, ?) AS snippet '
+                'FROM dreams_fts JOIN dreams ON dreams.id = dreams_fts.rowid WHERE dreams_fts MATCH ? '
+            )
+            snippet_args = (MATCH_START, MATCH_END, '…', SNIPPET_TOKENS, query)
+            rows = []
+            if offset < SEARCH_RANK_WINDOW:
+                # ORDER BY rank lets FTS5 sort the matches itself, so snippet()
+                # only runs for the rows on this page
+                cursor.execute(
+                    select + 'AND dreams_fts.rowid >= ? AND rank MATCH ? ORDER BY rank LIMIT ? OFFSET ?',
+                    snippet_args + (oldest, SEARCH_RANKING, min(limit, SEARCH_RANK_WINDOW - offset), offset)
+                )
+                rows = cursor.fetchall()
+            if oldest and len(rows) < limit:
+                cursor.execute(
+                    select + 'AND dreams_fts.rowid < ? ORDER BY dreams_fts.rowid DESC LIMIT ? OFFSET ?',
+                    snippet_args + (oldest, limit - len(rows), max(0, offset - SEARCH_RANK_WINDOW))
+                )
+                rows += cursor.fetchall()
+        dreams = []
+        for row in rows:
+            dream = self._row_to_dict(row)
+            dream['snippet'] = self.highlight(dream['snippet'])
+            dreams.append(dream)
+        return dreams, total
+
+    def _search_like(self, text, limit, offset):
+        """search_dreams for SQLite builds without FTS5: a substring scan over both prompts."""
+        words = re.findall(r'\w+', text or '')
+        if not words:
+            return [], 0
+        # Escape LIKE wildcards so a '%' or '_' in the search is matched literally
+        patterns = ['%' + re.sub(r'([\\%_])', r'\\\1', word) + '%' for word in words]
+        where = ' AND '.join(
+            "(user_prompt LIKE ? ESCAPE '\\' OR generated_prompt LIKE ? ESCAPE '\\')" for _ in patterns
+        )
+        args = [pattern for pattern in patterns for _ in range(2)]
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT COUNT(*) FROM dreams WHERE {where}', args)
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f'SELECT * FROM dreams WHERE {where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?',
+                args + [limit, offset]
+            )
+            rows = cursor.fetchall()
+        dreams = []
+        for row in rows:
+            dream = self._row_to_dict(row)
+            dream['snippet'] = self.highlight(self._like_snippet(dream, words))
+            dreams.append(dream)
+        return dreams, total
+
+    @staticmethod
+    def _like_snippet(dream, words):
+        """Cut a SNIPPET_TOKENS-word excerpt around the first match, with matches marked like FTS5's snippet()."""
+        match = re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+        text = next(
+            (dream[column] for column in ('user_prompt', 'generated_prompt') if match.search(dream[column] or '')), ''
+        )
+        tokens = text.split()
+        first = next((i for i, token in enumerate(tokens) if match.search(token)), 0)
+        start = max(0, min(first - SNIPPET_TOKENS // 4, len(tokens) - SNIPPET_TOKENS))
+        excerpt = ' '.join(tokens[start:start + SNIPPET_TOKENS])
+        excerpt = match.sub(lambda m: f"{MATCH_START}{m.group(0)}{MATCH_END}", excerpt)
+        return ('…' if start > 0 else '') + excerpt + ('…' if start + SNIPPET_TOKENS < len(tokens) else '')
+
+    @staticmethod
+    def encode_cursor(dream):
+        """Build an opaque page cursor from a dream's sort key."""
+        return f"{dream['created_at']}|{dream['id']}"
+
+    @staticmethod
+    def decode_cursor(value):
+        """Split a page cursor back into (created_at, id). Raises ValueError if malformed."""
+        created_at, _, dream_id = str(value).rpartition('|')
+        if not created_at:
+            raise ValueError(f"Invalid cursor: {value}")
+        return created_at, int(dream_id)
+
+    @timed(DB_QUERY_SECONDS, query='update_dream')
     def update_dream(self, dream_id, updates):
         """Update an existing dream."""
         if not updates:
@@ -165,11 +624,12 @@ class DreamDB:
             values.append(dream_id)
             query = f"UPDATE dreams SET {', '.join(set_clauses)} WHERE id = ?"
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._pool.connection() as conn:
                 cursor = conn.cursor()
                 try:
                     cursor.execute(query, values)
                     conn.commit()
+                    self._forget_recent(dream_id)
                     return cursor.rowcount > 0
                 except sqlite3.Error as e:
                     if logger:
@@ -184,13 +644,75 @@ class DreamDB:
                 logger.error(f"Error updating dream {dream_id}: {str(e)}")
             raise
     
+    @timed(DB_QUERY_SECONDS, query='raw_video_filename')
+    def raw_video_filename(self, dream):
+        """The name of the unfiltered download `dream` was made from, in RAW_VIDEOS_DIR.
+
+        It matches video_filename until scripts/reprocess_dreams.py gives the
+        dream a new video; from then on it is recorded in reprocess_state.
+        """
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                'SELECT raw_filename FROM reprocess_state WHERE dream_id = ?', (dream['id'],)
+            ).fetchone()
+        return row['raw_filename'] if row else dream['video_filename']
+
+    @timed(DB_QUERY_SECONDS, query='delete_dream')
     def delete_dream(self, dream_id):
         """Delete a dream from the database."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.connection() as conn:
             cursor = conn.cursor()
+            conn.execute('DELETE FROM reprocess_state WHERE dream_id = ?', (dream_id,))
             cursor.execute('DELETE FROM dreams WHERE id = ?', (dream_id,))
             conn.commit()
+            self._forget_recent(dream_id)
             return cursor.rowcount > 0
+
+    @staticmethod
+    def _history_limit():
+        return max(1, int(get_config().get('VIDEO_HISTORY_LIMIT', 7)))
+
+    def _forget_recent(self, dream_id):
+        # Reload the playback history on next use if it held this dream
+        if self._recent is not None and int(dream_id) in self._recent:
+            self._recent = None
+
+    def recent_dream_ids(self):
+        """Get the IDs of the newest VIDEO_HISTORY_LIMIT dreams, newest first, from the in-memory playback history."""
+        if self._recent is None:
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT id FROM dreams ORDER BY created_at DESC, id DESC LIMIT ?', (self._history_limit(),)
+                )
+                self._recent = [row['id'] for row in cursor.fetchall()]
+        return self._recent
+
+    def _fetch_recent(self, pick):
+        # Rows are read fresh by primary key so edits from other processes (e.g.
+        # reprocessing) show up; a dream deleted elsewhere triggers one reload
+        for _ in range(2):
+            recent = self.recent_dream_ids()
+            if not recent:
+                return None
+            dream = self.get_dream(recent[pick(recent) % len(recent)])
+            if dream is not None:
+                return dream
+            self._recent = None
+        return None
+
+    @timed(DB_QUERY_SECONDS, query='get_previous_dream')
+    def get_previous_dream(self, dream_id=None):
+        """Get the dream played after `dream_id`: the next older one in the playback history.
+
+        Starts from the newest dream when `dream_id` is None or no longer in the history,
+        and wraps back to the newest after the oldest. Returns None if there are no dreams.
+        """
+        def pick(recent):
+            if dream_id is not None and int(dream_id) in recent:
+                return recent.index(int(dream_id)) + 1
+            return 0
+        return self._fetch_recent(pick)
     
     def _row_to_dict(self, row):
         """Convert a database row to a dictionary."""
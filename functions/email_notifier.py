@@ -7,6 +7,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def recorded_at(dream_data):
+    """When a dream was recorded, formatted for a notification."""
+    timestamp = dream_data.get('recorded_at')
+    when = datetime.fromtimestamp(timestamp) if timestamp else datetime.now()
+    return when.strftime('%B %d, %Y at %I:%M %p')
+
 class EmailNotifier:
     def __init__(self, config):
         self.enabled = config.get('EMAIL_NOTIFICATIONS_ENABLED', False)
@@ -14,34 +20,86 @@ class EmailNotifier:
         self.smtp_port = config.get('SMTP_PORT', 587)
         self.smtp_username = config.get('SMTP_USERNAME', '')
         self.smtp_password = config.get('SMTP_PASSWORD', '')
+        self.use_tls = config.get('SMTP_USE_TLS', True)
         self.from_email = config.get('FROM_EMAIL', '')
         self.to_emails = config.get('TO_EMAILS', [])
         self.dream_base_url = config.get('DREAM_BASE_URL', 'http://localhost:5000')
-        
+        self.timeout = float(config.get('NOTIFICATION_TIMEOUT', 10))
+        self._smtp = None  # Kept open between sends and checked with NOOP before reuse
+
     def send_dream_notification(self, dream_data):
         """Send email notification for a new dream"""
         if not self.enabled:
             logger.info("Email notifications are disabled")
             return False
-            
-        if not all([self.smtp_username, self.smtp_password, self.from_email, self.to_emails]):
-            logger.error("Email configuration is incomplete")
+        try:
+            self.send_dreams([dream_data])
+            logger.info(f"Email notification sent successfully for dream {dream_data.get('id', 'unknown')}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send email notification: {str(e)}")
             return False
-            
+
+    def send_dreams(self, dreams):
+        """Send one email covering `dreams`. Raises if it could not be sent."""
+        if not all([self.smtp_username, self.smtp_password, self.from_email, self.to_emails]):
+            raise ValueError("Email configuration is incomplete")
+
+        # Create message
+        msg = MIMEMultipart('alternative')
+        if len(dreams) == 1:
+            msg['Subject'] = f"New Dream Recorded - {recorded_at(dreams[0])}"
+        else:
+            msg['Subject'] = f"{len(dreams)} New Dreams Recorded - {recorded_at(dreams[-1])}"
+        msg['From'] = self.from_email
+        msg['To'] = ', '.join(self.to_emails) if isinstance(self.to_emails, list) else self.to_emails
+
+        # Attach parts
+        part1 = MIMEText('\n'.join(self._dream_text(dream) for dream in dreams), 'plain')
+        part2 = MIMEText(self._html(dreams), 'html')
+        msg.attach(part1)
+        msg.attach(part2)
+
+        # Handle both string and list of recipients
+        recipients = self.to_emails if isinstance(self.to_emails, list) else [self.to_emails]
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"New Dream Recorded - {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"
-            msg['From'] = self.from_email
-            msg['To'] = ', '.join(self.to_emails) if isinstance(self.to_emails, list) else self.to_emails
-            
-            # Create the body of the message
-            dream_id = dream_data.get('id', 'unknown')
-            transcription = dream_data.get('transcription', 'No transcription available')
-            video_filename = dream_data.get('video_filename', '')
-            
-            # Plain text version
-            text = f"""
+            self._connection().send_message(msg, from_addr=self.from_email, to_addrs=recipients)
+        except smtplib.SMTPException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def _connection(self):
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            server.login(self.smtp_username, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        self._smtp = server
+        return server
+
+    def _dream_text(self, dream_data):
+        dream_id = dream_data.get('id', 'unknown')
+        transcription = dream_data.get('transcription', 'No transcription available')
+        video_filename = dream_data.get('video_filename', '')
+        return f"""
 A new dream has been recorded!
 
 Transcription: {transcription}
@@ -50,54 +108,40 @@ View the dream: {self.dream_base_url}/dreams#{dream_id}
 Direct video link: {self.dream_base_url}/media/video/{video_filename}
 
 Dream ID: {dream_id}
-Recorded: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
+Recorded: {recorded_at(dream_data)}
 """
-            
-            # HTML version
-            html = f"""
-<html>
-  <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-    <h2 style="color: #4a5568;">🌙 New Dream Recorded</h2>
-    
+
+    def _dream_html(self, dream_data):
+        dream_id = dream_data.get('id', 'unknown')
+        transcription = dream_data.get('transcription', 'No transcription available')
+        video_filename = dream_data.get('video_filename', '')
+        return f"""
     <div style="background-color: #f7fafc; padding: 20px; border-radius: 8px; margin: 20px 0;">
       <h3 style="color: #2d3748; margin-top: 0;">Transcription:</h3>
       <p style="color: #4a5568; line-height: 1.6;">{transcription}</p>
     </div>
-    
+
     <div style="margin: 30px 0;">
-      <a href="{self.dream_base_url}/dreams#{dream_id}" 
+      <a href="{self.dream_base_url}/dreams#{dream_id}"
          style="background-color: #4299e1; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
         View Dream in Library
       </a>
     </div>
-    
+
     <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #e2e8f0; color: #718096; font-size: 14px;">
       <p>Dream ID: {dream_id}</p>
-      <p>Recorded: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
+      <p>Recorded: {recorded_at(dream_data)}</p>
       <p><a href="{self.dream_base_url}/media/video/{video_filename}" style="color: #4299e1;">Direct video link</a></p>
     </div>
+"""
+
+    def _html(self, dreams):
+        heading = "New Dream Recorded" if len(dreams) == 1 else f"{len(dreams)} New Dreams Recorded"
+        return f"""
+<html>
+  <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+    <h2 style="color: #4a5568;">🌙 {heading}</h2>
+    {''.join(self._dream_html(dream) for dream in dreams)}
   </body>
 </html>
 """
-            
-            # Attach parts
-            part1 = MIMEText(text, 'plain')
-            part2 = MIMEText(html, 'html')
-            msg.attach(part1)
-            msg.attach(part2)
-            
-            # Send the message
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                
-                # Handle both string and list of recipients
-                recipients = self.to_emails if isinstance(self.to_emails, list) else [self.to_emails]
-                server.send_message(msg, from_addr=self.from_email, to_addrs=recipients)
-                
-            logger.info(f"Email notification sent successfully for dream {dream_id}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send email notification: {str(e)}")
-            return False
@@ -0,0 +1,200 @@
+import json
+import time
+import gevent
+from gevent.queue import Queue
+from functions.config_loader import get_config
+from functions.dream_db import get_connection_pool
+from functions.metrics import JOB_STAGE_SECONDS
+
+class PermanentJobError(Exception):
+    """Raised by a stage for a failure retrying can't fix; the job fails without further attempts."""
+
+class JobQueue:
+    """A persistent, staged job queue stored in SQLite next to the dreams table.
+
+    Stages run in the order they are added. Each stage has a fixed number of
+    worker greenlets, which caps how many jobs can be in that stage at once.
+    A job's stage and payload are saved after every step, so jobs that were
+    pending or running when the service stopped are resumed on `start`.
+
+    A stage that raises is retried up to `max_attempts` times in all, after
+    `retry_delay` seconds and then twice as long each time, before the job is
+    marked failed. Finished and failed jobs are deleted after `retention_days`.
+    """
+
+    def __init__(self, db_path=None, logger=None, on_error=None, max_attempts=3, retry_delay=30.0,
+                 retention_days=7):
+        if db_path is None:
+            db_path = get_config()['DB_PATH']
+        self.db_path = db_path
+        self._pool = get_connection_pool(db_path)
+        self.logger = logger
+        self.on_error = on_error  # Called with (payload, exception) when a job fails for good
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_delay = float(retry_delay)
+        self.retention_days = retention_days
+        self._stages = []  # (name, handler, concurrency) in pipeline order
+        self._queues = {}
+        self._workers = []
+        self._init_db()
+
+    def _init_db(self):
+        """Create the jobs table if it doesn't exist."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    stage TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+
+    def add_stage(self, name, handler, concurrency=1):
+        """Register a stage. `handler(payload)` returns the payload for the next stage."""
+        self._stages.append((name, handler, max(1, int(concurrency))))
+        self._queues[name] = Queue()
+
+    def start(self):
+        """Spawn the stage workers and resume unfinished jobs."""
+        for name, handler, concurrency in self._stages:
+            for _ in range(concurrency):
+                self._workers.append(gevent.spawn(self._worker, name, handler))
+        pruned = self.prune()
+        resumed = self.resume()
+        if self.logger:
+            self.logger.info(
+                f"Job queue started with {len(self._workers)} workers, resumed {resumed} jobs, pruned {pruned}"
+            )
+
+    def enqueue(self, payload):
+        """Add a job at the first stage and return its id."""
+        first_stage = self._stages[0][0]
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT INTO jobs (stage, status, payload) VALUES (?, ?, ?)',
+                (first_stage, 'pending', json.dumps(payload))
+            )
+            conn.commit()
+            job_id = cursor.lastrowid
+        self._queues[first_stage].put(job_id)
+        if self.logger:
+            self.logger.info(f"Queued job {job_id} at stage {first_stage}")
+        return job_id
+
+    def resume(self):
+        """Requeue jobs left pending or running by a previous run. Returns how many were queued."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, stage FROM jobs WHERE status IN ('pending', 'running') ORDER BY id")
+            rows = cursor.fetchall()
+            cursor.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+            conn.commit()
+        count = 0
+        for row in rows:
+            if row['stage'] in self._queues:
+                self._queues[row['stage']].put(row['id'])
+                count += 1
+            elif self.logger:
+                self.logger.warning(f"Job {row['id']} is at unknown stage {row['stage']}, skipping")
+        return count
+
+    def prune(self):
+        """Delete completed and failed jobs last updated more than `retention_days` ago. Returns how many."""
+        if not self.retention_days:
+            return 0
+        with self._pool.connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < datetime('now', ?)",
+                (f'-{float(self.retention_days)} days',)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def get_job(self, job_id):
+        """Get a single job by ID, with its payload decoded."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            if row:
+                job = dict(row)
+                job['payload'] = json.loads(job['payload'])
+                return job
+            return None
+
+    def _next_stage(self, name):
+        names = [stage[0] for stage in self._stages]
+        index = names.index(name) + 1
+        return names[index] if index < len(names) else None
+
+    def _update(self, job_id, **fields):
+        if 'payload' in fields:
+            fields['payload'] = json.dumps(fields['payload'])
+        set_clauses = ', '.join(f"{key} = ?" for key in fields)
+        with self._pool.connection() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {set_clauses}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                list(fields.values()) + [job_id]
+            )
+            conn.commit()
+
+    def _worker(self, name, handler):
+        queue = self._queues[name]
+        while True:
+            job_id = queue.get()
+            try:
+                self._run(job_id, name, handler)
+            except Exception as e:
+                # Never let a bookkeeping error kill the worker
+                if self.logger:
+                    self.logger.error(f"Job queue worker for {name} failed on job {job_id}: {str(e)}")
+
+    def _run(self, job_id, name, handler):
+        job = self.get_job(job_id)
+        # Skip stale queue entries, e.g. a job requeued twice
+        if job is None or job['status'] != 'pending' or job['stage'] != name:
+            return
+        self._update(job_id, status='running', attempts=job['attempts'] + 1)
+        if self.logger:
+            self.logger.info(f"Job {job_id}: running stage {name}")
+        start = time.perf_counter()
+        try:
+            payload = handler(job['payload'])
+        except Exception as e:
+            JOB_STAGE_SECONDS.observe(time.perf_counter() - start, stage=name, outcome='failed')
+            attempts = job['attempts'] + 1
+            if attempts < self.max_attempts and not isinstance(e, PermanentJobError):
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                self._update(job_id, status='pending', error=str(e))
+                gevent.spawn_later(delay, self._queues[name].put, job_id)
+                if self.logger:
+                    self.logger.warning(
+                        f"Job {job_id} failed at stage {name} (attempt {attempts} of {self.max_attempts}), "
+                        f"retrying in {delay:.0f}s: {str(e)}"
+                    )
+                return
+            self._update(job_id, status='failed', error=str(e))
+            if self.logger:
+                self.logger.error(f"Job {job_id} failed at stage {name} after {attempts} attempts: {str(e)}")
+            if self.on_error:
+                self.on_error(job['payload'], e)
+            return
+        JOB_STAGE_SECONDS.observe(time.perf_counter() - start, stage=name, outcome='completed')
+        next_stage = self._next_stage(name)
+        if next_stage is None:
+            self._update(job_id, payload=payload, status='completed')
+            if self.logger:
+                self.logger.info(f"Job {job_id} completed")
+            self.prune()
+        else:
+            # Each stage gets its own max_attempts
+            self._update(job_id, payload=payload, stage=next_stage, status='pending', attempts=0)
+            self._queues[next_stage].put(job_id)
@@ -0,0 +1,226 @@
+import json
+import time
+import sqlite3
+import gevent
+from gevent.event import Event
+from functions.config_loader import get_config
+from functions.dream_db import get_connection_pool
+from functions.email_notifier import EmailNotifier
+from functions.resend_email_notifier import ResendEmailNotifier
+from functions.simple_notifier import SimpleNotifier
+
+# Longest wait between delivery attempts; retries back off from NOTIFICATION_RETRY_DELAY up to this
+MAX_RETRY_DELAY = 3600
+# Pause after an unexpected error in the delivery loop (e.g. a locked database) before trying again
+LOOP_ERROR_DELAY = 5
+
+def configured_notifiers(config):
+    """The notifiers enabled in `config`, by channel name."""
+    notifiers = {}
+    if config.get('EMAIL_NOTIFICATIONS_ENABLED', False):
+        if config.get('RESEND_API_KEY'):
+            notifiers['resend'] = ResendEmailNotifier(config)
+        else:
+            notifiers['email'] = EmailNotifier(config)
+    if config.get('SIMPLE_NOTIFICATIONS_ENABLED', False):
+        notifiers['simple'] = SimpleNotifier(config)
+    return notifiers
+
+class NotificationOutbox:
+    """Persistent outbox for new-dream notifications, delivered from one background greenlet.
+
+    `enqueue` only writes a row per channel to SQLite, so the dream pipeline
+    never waits on SMTP or HTTP. A notification is held for
+    NOTIFICATION_DIGEST_WINDOW seconds, and everything pending for its
+    channel by then goes out as one digest. Failed deliveries are retried
+    with exponential backoff until NOTIFICATION_MAX_ATTEMPTS, and pending
+    rows survive a restart. Sent and failed rows are deleted after
+    NOTIFICATION_RETENTION_DAYS. Notifiers are objects with `send_dreams(dreams)`,
+    which raises on failure, and optionally `close()`.
+    """
+
+    def __init__(self, db_path=None, logger=None, notifiers=None):
+        if db_path is None:
+            db_path = get_config()['DB_PATH']
+        self.db_path = db_path
+        self._pool = get_connection_pool(db_path)
+        self.logger = logger
+        self.notifiers = configured_notifiers(get_config()) if notifiers is None else notifiers
+        self._wakeup = Event()
+        self._worker = None
+        self._init_db()
+
+    def _init_db(self):
+        """Create the notifications table if it doesn't exist."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS notifications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    dream TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER DEFAULT 0,
+                    due_at REAL NOT NULL,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    sent_at TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_notifications_status ON notifications (status, channel)')
+
+    def start(self):
+        """Start delivering, including anything left pending by a previous run."""
+        self._worker = gevent.spawn(self._deliver_loop)
+        if self.logger:
+            self.logger.info(f"Notification outbox started for channels: {', '.join(self.notifiers) or 'none'}")
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.kill()
+            self._worker = None
+        self._close_notifiers()
+
+    def reload_notifiers(self, config):
+        """Rebuild the notifiers from `config`, e.g. after config.json changes."""
+        self._close_notifiers()
+        self.notifiers = configured_notifiers(config)
+        self._wakeup.set()
+
+    def _close_notifiers(self):
+        for channel, notifier in self.notifiers.items():
+            if not hasattr(notifier, 'close'):
+                continue
+            try:
+                notifier.close()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"Error closing {channel} notifier: {str(e)}")
+
+    def enqueue(self, dream_data):
+        """Queue a notification about `dream_data` on every channel. Returns the number queued."""
+        if not self.notifiers:
+            return 0
+        due_at = time.time() + float(get_config().get('NOTIFICATION_DIGEST_WINDOW', 60))
+        with self._pool.connection() as conn:
+            conn.executemany(
+                'INSERT INTO notifications (channel, dream, status, due_at) VALUES (?, ?, ?, ?)',
+                [(channel, json.dumps(dream_data), 'pending', due_at) for channel in self.notifiers]
+            )
+        self._wakeup.set()
+        return len(self.notifiers)
+
+    def get_notifications(self, status=None):
+        """List stored notifications, optionally filtered by status, oldest first."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            if status:
+                cursor.execute('SELECT * FROM notifications WHERE status = ? ORDER BY id', (status,))
+            else:
+                cursor.execute('SELECT * FROM notifications ORDER BY id')
+            return [dict(row) for row in cursor.fetchall()]
+
+    def prune(self):
+        """Delete sent and failed notifications older than NOTIFICATION_RETENTION_DAYS. Returns how many."""
+        retention_days = float(get_config().get('NOTIFICATION_RETENTION_DAYS', 7))
+        if not retention_days:
+            return 0
+        with self._pool.connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM notifications WHERE status IN ('sent', 'failed') AND created_at < datetime('now', ?)",
+                (f'-{retention_days} days',)
+            )
+            return cursor.rowcount
+
+    def retry_delay(self, attempts):
+        """Seconds to wait before retrying a digest that has failed `attempts` times."""
+        initial = float(get_config().get('NOTIFICATION_RETRY_DELAY', 30))
+        return min(MAX_RETRY_DELAY, initial * 2 ** (attempts - 1))
+
+    def _pending(self):
+        """Pending rows grouped by channel, with the time each channel's digest is due."""
+        channels = {}
+        for row in self.get_notifications(status='pending'):
+            rows, due_at = channels.get(row['channel'], ([], float('inf')))
+            rows.append(row)
+            channels[row['channel']] = (rows, min(due_at, row['due_at']))
+        return channels
+
+    def _deliver_loop(self):
+        self._prune_safely()
+        while True:
+            try:
+                self._wakeup.clear()
+                now = time.time()
+                for channel, (rows, due_at) in self._pending().items():
+                    if due_at <= now:
+                        self._deliver(channel, rows)
+                # Failed digests were rescheduled, so look again for the next due time
+                upcoming = [due_at for rows, due_at in self._pending().values()]
+            except Exception as e:
+                # Never let a database error kill the only delivery greenlet
+                if self.logger:
+                    self.logger.error(f"Notification outbox error, retrying in {LOOP_ERROR_DELAY}s: {str(e)}")
+                gevent.sleep(LOOP_ERROR_DELAY)
+                continue
+            self._wakeup.wait(max(0, min(upcoming) - time.time()) if upcoming else None)
+
+    def _prune_safely(self):
+        try:
+            pruned = self.prune()
+        except sqlite3.Error as e:
+            if self.logger:
+                self.logger.warning(f"Could not prune old notifications: {str(e)}")
+            return
+        if pruned and self.logger:
+            self.logger.info(f"Pruned {pruned} old notifications")
+
+    def _deliver(self, channel, rows):
+        ids = [row['id'] for row in rows]
+        placeholders = ', '.join('?' * len(ids))
+        notifier = self.notifiers.get(channel)
+        if notifier is None:
+            # The channel was turned off or replaced (e.g. SMTP by Resend); retrying can't help
+            with self._pool.connection() as conn:
+                conn.execute(
+                    f"UPDATE notifications SET status = 'failed', attempts = attempts + 1, error = ? "
+                    f"WHERE id IN ({placeholders})",
+                    [f"Notification channel {channel} is not configured"] + ids
+                )
+            if self.logger:
+                self.logger.warning(f"Dropped {len(rows)} notifications for removed channel {channel}")
+            return
+        try:
+            notifier.send_dreams([json.loads(row['dream']) for row in rows])
+        except Exception as e:
+            # Each row counts its own attempts, so a dream queued moments ago isn't
+            # given up with an older one; the digest backs off as its oldest row does
+            max_attempts = int(get_config().get('NOTIFICATION_MAX_ATTEMPTS', 8))
+            attempts = [row['attempts'] + 1 for row in rows]
+            delay = self.retry_delay(max(attempts))
+            due_at = time.time() + delay
+            with self._pool.connection() as conn:
+                conn.executemany(
+                    'UPDATE notifications SET status = ?, attempts = ?, due_at = ?, error = ? WHERE id = ?',
+                    [('failed' if count >= max_attempts else 'pending', count, due_at, str(e), row['id'])
+                     for row, count in zip(rows, attempts)]
+                )
+            if self.logger:
+                given_up = sum(count >= max_attempts for count in attempts)
+                if given_up == len(rows):
+                    retry = 'giving up'
+                elif given_up:
+                    retry = f"giving up on {given_up} of {len(rows)}, retrying the rest in {delay:.0f}s"
+                else:
+                    retry = f"retrying in {delay:.0f}s"
+                self.logger.error(f"Notification via {channel} failed (attempt {max(attempts)}), {retry}: {str(e)}")
+            return
+        with self._pool.connection() as conn:
+            conn.execute(
+                f"UPDATE notifications SET status = 'sent', sent_at = CURRENT_TIMESTAMP, error = NULL "
+                f"WHERE id IN ({placeholders})",
+                ids
+            )
+        if self.logger:
+            self.logger.info(f"Notification via {channel} sent for {len(rows)} dreams")
+        self._prune_safely()
@@ -0,0 +1,106 @@
+import array
+import bisect
+import contextlib
+import mmap
+import tempfile
+
+# Keep this much of a recording in RAM before moving it to a temporary file.
+# Ten minutes of 128 kbit/s WebM/Opus is about 10 MB.
+DEFAULT_MEMORY_LIMIT = 8 * 1024 * 1024
+
+class RecordingBuffer:
+    """The encoded chunks of one recording, in RAM up to `memory_limit` bytes, then on disk.
+
+    Chunks are stored back to back in the order they arrive. Each one is
+    indexed by its sequence number, so a late chunk that fills a gap is put in
+    its place without moving any bytes. Once the recording outgrows
+    `memory_limit`, everything is written to an unlinked temporary file in
+    `directory` and later chunks go straight there, so memory use stays flat
+    however long the client keeps sending.
+
+    `chunks` and `write_to` read the recording back in sequence order as
+    memoryviews over the in-memory bytes or a read-only mmap of the file,
+    without joining it into one bytes object.
+    """
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, directory=None):
+        self.memory_limit = memory_limit
+        self.directory = directory
+        self.size = 0
+        self._memory = bytearray()
+        self._file = None
+        # Sort key (sequence number, or arrival order), offset and length of each
+        # chunk, in read order; arrays keep an hour of 100 ms chunks under a megabyte
+        self._keys = array.array('q')
+        self._offsets = array.array('q')
+        self._lengths = array.array('q')
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def spilled(self):
+        """True once the recording has moved to a temporary file."""
+        return self._file is not None
+
+    def append(self, data, seq=None):
+        """Store a chunk. Numbered chunks are read back in `seq` order, the rest in arrival order."""
+        key = seq if seq is not None else len(self._keys)
+        offset = self.size
+        if self._file is None and self.size + len(data) > self.memory_limit:
+            self._spill()
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._memory += data
+        self.size += len(data)
+        if not self._keys or key >= self._keys[-1]:
+            self._keys.append(key)
+            self._offsets.append(offset)
+            self._lengths.append(len(data))
+        else:
+            position = bisect.bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._offsets.insert(position, offset)
+            self._lengths.insert(position, len(data))
+
+    def _spill(self):
+        self._file = tempfile.TemporaryFile(prefix='recording_', suffix='.webm', dir=self.directory)
+        self._file.write(self._memory)
+        self._memory = bytearray()
+
+    @contextlib.contextmanager
+    def _view(self):
+        if self._file is None:
+            with memoryview(self._memory) as view:
+                yield view
+            return
+        self._file.flush()
+        if self.size == 0:
+            yield memoryview(b'')
+            return
+        with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                yield view
+
+    def chunks(self):
+        """Yield the chunks in order as memoryviews. Each view is released when the next is requested."""
+        with self._view() as view:
+            for offset, length in zip(self._offsets, self._lengths):
+                with view[offset:offset + length] as chunk:
+                    yield chunk
+
+    def write_to(self, f):
+        """Write the recording to the binary file object `f`. Returns the number of bytes written."""
+        for chunk in self.chunks():
+            f.write(chunk)
+        return self.size
+
+    def close(self):
+        """Free the memory and delete the temporary file, if any."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._memory = bytearray()
+        del self._keys[:], self._offsets[:], self._lengths[:]
+        self.size = 0
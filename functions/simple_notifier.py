@@ -1,7 +1,7 @@
 import json
 import requests
 import logging
-from datetime import datetime
+from functions.email_notifier import recorded_at
 
 logger = logging.getLogger(__name__)
 
@@ -11,69 +11,95 @@ class SimpleNotifier:
         self.webhook_url = config.get('NOTIFICATION_WEBHOOK_URL', '')
         self.notification_method = config.get('NOTIFICATION_METHOD', 'webhook')  # webhook, ntfy, or pushover
         self.dream_base_url = config.get('DREAM_BASE_URL', 'https://dreams.[YOUR-DOMAIN]')
-        
+        self.timeout = float(config.get('NOTIFICATION_TIMEOUT', 10))
+        self.session = requests.Session()  # Reuses the connection between notifications
+
     def send_dream_notification(self, dream_data):
         """Send notification for a new dream using simple methods"""
         if not self.enabled:
             logger.info("Simple notifications are disabled")
             return False
-            
         try:
-            dream_id = dream_data.get('id', 'unknown')
-            transcription = dream_data.get('transcription', 'No transcription available')
-            video_filename = dream_data.get('video_filename', '')
-            timestamp = datetime.now().strftime('%B %d, %Y at %I:%M %p')
-            
-            # Prepare notification content
-            title = f"New Dream Recorded - {timestamp}"
-            message = f"{transcription}\n\nView: {self.dream_base_url}/dreams#{dream_id}"
-            
-            if self.notification_method == 'ntfy':
-                # ntfy.sh - simple push notifications (no email needed!)
-                response = requests.post(
-                    f"https://ntfy.sh/{self.webhook_url}",
-                    data=message.encode('utf-8'),
-                    headers={
-                        "Title": title,
-                        "Priority": "default",
-                        "Tags": "moon,sparkles",
-                        "Click": f"{self.dream_base_url}/dreams#{dream_id}"
-                    }
-                )
-                logger.info(f"Sent ntfy notification: {response.status_code}")
-                return response.status_code == 200
-                
-            elif self.notification_method == 'webhook':
-                # Generic webhook (Discord, Slack, Make.com, Zapier, etc.)
-                payload = {
-                    "title": title,
-                    "description": transcription,
-                    "url": f"{self.dream_base_url}/dreams#{dream_id}",
-                    "video_url": f"{self.dream_base_url}/media/video/{video_filename}",
-                    "timestamp": timestamp,
-                    "dream_id": dream_id
-                }
-                
-                response = requests.post(self.webhook_url, json=payload)
-                logger.info(f"Sent webhook notification: {response.status_code}")
-                return response.status_code < 300
-                
-            elif self.notification_method == 'pushover':
-                # Pushover - simple mobile notifications
-                response = requests.post(
-                    "https://api.pushover.net/1/messages.json",
-                    data={
-                        "token": self.webhook_url.split(':')[0],  # app token
-                        "user": self.webhook_url.split(':')[1],   # user key
-                        "title": title,
-                        "message": message,
-                        "url": f"{self.dream_base_url}/dreams#{dream_id}",
-                        "url_title": "View Dream"
-                    }
-                )
-                logger.info(f"Sent Pushover notification: {response.status_code}")
-                return response.status_code == 200
-                
+            self.send_dreams([dream_data])
+            return True
         except Exception as e:
             logger.error(f"Failed to send notification: {str(e)}")
             return False
+
+    def send_dreams(self, dreams):
+        """Send one notification covering `dreams`. Raises if it could not be sent."""
+        latest = dreams[-1]
+        if len(dreams) == 1:
+            title = f"New Dream Recorded - {recorded_at(latest)}"
+            message = f"{latest.get('transcription', 'No transcription available')}\n\nView: {self._dream_url(latest)}"
+            click_url = self._dream_url(latest)
+        else:
+            title = f"{len(dreams)} New Dreams Recorded - {recorded_at(latest)}"
+            message = '\n\n'.join(
+                f"{dream.get('transcription', 'No transcription available')}\nView: {self._dream_url(dream)}"
+                for dream in dreams
+            )
+            click_url = f"{self.dream_base_url}/dreams"
+
+        if self.notification_method == 'ntfy':
+            # ntfy.sh - simple push notifications (no email needed!)
+            response = self.session.post(
+                f"https://ntfy.sh/{self.webhook_url}",
+                data=message.encode('utf-8'),
+                headers={
+                    "Title": title,
+                    "Priority": "default",
+                    "Tags": "moon,sparkles",
+                    "Click": click_url
+                },
+                timeout=self.timeout
+            )
+            ok = response.status_code == 200
+
+        elif self.notification_method == 'webhook':
+            # Generic webhook (Discord, Slack, Make.com, Zapier, etc.)
+            payload = self._webhook_payload(latest)
+            payload['title'] = title
+            if len(dreams) > 1:
+                # Digest: the latest dream's fields as before, plus every dream in order
+                payload['dreams'] = [self._webhook_payload(dream) for dream in dreams]
+            response = self.session.post(self.webhook_url, json=payload, timeout=self.timeout)
+            ok = response.status_code < 300
+
+        elif self.notification_method == 'pushover':
+            # Pushover - simple mobile notifications
+            response = self.session.post(
+                "https://api.pushover.net/1/messages.json",
+                data={
+                    "token": self.webhook_url.split(':')[0],  # app token
+                    "user": self.webhook_url.split(':')[1],   # user key
+                    "title": title,
+                    "message": message,
+                    "url": click_url,
+                    "url_title": "View Dream"
+                },
+                timeout=self.timeout
+            )
+            ok = response.status_code == 200
+        else:
+            raise ValueError(f"Unknown notification method: {self.notification_method}")
+
+        logger.info(f"Sent {self.notification_method} notification: {response.status_code}")
+        if not ok:
+            raise RuntimeError(f"{self.notification_method} notification failed: {response.status_code}")
+
+    def close(self):
+        self.session.close()
+
+    def _dream_url(self, dream_data):
+        return f"{self.dream_base_url}/dreams#{dream_data.get('id', 'unknown')}"
+
+    def _webhook_payload(self, dream_data):
+        return {
+            "title": f"New Dream Recorded - {recorded_at(dream_data)}",
+            "description": dream_data.get('transcription', 'No transcription available'),
+            "url": self._dream_url(dream_data),
+            "video_url": f"{self.dream_base_url}/media/video/{dream_data.get('video_filename', '')}",
+            "timestamp": recorded_at(dream_data),
+            "dream_id": dream_data.get('id', 'unknown')
+        }
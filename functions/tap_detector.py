@@ -0,0 +1,73 @@
+class TapStateMachine:
+    """Turns timestamped button edges into single, double and long taps.
+
+    Pure logic with no GPIO or clock access, so recorded traces can be replayed
+    through it. Feed every level change to `edge`, and call `tick` when
+    `next_deadline` comes due: long taps and single taps are decided by time
+    passing, not by an edge. Both return the taps detected, in order.
+    Level 1 means pressed, 0 released (this hardware reads inverted).
+    """
+
+    # Presses older than this are forgotten when looking for a double tap
+    PRESS_MEMORY = 3.0
+
+    def __init__(self, double_tap_window=0.8, long_tap_duration=3.0, debounce=0.05):
+        self.double_tap_window = double_tap_window
+        self.long_tap_duration = long_tap_duration
+        self.debounce = debounce
+        self.level = 0  # Debounced level
+        self.raw_level = 0  # Latest level seen, possibly still bouncing
+        self.last_change = float('-inf')
+        self.press_times = []  # Start times of recent presses
+        self.current_press_start = None
+        self.long_tap_detected = False
+
+    def edge(self, level, timestamp):
+        """Record a level change at `timestamp` (seconds) and return any taps it completes."""
+        self.raw_level = level
+        return self.tick(timestamp)
+
+    def tick(self, timestamp):
+        """Return the taps that are due by `timestamp`."""
+        taps = []
+        if self.raw_level != self.level and timestamp - self.last_change > self.debounce:
+            self.last_change = timestamp
+            self.level = self.raw_level
+            if self.level == 1:
+                taps.extend(self._press(timestamp))
+            else:
+                self.current_press_start = None
+        if self.current_press_start is not None and not self.long_tap_detected:
+            if timestamp - self.current_press_start >= self.long_tap_duration:
+                taps.append('long_tap')
+                self.long_tap_detected = True
+                self.press_times = []
+        if len(self.press_times) == 1 and self.current_press_start is None and not self.long_tap_detected:
+            if timestamp - self.press_times[0] > self.double_tap_window:
+                taps.append('single_tap')
+                self.press_times = []
+        return taps
+
+    def next_deadline(self):
+        """The time `tick` must next be called at, or None to wait for the next edge."""
+        deadlines = []
+        if self.raw_level != self.level:
+            # A change that arrived inside the debounce window is applied once it ends
+            deadlines.append(self.last_change + self.debounce)
+        if self.current_press_start is not None and not self.long_tap_detected:
+            deadlines.append(self.current_press_start + self.long_tap_duration)
+        if len(self.press_times) == 1 and self.current_press_start is None and not self.long_tap_detected:
+            deadlines.append(self.press_times[0] + self.double_tap_window)
+        # Thresholds are strict, so the tick lands just past them
+        return min(deadlines) + 1e-3 if deadlines else None
+
+    def _press(self, timestamp):
+        self.current_press_start = timestamp
+        self.long_tap_detected = False
+        self.press_times.append(timestamp)
+        self.press_times = [t for t in self.press_times if timestamp - t < self.PRESS_MEMORY]
+        if len(self.press_times) >= 2 and self.press_times[-1] - self.press_times[-2] < self.double_tap_window:
+            self.press_times = []
+            self.current_press_start = None
+            return ['double_tap']
+        return []
@@ -0,0 +1,149 @@
+import wave
+import numpy as np
+
+# Analysis frame length; speech is roughly stationary over 20-40 ms
+FRAME_SECONDS = 0.03
+# Frames are read from the WAV this many seconds at a time, so memory stays flat on long recordings
+READ_BLOCK_SECONDS = 1.0
+# A frame is voiced when it is this far above the noise floor (the 10th percentile of frame energy)
+VOICED_MARGIN_DB = 10.0
+# Fricatives ("s", "f") are quiet but noisy: frames this far above the floor with a zero-crossing
+# rate over UNVOICED_ZCR count as speech too
+UNVOICED_MARGIN_DB = 5.0
+UNVOICED_ZCR = 0.3
+# Nothing quieter than this is speech, however quiet the room
+MIN_SPEECH_DB = -55.0
+# Runs of speech frames shorter than this are clicks and bumps, not words
+MIN_SPEECH_RUN_SECONDS = 0.09
+
+class VoiceActivityDetector:
+    """Frame-level voice activity detection over 16-bit PCM, fed incrementally.
+
+    `feed` takes samples as they are read and keeps only two numbers per
+    30 ms frame, the energy in dBFS and the zero-crossing rate, both
+    computed with NumPy over whole blocks. `speech_mask` then classifies the
+    frames against the recording's own noise floor, so no calibration is
+    needed for a quiet bedroom or a humming fan.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * FRAME_SECONDS))
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._energy = []
+        self._zcr = []
+
+    def feed(self, samples):
+        """Add mono int16 samples to the analysis."""
+        samples = np.concatenate([self._remainder, np.asarray(samples, dtype=np.float32) / 32768.0])
+        count = len(samples) // self.frame_length
+        frames = samples[:count * self.frame_length].reshape(count, self.frame_length)
+        self._remainder = samples[count * self.frame_length:]
+        if count == 0:
+            return
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        self._energy.append(20 * np.log10(rms + 1e-10))
+        self._zcr.append(np.mean(np.diff(np.signbit(frames).astype(np.int8), axis=1) != 0, axis=1))
+
+    def features(self):
+        """(energy in dBFS, zero-crossing rate) per frame, as arrays."""
+        if not self._energy:
+            return np.zeros(0), np.zeros(0)
+        return np.concatenate(self._energy), np.concatenate(self._zcr)
+
+    def speech_mask(self):
+        """A boolean array with True for each frame that holds speech."""
+        energy, zcr = self.features()
+        if len(energy) == 0:
+            return np.zeros(0, dtype=bool)
+        floor = np.percentile(energy, 10)
+        voiced = energy > max(floor + VOICED_MARGIN_DB, MIN_SPEECH_DB)
+        unvoiced = (energy > max(floor + UNVOICED_MARGIN_DB, MIN_SPEECH_DB)) & (zcr > UNVOICED_ZCR)
+        return drop_short_runs(voiced | unvoiced, int(round(MIN_SPEECH_RUN_SECONDS / FRAME_SECONDS)))
+
+def runs(mask):
+    """(start, end) index pairs of the runs of True in a boolean array, end exclusive."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+def drop_short_runs(mask, min_length):
+    mask = mask.copy()
+    for start, end in runs(mask):
+        if end - start < min_length:
+            mask[start:end] = False
+    return mask
+
+def keep_ranges(mask, frame_length, total_samples, padding_frames, max_gap_frames):
+    """Sample ranges to keep: the speech runs widened by `padding_frames`, with the
+    silence before the first and after the last dropped and every pause longer than
+    `max_gap_frames` shortened to it (0 leaves pauses alone)."""
+    segments = runs(mask)
+    if not segments:
+        return []
+    kept = []
+    for start, end in segments:
+        start, end = max(0, start - padding_frames), min(len(mask), end + padding_frames)
+        if kept and start <= kept[-1][1]:
+            kept[-1][1] = max(kept[-1][1], end)
+        elif kept and max_gap_frames and start - kept[-1][1] > max_gap_frames:
+            # Keep half the allowed pause on each side of the cut
+            kept[-1][1] += max_gap_frames // 2
+            kept.append([start - (max_gap_frames - max_gap_frames // 2), end])
+        elif kept:
+            kept[-1][1] = end
+        else:
+            kept.append([start, end])
+    return [(int(start * frame_length), int(min(end * frame_length, total_samples))) for start, end in kept]
+
+def _rewind(source):
+    # File objects are read from the start each time; paths are opened afresh
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+def analyse_wav(path, padding=0.3, max_gap=1.5):
+    """Run voice activity detection over a 16-bit WAV file, given as a path or file object.
+
+    Returns a dict with the sample `ranges` worth keeping (see keep_ranges),
+    `speech_seconds` (frames classified as speech, before padding),
+    `duration` and `kept_seconds` of the recording, and its `sample_rate`
+    and `channels`.
+    """
+    with wave.open(_rewind(path), 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit PCM, got {wav.getsampwidth() * 8}-bit")
+        channels, sample_rate, total = wav.getnchannels(), wav.getframerate(), wav.getnframes()
+        detector = VoiceActivityDetector(sample_rate)
+        block = max(1, int(sample_rate * READ_BLOCK_SECONDS))
+        while True:
+            data = wav.readframes(block)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype='<i2')
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1)
+            detector.feed(samples)
+    mask = detector.speech_mask()
+    frame_seconds = detector.frame_length / sample_rate
+    ranges = keep_ranges(
+        mask, detector.frame_length, total,
+        padding_frames=int(round(padding / frame_seconds)),
+        max_gap_frames=int(round(max_gap / frame_seconds)),
+    )
+    return {
+        'ranges': ranges,
+        'speech_seconds': float(mask.sum() * frame_seconds),
+        'duration': total / sample_rate,
+        'kept_seconds': sum(end - start for start, end in ranges) / sample_rate,
+        'sample_rate': sample_rate,
+        'channels': channels,
+    }
+
+def read_ranges(path, ranges):
+    """The raw PCM bytes of the given sample ranges of a WAV file, joined."""
+    chunks = []
+    with wave.open(_rewind(path), 'rb') as wav:
+        for start, end in ranges:
+            wav.setpos(start)
+            chunks.append(wav.readframes(end - start))
+    return b''.join(chunks)
@@ -0,0 +1,206 @@
+import json
+import time
+import gevent
+from gevent.event import AsyncResult, Event
+from functions.config_loader import get_config
+from functions.dream_db import get_connection_pool
+from functions.video import veo_client, submit_video, poll_video, save_generated_video
+
+# Each poll waits this much longer than the last, up to VEO3_POLL_INTERVAL
+POLL_BACKOFF = 1.5
+
+class VeoOperationTracker:
+    """Tracks every in-flight VEO 3 generation and polls them all from one greenlet.
+
+    Operations are saved in SQLite as soon as they are submitted, keyed by a name
+    the caller chooses, so after a restart `start` resumes polling them and a
+    repeated `submit` with the same key reattaches instead of paying for a new
+    generation. Polls begin VEO3_POLL_INITIAL_INTERVAL seconds apart and back off
+    to VEO3_POLL_INTERVAL; an operation fails once it has run for
+    VEO3_POLL_INTERVAL * VEO3_MAX_POLL_ATTEMPTS seconds.
+    """
+
+    def __init__(self, db_path=None, logger=None, on_progress=None, client=None):
+        if db_path is None:
+            db_path = get_config()['DB_PATH']
+        self.db_path = db_path
+        self._pool = get_connection_pool(db_path)
+        self.logger = logger
+        self.on_progress = on_progress  # Called with the operation dict after each poll
+        self._client = client
+        self._operations = {}  # key -> operation dict, for operations still being polled
+        self._wakeup = Event()
+        self._poller = None
+        self._init_db()
+
+    def _init_db(self):
+        """Create the veo_operations table if it doesn't exist."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS veo_operations (
+                    key TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    meta TEXT,
+                    filename TEXT,
+                    polls INTEGER DEFAULT 0,
+                    error TEXT,
+                    submitted_at REAL NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = veo_client()
+        return self._client
+
+    def start(self):
+        """Resume polling operations left pending by a previous run and start the poller."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM veo_operations WHERE status = 'pending'")
+            rows = [dict(row) for row in cursor.fetchall()]
+        for row in rows:
+            if row['key'] not in self._operations:
+                self._track(row)
+        self._poller = gevent.spawn(self._poll_loop)
+        if self.logger:
+            self.logger.info(f"VEO operation tracker started, resumed {len(rows)} operations")
+
+    def stop(self):
+        """Stop polling. Pending operations are resumed on the next start."""
+        if self._poller is not None:
+            self._poller.kill()
+            self._poller = None
+
+    def submit(self, key, prompt, meta=None):
+        """Start generating a video for `prompt` unless `key` already has an operation.
+
+        Returns an AsyncResult that resolves to the downloaded video's filename.
+        """
+        operation = self._operations.get(key)
+        if operation is not None:
+            return operation['result']
+        row = self.get_operation(key)
+        if row and row['status'] == 'pending':
+            return self._track(row)['result']
+        if row and row['status'] == 'completed':
+            result = AsyncResult()
+            result.set(row['filename'])
+            return result
+        # New key, or a failed operation being retried
+        name = submit_video(self.client, prompt, self.logger).name
+        with self._pool.connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO veo_operations (key, name, prompt, status, meta, submitted_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, name, prompt, 'pending', json.dumps(meta or {}), time.time())
+            )
+        return self._track(self.get_operation(key))['result']
+
+    def get_operation(self, key):
+        """Get a stored operation by key, with its meta decoded."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM veo_operations WHERE key = ?', (key,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        operation = dict(row)
+        operation['meta'] = json.loads(operation['meta'] or '{}')
+        return operation
+
+    def poll_delay(self, polls):
+        """Seconds to wait before the next poll of an operation already polled `polls` times."""
+        initial = float(get_config().get('VEO3_POLL_INITIAL_INTERVAL', 2))
+        longest = float(get_config()['VEO3_POLL_INTERVAL'])
+        return min(longest, initial * POLL_BACKOFF ** polls)
+
+    def _track(self, row):
+        operation = dict(row)
+        if isinstance(operation['meta'], str):
+            operation['meta'] = json.loads(operation['meta'] or '{}')
+        operation['result'] = AsyncResult()
+        operation['next_poll_at'] = time.time() + self.poll_delay(operation['polls'])
+        self._operations[operation['key']] = operation
+        self._wakeup.set()
+        return operation
+
+    def _update(self, key, **fields):
+        set_clauses = ', '.join(f"{name} = ?" for name in fields)
+        with self._pool.connection() as conn:
+            conn.execute(
+                f"UPDATE veo_operations SET {set_clauses}, updated_at = CURRENT_TIMESTAMP WHERE key = ?",
+                list(fields.values()) + [key]
+            )
+
+    def _poll_loop(self):
+        while True:
+            now = time.time()
+            due = [op for op in self._operations.values() if op['next_poll_at'] <= now and not op.get('polling')]
+            for operation in due:
+                operation['polling'] = True
+                gevent.spawn(self._poll, operation)
+            upcoming = [op['next_poll_at'] for op in self._operations.values() if not op.get('polling')]
+            timeout = max(0, min(upcoming) - time.time()) if upcoming else None
+            self._wakeup.clear()
+            self._wakeup.wait(timeout)
+
+    def _poll(self, operation):
+        key = operation['key']
+        try:
+            timeout = float(get_config()['VEO3_POLL_INTERVAL']) * int(get_config()['VEO3_MAX_POLL_ATTEMPTS'])
+            elapsed = time.time() - operation['submitted_at']
+            try:
+                response = poll_video(self.client, operation['name'])
+            except Exception as e:
+                # A failed poll is retried on the normal schedule
+                response = None
+                if self.logger:
+                    self.logger.warning(f"Polling VEO operation {operation['name']} failed: {str(e)}")
+            operation['polls'] += 1
+            if response is not None and response.done is True:
+                self._finish(operation, response)
+            elif elapsed > timeout:
+                self._fail(operation, f"Video generation timed out after {int(elapsed)} seconds")
+            else:
+                self._update(key, polls=operation['polls'])
+                operation['next_poll_at'] = time.time() + self.poll_delay(operation['polls'])
+                self._progress(operation)
+        except Exception as e:
+            self._fail(operation, str(e))
+        finally:
+            operation['polling'] = False
+            self._wakeup.set()
+
+    def _finish(self, operation, response):
+        filename = save_generated_video(self.client, response, logger=self.logger)
+        operation['status'] = 'completed'
+        operation['filename'] = filename
+        self._update(operation['key'], status='completed', filename=filename, polls=operation['polls'])
+        self._operations.pop(operation['key'], None)
+        self._progress(operation)
+        operation['result'].set(filename)
+
+    def _fail(self, operation, error):
+        operation['status'] = 'failed'
+        operation['error'] = error
+        self._update(operation['key'], status='failed', error=error, polls=operation['polls'])
+        self._operations.pop(operation['key'], None)
+        if self.logger:
+            self.logger.error(f"VEO operation {operation['name']} failed: {error}")
+        self._progress(operation)
+        operation['result'].set_exception(Exception(error))
+
+    def _progress(self, operation):
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(operation)
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"VEO progress callback failed: {str(e)}")
@@ -1,89 +1,359 @@
 import tempfile
 import time
 import os
+import re
+import sys
 import ffmpeg
 import shutil
+import subprocess
+import functools
+import hashlib
+import inspect
+import json
 from datetime import datetime
 from functions.config_loader import get_config
+from functions.metrics import STEP_SECONDS, timed
 
-try:
-    from google import genai
-except ImportError:
-    print("Warning: google-genai not installed. Run: pip install google-genai")
-    genai = None
+def load_genai():
+    """Import google-genai on first use. It takes the best part of a second to import,
+    so the app doesn't pay for it until a video is actually requested."""
+    try:
+        from google import genai
+    except ImportError:
+        raise Exception("google-genai library not installed. Run: pip install google-genai")
+    return genai
+
+# Named encoding presets for post-processed dreams. `preset` and `crf` apply to
+# x264/x265; other encoders don't take a CRF, so they get `bitrate` instead.
+# `threads` 0 lets the software encoder use every core.
+ENCODING_PROFILES = {
+    'fast-preview': {'codec': 'h264', 'preset': 'ultrafast', 'crf': 28, 'bitrate': '2M', 'threads': 0, 'faststart': True},
+    'balanced': {'codec': 'h264', 'preset': 'veryfast', 'crf': 23, 'bitrate': '4M', 'threads': 0, 'faststart': True},
+    'archive': {'codec': 'h264', 'preset': 'slow', 'crf': 18, 'bitrate': '8M', 'threads': 0, 'faststart': True},
+}
+DEFAULT_ENCODING_PROFILE = 'balanced'
+
+# Encoders to try for each codec, best first. Hardware encoders come first so a
+# Pi 4 (V4L2 M2M) or a Mac (VideoToolbox) uses them when the build has them.
+ENCODER_CANDIDATES = {
+    'h264': ['h264_v4l2m2m', 'h264_videotoolbox', 'libx264', 'libopenh264', 'mpeg4'],
+}
+HARDWARE_ENCODER_SUFFIXES = ('_v4l2m2m', '_videotoolbox')
+# Encoders that understand x264-style `preset` and `crf`; the rest get a bitrate
+CRF_ENCODERS = ('libx264', 'libx265')
+# The Pi 4 exposes its H.264 encoder here; the Pi 5 has no hardware encoder
+V4L2_ENCODER_DEVICE = '/dev/video11'
+
+def _hardware_present(encoder):
+    # Many ffmpeg builds list hardware encoders without the hardware to back them
+    if encoder.endswith('_v4l2m2m'):
+        return os.path.exists(V4L2_ENCODER_DEVICE)
+    if encoder.endswith('_videotoolbox'):
+        return sys.platform == 'darwin'
+    return True
 
-def process_video(input_path, logger=None):
-    """Process the video using FFmpeg with specific filters from environment variables."""
+@functools.lru_cache(maxsize=2)
+def available_encoders(kind='V'):
+    """Return the set of encoder names the local ffmpeg build supports, video ('V') or audio ('A')."""
     try:
-        # Create a temporary file for the processed video
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
-            temp_path = temp_file.name
-        # Apply FFmpeg filters using environment variables
-        stream = ffmpeg.input(input_path)
-        # Only vibrance and noise filters are active
-        # 1. Base color enhancement
-        stream = ffmpeg.filter(stream, 'vibrance', intensity=float(get_config()['FFMPEG_VIBRANCE']))
-        
-        # 2. Chromatic aberration - subtle color fringing for dreamlike quality
-        stream = ffmpeg.filter(stream, 'rgbashift', rh=1, gv=-1, bh=1, bv=0)
-        
-        # 3. Motion trails - creates ghosting effect for ethereal movement
-        # stream = ffmpeg.filter(stream, 'lagfun', decay=0.5)  # Disabled - motion trails too distracting
-        
-        # 4. Hue cycling - gentle color breathing over time
-        stream = ffmpeg.filter(stream, 'hue', s=1.1, h='3*sin(t/3)')
-        
-        # 5. Vignette - darkens edges for focus and dream-like tunnel vision
-        stream = ffmpeg.filter(stream, 'vignette', angle='PI/4')
-        
-        # 6. Dreamy softness - selective blur for that hazy dream quality
-        # stream = ffmpeg.filter(stream, 'unsharp', luma_msize_x=5, luma_msize_y=5, luma_amount=-0.5)  # Disabled - too soft
-        
-        # 7. Film grain - adds texture (keep last to preserve grain quality)
-        stream = ffmpeg.filter(stream, 'noise', all_strength=float(get_config()['FFMPEG_NOISE_STRENGTH']))
-        stream = ffmpeg.output(stream, temp_path)
-        # Run FFmpeg
-        ffmpeg.run(stream, overwrite_output=True, quiet=True)
-        # Replace the original file with the processed one
-        shutil.move(temp_path, input_path)
-        if logger:
-            logger.info(f"Processed video saved to {input_path}")
-        return input_path
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return frozenset()
+    # Lines look like " V....D libx264   libx264 H.264 / AVC / MPEG-4 AVC"
+    return frozenset(re.findall(rf'^\s*{kind}\S*\s+(\S+)', result.stdout, re.MULTILINE))
+
+def select_encoder(codec):
+    """Pick the best available encoder for `codec`, honouring a VIDEO_ENCODER override."""
+    override = get_config().get('VIDEO_ENCODER', 'auto')
+    if override and override != 'auto':
+        return override
+    candidates = ENCODER_CANDIDATES.get(codec, [codec])
+    encoders = available_encoders()
+    if not encoders:
+        # Couldn't list encoders; assume the usual software one is there
+        return 'libx264' if 'libx264' in candidates else candidates[-1]
+    for encoder in candidates:
+        if encoder in encoders and _hardware_present(encoder):
+            return encoder
+    return candidates[-1]
+
+def encoding_args(profile=None):
+    """Return ffmpeg.output() keyword arguments for a named encoding profile."""
+    if profile is None:
+        profile = get_config().get('VIDEO_ENCODING_PROFILE', DEFAULT_ENCODING_PROFILE)
+    settings = ENCODING_PROFILES.get(profile)
+    if settings is None:
+        raise ValueError(f"Unknown encoding profile: {profile}")
+    encoder = select_encoder(settings['codec'])
+    args = {'vcodec': encoder, 'pix_fmt': 'yuv420p'}
+    if encoder in CRF_ENCODERS:
+        args['preset'] = settings['preset']
+        args['crf'] = settings['crf']
+    else:
+        args['video_bitrate'] = settings['bitrate']
+    if not encoder.endswith(HARDWARE_ENCODER_SUFFIXES):
+        args['threads'] = settings['threads']
+    if settings['faststart']:
+        args['movflags'] = '+faststart'
+    return args
+
+def apply_dream_filters(stream):
+    """Apply the dream look filter chain to a video stream, using settings from the config."""
+    # Only vibrance and noise filters are active
+    # 1. Base color enhancement
+    stream = ffmpeg.filter(stream, 'vibrance', intensity=float(get_config()['FFMPEG_VIBRANCE']))
+    
+    # 2. Chromatic aberration - subtle color fringing for dreamlike quality
+    stream = ffmpeg.filter(stream, 'rgbashift', rh=1, gv=-1, bh=1, bv=0)
+    
+    # 3. Motion trails - creates ghosting effect for ethereal movement
+    # stream = ffmpeg.filter(stream, 'lagfun', decay=0.5)  # Disabled - motion trails too distracting
+    
+    # 4. Hue cycling - gentle color breathing over time
+    stream = ffmpeg.filter(stream, 'hue', s=1.1, h='3*sin(t/3)')
+    
+    # 5. Vignette - darkens edges for focus and dream-like tunnel vision
+    stream = ffmpeg.filter(stream, 'vignette', angle='PI/4')
+    
+    # 6. Dreamy softness - selective blur for that hazy dream quality
+    # stream = ffmpeg.filter(stream, 'unsharp', luma_msize_x=5, luma_msize_y=5, luma_amount=-0.5)  # Disabled - too soft
+    
+    # 7. Film grain - adds texture (keep last to preserve grain quality)
+    stream = ffmpeg.filter(stream, 'noise', all_strength=float(get_config()['FFMPEG_NOISE_STRENGTH']))
+    return stream
+
+def square_crop(probe):
+    """Return (size, x_offset, y_offset) for a centred square crop of the probed video."""
+    video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
+    width = int(video_info['width'])
+    height = int(video_info['height'])
+    # Calculate square crop dimensions based on the smaller dimension
+    crop_size = min(width, height)
+    # Calculate offsets to center the crop
+    return crop_size, (width - crop_size) // 2, (height - crop_size) // 2
+
+def _reserve_filename(directory, prefix, extension):
+    # Several dreams can be processed in the same second, possibly in other
+    # processes; claim a timestamped name by creating the file
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for n in range(100):
+        filename = f"{prefix}_{timestamp}{extension}" if n == 0 else f"{prefix}_{timestamp}_{n}{extension}"
+        try:
+            with open(os.path.join(directory, filename), 'x'):
+                return filename
+        except FileExistsError:
+            continue
+    raise Exception(f"No free filename for {prefix}_{timestamp}{extension}")
+
+def _new_thumb_path():
+    thumbs_dir = get_config()['THUMBS_DIR']
+    thumb_filename = _reserve_filename(thumbs_dir, 'thumb', '.png')
+    return thumb_filename, os.path.join(thumbs_dir, thumb_filename)
+
+def _discard_reserved(path):
+    # Remove a reserved name that a failed FFmpeg run never wrote to
+    try:
+        if path and os.path.getsize(path) == 0:
+            os.remove(path)
+    except OSError:
+        pass
+
+def new_video_path():
+    """Reserve a new timestamped filename in VIDEOS_DIR. Returns (filename, path)."""
+    videos_dir = get_config()['VIDEOS_DIR']
+    video_filename = _reserve_filename(videos_dir, 'generated', '.mp4')
+    return video_filename, os.path.join(videos_dir, video_filename)
+
+def raw_video_path(filename):
+    """Where the unfiltered VEO 3 download for `filename` is kept, or None if RAW_VIDEOS_DIR is empty."""
+    raw_dir = get_config().get('RAW_VIDEOS_DIR', 'media/video_raw')
+    return os.path.join(raw_dir, filename) if raw_dir else None
+
+def post_process_signature():
+    """Hash of everything that shapes a post-processed video besides its input.
+
+    Covers the filter chain code and its settings plus the encoder arguments, so
+    reprocessing can tell which dreams are already up to date.
+    """
+    settings = {
+        'filters': inspect.getsource(apply_dream_filters),
+        'vibrance': get_config()['FFMPEG_VIBRANCE'],
+        'noise_strength': get_config()['FFMPEG_NOISE_STRENGTH'],
+        'encoding': encoding_args(),
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+# Smaller copies of each thumbnail for the /dreams grid's srcset, by width in pixels
+THUMB_SIZES = (160, 320, 640)
+# Encoder settings per thumbnail format, in fallback order
+THUMB_FORMATS = {
+    'webp': {'vcodec': 'libwebp', 'quality': 80},
+    'avif': {'vcodec': 'libaom-av1', 'crf': 35, 'cpu-used': 6},
+}
+# Each frame of the hover-scrub strip is this many pixels square
+SCRUB_FRAME_SIZE = 160
+
+def thumb_format():
+    """The configured THUMB_FORMAT if ffmpeg can encode it, else the first format it can, else None."""
+    preferred = get_config().get('THUMB_FORMAT', 'webp')
+    encoders = available_encoders()
+    for fmt in [preferred] + [f for f in THUMB_FORMATS if f != preferred]:
+        if fmt in THUMB_FORMATS and (not encoders or THUMB_FORMATS[fmt]['vcodec'] in encoders):
+            return fmt
+    return None
+
+def thumb_variant_filename(thumb_filename, size, fmt):
+    return f"{os.path.splitext(thumb_filename)[0]}_{size}.{fmt}"
+
+def scrub_strip_filename(thumb_filename, fmt):
+    return f"{os.path.splitext(thumb_filename)[0]}_strip.{fmt}"
+
+def thumb_asset_filenames(thumb_filename):
+    """Every resized copy and scrub strip filename that may exist for a thumbnail, in any format."""
+    names = []
+    for fmt in THUMB_FORMATS:
+        names.extend(thumb_variant_filename(thumb_filename, size, fmt) for size in THUMB_SIZES)
+        names.append(scrub_strip_filename(thumb_filename, fmt))
+    return names
+
+def thumb_assets(thumb_filename):
+    """Describe the resized thumbnails and scrub strip that exist for a dream's thumbnail.
+
+    Returns {'srcset': str or None, 'strip': url or None, 'strip_frames': int}.
+    """
+    assets = {'srcset': None, 'strip': None, 'strip_frames': 0}
+    if not thumb_filename:
+        return assets
+    thumbs_dir = get_config()['THUMBS_DIR']
+    for fmt in THUMB_FORMATS:
+        sizes = [
+            size for size in THUMB_SIZES
+            if os.path.exists(os.path.join(thumbs_dir, thumb_variant_filename(thumb_filename, size, fmt)))
+        ]
+        if sizes:
+            assets['srcset'] = ', '.join(
+                f"/media/thumbs/{thumb_variant_filename(thumb_filename, size, fmt)} {size}w" for size in sizes
+            )
+            break
+    for fmt in THUMB_FORMATS:
+        strip_filename = scrub_strip_filename(thumb_filename, fmt)
+        if os.path.exists(os.path.join(thumbs_dir, strip_filename)):
+            assets['strip'] = f"/media/thumbs/{strip_filename}"
+            assets['strip_frames'] = int(get_config().get('THUMB_SCRUB_FRAMES', 10))
+            break
+    return assets
+
+def _video_duration(probe, default=8.0):
+    try:
+        return float(probe['format']['duration'])
+    except (KeyError, TypeError, ValueError):
+        return default
+
+def video_metadata(video_path):
+    """Return (duration in seconds, size in bytes) of a video file, with None for whatever can't be read."""
+    try:
+        file_size = os.path.getsize(video_path)
+    except OSError:
+        return None, None
+    try:
+        duration = _video_duration(ffmpeg.probe(video_path), default=None)
+    except (ffmpeg.Error, OSError):
+        duration = None
+    return duration, file_size
+
+def thumb_outputs(frame, thumb_filename, thumb_path=None):
+    """FFmpeg outputs for a square thumbnail frame: the PNG at `thumb_path` (if given) and each resized copy."""
+    fmt = thumb_format()
+    targets = [(None, thumb_path, {})] if thumb_path else []
+    for size in (THUMB_SIZES if fmt else ()):
+        path = os.path.join(get_config()['THUMBS_DIR'], thumb_variant_filename(thumb_filename, size, fmt))
+        targets.append((size, path, THUMB_FORMATS[fmt]))
+    branches = frame.split() if len(targets) > 1 else None
+    outputs = []
+    for i, (size, path, kwargs) in enumerate(targets):
+        stream = branches[i] if branches else frame
+        if size:
+            stream = stream.filter('scale', size, size)
+        outputs.append(ffmpeg.output(stream, path, vframes=1, **kwargs))
+    return outputs
+
+def scrub_output(stream, probe, crop, thumb_filename):
+    """FFmpeg output for the hover-scrub strip: THUMB_SCRUB_FRAMES evenly spaced square frames in one row.
+
+    Returns None when the strip is disabled or no thumbnail format is available.
+    """
+    frames = int(get_config().get('THUMB_SCRUB_FRAMES', 10))
+    fmt = thumb_format()
+    if frames <= 0 or fmt is None:
+        return None
+    crop_size, x_offset, y_offset = crop
+    path = os.path.join(get_config()['THUMBS_DIR'], scrub_strip_filename(thumb_filename, fmt))
+    stream = stream.filter('fps', fps=f"{frames}/{_video_duration(probe)}")
+    stream = ffmpeg.filter(stream, 'crop', crop_size, crop_size, x_offset, y_offset)
+    stream = stream.filter('scale', SCRUB_FRAME_SIZE, SCRUB_FRAME_SIZE).filter('tile', f"{frames}x1")
+    # Tiling leaves a sub-1fps rate, which libaom rejects as a timebase
+    stream = stream.filter('fps', fps=1)
+    return ffmpeg.output(stream, path, vframes=1, **THUMB_FORMATS[fmt])
+
+def process_thumb_assets(source_path, thumb_filename, logger=None, probe=None):
+    """Write the resized thumbnails and scrub strip for an existing thumbnail in one FFmpeg pass.
+
+    `source_path` is the dream's processed video, or the thumbnail PNG itself
+    when the video is gone (no scrub strip then).
+    """
+    try:
+        if source_path.lower().endswith('.png'):
+            outputs = thumb_outputs(ffmpeg.input(source_path), thumb_filename)
+        else:
+            if probe is None:
+                probe = ffmpeg.probe(source_path)
+            crop = square_crop(probe)
+            branches = ffmpeg.input(source_path).split()
+            frame = branches[0].trim(start=1).setpts('PTS-STARTPTS').trim(end_frame=1)
+            frame = ffmpeg.filter(frame, 'crop', *crop)
+            outputs = thumb_outputs(frame, thumb_filename)
+            strip = scrub_output(branches[1], probe, crop, thumb_filename)
+            if strip is not None:
+                outputs.append(strip)
+        if not outputs:
+            return False
+        try:
+            ffmpeg.run(ffmpeg.merge_outputs(*outputs), overwrite_output=True, capture_stderr=True)
+        except ffmpeg.Error as e:
+            if logger:
+                logger.error(f"FFmpeg error: {e.stderr.decode()}")
+            raise
+        return True
     except Exception as e:
         if logger:
-            logger.error(f"Error processing video: {str(e)}")
+            logger.error(f"Error creating thumbnail assets for {thumb_filename}: {str(e)}")
         raise
 
-def process_thumbnail(video_path, logger=None):
-    """Create a square thumbnail from the video at 1 second in."""
+@timed(STEP_SECONDS, step='process_thumbnail')
+def process_thumbnail(video_path, logger=None, probe=None):
+    """Create a square thumbnail from the video at 1 second in.
+
+    Pass `probe` to reuse ffprobe output the caller already has.
+    """
+    thumb_path = None
     try:
         # Get video dimensions using ffprobe
-        probe = ffmpeg.probe(video_path)
-        video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-        width = int(video_info['width'])
-        height = int(video_info['height'])
-        # Calculate square crop dimensions based on the smaller dimension
-        crop_size = min(width, height)
-        # Calculate offsets to center the crop
-        x_offset = (width - crop_size) // 2
-        y_offset = (height - crop_size) // 2
-        # Create output directory if it doesn't exist
-        thumbs_dir = get_config()['THUMBS_DIR']
-        os.makedirs(thumbs_dir, exist_ok=True)
-        # Generate simple timestamp-based filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        thumb_filename = f"thumb_{timestamp}.png"
-        thumb_path = os.path.join(thumbs_dir, thumb_filename)
+        if probe is None:
+            probe = ffmpeg.probe(video_path)
+        crop_size, x_offset, y_offset = square_crop(probe)
+        thumb_filename, thumb_path = _new_thumb_path()
         # Log the FFmpeg command for debugging
         if logger:
             logger.info(f"Generating thumbnail for video: {video_path}")
-            logger.info(f"Video dimensions: {width}x{height}")
             logger.info(f"Output path: {thumb_path}")
             logger.info(f"Crop dimensions: {crop_size}x{crop_size} at offset ({x_offset}, {y_offset})")
         # Use FFmpeg to extract frame at 1 second and crop to square
         stream = ffmpeg.input(video_path, ss=1)
         stream = ffmpeg.filter(stream, 'crop', crop_size, crop_size, x_offset, y_offset)
-        stream = ffmpeg.output(stream, thumb_path, vframes=1)
+        stream = ffmpeg.merge_outputs(*thumb_outputs(stream, thumb_filename, thumb_path))
         # Run FFmpeg with stderr capture
         try:
             ffmpeg.run(stream, overwrite_output=True, capture_stderr=True)
@@ -95,30 +365,138 @@ def process_thumbnail(video_path, logger=None):
             logger.info(f"Generated thumbnail saved to {thumb_path}")
         return thumb_filename
     except Exception as e:
+        _discard_reserved(thumb_path)
         if logger:
             logger.error(f"Error generating thumbnail: {str(e)}")
         raise
 
-def generate_video(prompt, filename=None, logger=None, config=None):
-    """Generate a video using Google's VEO 3 API."""
+@timed(STEP_SECONDS, step='post_process')
+def process_video_and_thumbnail(input_path, logger=None, probe=None, output_path=None):
+    """Apply the dream filters and cut the square thumbnail in a single FFmpeg pass.
+
+    The filtered stream is split in the filter graph: one branch is encoded to
+    the processed MP4, one is trimmed to 1 second in, cropped square and
+    written as the thumbnail plus its resized copies, and one is sampled into
+    the hover-scrub strip, so the clip is only decoded once. Returns the
+    thumbnail filename.
+
+    Without `output_path` the video is processed in place, and the unfiltered
+    original is first moved to RAW_VIDEOS_DIR so it can be reprocessed later.
+    """
+    thumb_path = None
     try:
-        if genai is None:
-            raise Exception("google-genai library not installed")
-            
-        # Initialize the client with API key
-        client = genai.Client(api_key=get_config()['GOOGLE_AI_API_KEY'])
-        
-        # Create video generation request
+        raw_path = None
+        if output_path is None:
+            output_path = input_path
+            raw_path = raw_video_path(os.path.basename(input_path))
+            # A retried stage may have already moved the original aside
+            if raw_path and os.path.exists(raw_path):
+                input_path = raw_path
+        if probe is None:
+            probe = ffmpeg.probe(input_path)
+        crop_size, x_offset, y_offset = square_crop(probe)
+        thumb_filename, thumb_path = _new_thumb_path()
+        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
+            temp_path = temp_file.name
+        filtered = apply_dream_filters(ffmpeg.input(input_path)).split()
+        video = ffmpeg.output(filtered[0], temp_path, **encoding_args())
+        # End the branch after one frame so the rest of the clip isn't converted for the PNG
+        thumb = filtered[1].trim(start=1).setpts('PTS-STARTPTS').trim(end_frame=1)
+        thumb = ffmpeg.filter(thumb, 'crop', crop_size, crop_size, x_offset, y_offset)
+        outputs = [video] + thumb_outputs(thumb, thumb_filename, thumb_path)
+        strip = scrub_output(filtered[2], probe, (crop_size, x_offset, y_offset), thumb_filename)
+        if strip is not None:
+            outputs.append(strip)
+        try:
+            ffmpeg.run(ffmpeg.merge_outputs(*outputs), overwrite_output=True, capture_stderr=True)
+        except ffmpeg.Error as e:
+            if logger:
+                logger.error(f"FFmpeg error: {e.stderr.decode()}")
+            raise
+        if raw_path and input_path != raw_path:
+            # Keep the original download for reprocessing
+            os.makedirs(os.path.dirname(raw_path), exist_ok=True)
+            shutil.move(input_path, raw_path)
+        # Replace the original file with the processed one
+        shutil.move(temp_path, output_path)
         if logger:
-            logger.info(f"Starting VEO 3 video generation with prompt: {prompt[:100]}...")
-            
+            logger.info(f"Processed video saved to {output_path}, thumbnail to {thumb_path}")
+        return thumb_filename
+    except Exception as e:
+        _discard_reserved(thumb_path)
+        if logger:
+            logger.error(f"Error post-processing video: {str(e)}")
+        raise
+
+def veo_client():
+    """Create a google-genai client, pointed at VEO3_BASE_URL when one is configured."""
+    genai = load_genai()
+    base_url = get_config().get('VEO3_BASE_URL')
+    if base_url:
+        return genai.Client(
+            api_key=get_config()['GOOGLE_AI_API_KEY'],
+            http_options=genai.types.HttpOptions(base_url=base_url),
+        )
+    return genai.Client(api_key=get_config()['GOOGLE_AI_API_KEY'])
+
+def submit_video(client, prompt, logger=None):
+    """Start a VEO 3 generation and return its long-running operation."""
+    if logger:
+        logger.info(f"Starting VEO 3 video generation with prompt: {prompt[:100]}...")
+    with STEP_SECONDS.time(step='veo_submit'):
         operation = client.models.generate_videos(
             model=get_config()['VEO3_MODEL'],
             prompt=prompt,
         )
+    if logger:
+        logger.info(f"Video generation operation started: {operation.name}")
+    return operation
+
+def poll_video(client, name):
+    """Fetch the current state of a VEO 3 operation by name."""
+    with STEP_SECONDS.time(step='veo_poll'):
+        return client.operations.get(load_genai().types.GenerateVideosOperation(name=name))
+
+def save_generated_video(client, operation, filename=None, logger=None):
+    """Download the video from a finished VEO 3 operation to VIDEOS_DIR. Returns the filename."""
+    # Check for errors
+    if operation.error:
+        raise Exception(f"Video generation failed: {operation.error}")
         
-        if logger:
-            logger.info(f"Video generation operation started: {operation.name}")
+    # Get the generated video
+    if not operation.response or not operation.response.generated_videos:
+        raise Exception("No video was generated")
+        
+    generated_video = operation.response.generated_videos[0]
+    
+    # Download the video
+    if logger:
+        logger.info("Downloading generated video...")
+        
+    # Create filename if not provided
+    if filename is None:
+        filename, _ = new_video_path()
+    os.makedirs(get_config()['VIDEOS_DIR'], exist_ok=True)
+    video_path = os.path.join(get_config()['VIDEOS_DIR'], filename)
+    
+    # Download and save the video
+    with STEP_SECONDS.time(step='veo_download'):
+        client.files.download(file=generated_video.video)
+        generated_video.video.save(video_path)
+    
+    if logger:
+        logger.info(f"Saved video to {video_path}")
+        
+    return filename
+
+def request_video(prompt, filename=None, logger=None):
+    """Generate a video with Google's VEO 3 API and download it to VIDEOS_DIR. Returns the filename.
+
+    Blocks the calling greenlet while it polls; the job queue uses VeoOperationTracker instead.
+    """
+    try:
+        client = veo_client()
+        operation = submit_video(client, prompt, logger)
         
         # Poll for completion
         max_attempts = int(get_config()['VEO3_MAX_POLL_ATTEMPTS'])
@@ -135,49 +513,13 @@ def generate_video(prompt, filename=None, logger=None, config=None):
             time.sleep(poll_interval)
             
             # Poll by getting a fresh operation object
-            operation = client.operations.get(operation)
+            with STEP_SECONDS.time(step='veo_poll'):
+                operation = client.operations.get(operation)
             
         if operation.done is not True:
             raise Exception(f"Video generation timed out after {max_attempts} attempts")
             
-        # Check for errors
-        if operation.error:
-            raise Exception(f"Video generation failed: {operation.error}")
-            
-        # Get the generated video
-        if not operation.response or not operation.response.generated_videos:
-            raise Exception("No video was generated")
-            
-        generated_video = operation.response.generated_videos[0]
-        
-        # Download the video
-        if logger:
-            logger.info("Downloading generated video...")
-            
-        # Create filename if not provided
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"generated_{timestamp}.mp4"
-            
-        os.makedirs(get_config()['VIDEOS_DIR'], exist_ok=True)
-        video_path = os.path.join(get_config()['VIDEOS_DIR'], filename)
-        
-        # Download and save the video
-        client.files.download(file=generated_video.video)
-        generated_video.video.save(video_path)
-        
-        if logger:
-            logger.info(f"Saved video to {video_path}")
-            
-        # Post-process the video
-        processed_video_path = process_video(video_path, logger)
-        if logger:
-            logger.info(f"Processed video saved to {processed_video_path}")
-            
-        # Generate thumbnail
-        thumb_filename = process_thumbnail(processed_video_path, logger)
-        
-        return filename, thumb_filename
+        return save_generated_video(client, operation, filename, logger)
         
     except Exception as e:
         if logger:
@@ -4,9 +4,12 @@ GPIO Service - Fixed for inverted button logic
 """
 
 import time
+import queue
 import logging
+import threading
 import requests
 from functions.config_loader import get_config
+from functions.tap_detector import TapStateMachine
 import sys
 import lgpio
 
@@ -17,137 +20,163 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class EventSender:
+    """Delivers tap events to the Flask app in order over one keep-alive connection.
+
+    Events are queued and posted by a single thread, so a tap never waits on
+    the network. If the app is down (e.g. restarting) the head of the queue is
+    retried until it gets through or is older than MAX_EVENT_AGE, when it is
+    dropped rather than replayed long after the button was pressed.
+    """
+
+    MAX_EVENT_AGE = 30.0
+    MAX_RETRY_DELAY = 2.0
+
+    def __init__(self, config):
+        self.config = config
+        self.session = requests.Session()
+        self.events = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='gpio-events', daemon=True)
+        self.thread.start()
+
+    def send(self, event_type):
+        self.events.put((event_type, time.time()))
+
+    def _run(self):
+        while True:
+            event_type, detected_at = self.events.get()
+            self._deliver(event_type, detected_at)
+
+    def _deliver(self, event_type, detected_at):
+        endpoint_key = f'GPIO_{event_type.upper()}_ENDPOINT'
+        if endpoint_key not in self.config:
+            logger.error(f"No endpoint configured for {event_type}")
+            return
+        url = f"{self.config['GPIO_FLASK_URL']}{self.config[endpoint_key]}"
+        attempt = 0
+        error = None
+        while time.time() - detected_at < self.MAX_EVENT_AGE:
+            started = time.time()
+            try:
+                # detected_at lets the app log the full button-to-UI latency
+                response = self.session.post(url, json={'detected_at': detected_at}, timeout=2)
+                # A 5xx while the app restarts is as transient as a refused connection
+                if not 200 <= response.status_code < 300:
+                    raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            except requests.RequestException as e:
+                error = e
+                delay = min(self.MAX_RETRY_DELAY, 0.1 * 2 ** attempt)
+                attempt += 1
+                logger.warning(f"Failed to send {event_type} (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+                continue
+            finished = time.time()
+            logger.info(
+                f"{event_type} sent: {response.status_code} in {(finished - started) * 1000:.1f} ms, "
+                f"{(finished - detected_at) * 1000:.1f} ms after detection"
+            )
+            return
+        logger.error(
+            f"Dropped {event_type} after {attempt} attempts: not delivered within {self.MAX_EVENT_AGE:.0f}s ({error})"
+        )
+
 class TunedTapDetector:
     def __init__(self):
         self.config = get_config()
         self.pin = int(self.config['GPIO_PIN'])
         self.gpio_handle = None
+        self.sender = EventSender(self.config)
         
         # Timing thresholds tuned for actual behavior
-        self.MAX_TAP_DURATION = 2.0  # Allow up to 2 seconds for a tap
         self.DOUBLE_TAP_WINDOW = 0.8  # Time between tap starts for double tap
         self.LONG_TAP_DURATION = self.config.get('GPIO_LONG_TAP_DURATION', 3.0)  # Long tap threshold
         self.DEBOUNCE_TIME = 0.05
+        # Kernel glitch filter in edge mode: drops contact chatter before it reaches Python
+        self.HARDWARE_DEBOUNCE_TIME = 0.005
+        self.mode = self.config.get('GPIO_DETECTION_MODE', 'edge')
         
-        # State tracking - INVERTED LOGIC
-        # On this hardware: 0 = not pressed, 1 = pressed
-        self.last_state = 0  
-        self.press_times = []  # Track press start times
-        self.current_press_start = None  # Track current press start time
-        self.long_tap_detected = False  # Flag to prevent multiple detections
+        # On this hardware: 0 = not pressed, 1 = pressed (INVERTED LOGIC)
+        self.taps = TapStateMachine(
+            double_tap_window=self.DOUBLE_TAP_WINDOW,
+            long_tap_duration=self.LONG_TAP_DURATION,
+            debounce=self.DEBOUNCE_TIME,
+        )
         
     def init_gpio(self):
         self.gpio_handle = lgpio.gpiochip_open(0)
-        lgpio.gpio_claim_input(self.gpio_handle, self.pin, lgpio.SET_PULL_UP)
-        logger.info(f"GPIO initialized on pin {self.pin}")
+        if self.mode == 'edge':
+            lgpio.gpio_claim_alert(self.gpio_handle, self.pin, lgpio.BOTH_EDGES, lgpio.SET_PULL_UP)
+            lgpio.gpio_set_debounce_micros(self.gpio_handle, self.pin, int(self.HARDWARE_DEBOUNCE_TIME * 1e6))
+        else:
+            lgpio.gpio_claim_input(self.gpio_handle, self.pin, lgpio.SET_PULL_UP)
+        logger.info(f"GPIO initialized on pin {self.pin} ({self.mode} mode)")
         
     def send_event(self, event_type):
-        """Send event to Flask app"""
-        endpoint_key = f'GPIO_{event_type.upper()}_ENDPOINT'
-        if endpoint_key not in self.config:
-            logger.error(f"No endpoint configured for {event_type}")
-            return
-            
-        url = f"{self.config['GPIO_FLASK_URL']}{self.config[endpoint_key]}"
-        try:
-            response = requests.post(url, timeout=2)
-            logger.info(f"{event_type} sent: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Failed to send {event_type}: {e}")
+        """Queue an event for the Flask app"""
+        self.sender.send(event_type)
+    
+    def handle(self, taps):
+        for tap in taps:
+            logger.info(f"{tap.replace('_', ' ').upper()} detected!")
+            self.send_event(tap)
     
     def run(self):
         """Main detection loop - with INVERTED button logic"""
         self.init_gpio()
         
         logger.info("Starting tap detection with INVERTED button logic...")
-        logger.info(f"Max tap duration: {self.MAX_TAP_DURATION}s")
         logger.info(f"Double tap window: {self.DOUBLE_TAP_WINDOW}s")
         logger.info(f"Long tap duration: {self.LONG_TAP_DURATION}s")
         logger.info("Button logic: 0=not pressed, 1=pressed")
         
-        last_change_time = 0
-        
         try:
-            while True:
-                state = lgpio.gpio_read(self.gpio_handle, self.pin)
-                now = time.time()
-                
-                # State change with debounce
-                if state != self.last_state and (now - last_change_time) > self.DEBOUNCE_TIME:
-                    last_change_time = now
-                    
-                    # Button pressed (0->1 with INVERTED logic)
-                    if self.last_state == 0 and state == 1:
-                        logger.debug(f"PRESS detected at {now:.3f}")
-                        
-                        # Track current press
-                        self.current_press_start = now
-                        self.long_tap_detected = False
-                        
-                        # Add this press time
-                        self.press_times.append(now)
-                        
-                        # Keep only recent presses
-                        self.press_times = [t for t in self.press_times if now - t < 3.0]
-                        
-                        # Check for double tap pattern
-                        if len(self.press_times) >= 2:
-                            # Time between last two presses
-                            gap = self.press_times[-1] - self.press_times[-2]
-                            logger.debug(f"Gap between presses: {gap:.3f}s")
-                            
-                            if gap < self.DOUBLE_TAP_WINDOW:
-                                logger.info("DOUBLE TAP detected!")
-                                self.send_event("double_tap")
-                                # Clear press times to avoid multiple detections
-                                self.press_times = []
-                                self.current_press_start = None
-                    
-                    # Button released (1->0 with INVERTED logic)
-                    elif self.last_state == 1 and state == 0:
-                        if self.current_press_start:
-                            duration = now - self.current_press_start
-                            logger.debug(f"RELEASE detected at {now:.3f}, duration: {duration:.3f}s")
-                            
-                            # Only process as single tap if:
-                            # 1. It wasn't a long tap
-                            # 2. Duration is less than max tap duration
-                            # 3. We have exactly one press in the buffer
-                            if not self.long_tap_detected and duration < self.MAX_TAP_DURATION and len(self.press_times) == 1:
-                                # Schedule single tap check
-                                single_tap_check_time = now
-                            
-                            # Always reset the current press start
-                            self.current_press_start = None
-                    
-                    self.last_state = state
-                
-                # Check for long tap while button is pressed
-                if self.current_press_start and not self.long_tap_detected:
-                    press_duration = now - self.current_press_start
-                    if press_duration >= self.LONG_TAP_DURATION:
-                        logger.info("LONG TAP detected!")
-                        self.send_event("long_tap")
-                        self.long_tap_detected = True
-                        # Clear press times to prevent other tap detections
-                        self.press_times = []
-                
-                # Check for single tap timeout
-                # If we have one press and enough time has passed without another press
-                if len(self.press_times) == 1 and not self.current_press_start and not self.long_tap_detected:
-                    time_since_press = now - self.press_times[0]
-                    if time_since_press > self.DOUBLE_TAP_WINDOW:
-                        logger.info("SINGLE TAP detected!")
-                        self.send_event("single_tap")
-                        self.press_times = []
-                
-                time.sleep(0.01)
-                
+            if self.mode == 'edge':
+                self.run_edges()
+            else:
+                self.run_polling()
         except KeyboardInterrupt:
             logger.info("Stopped")
         finally:
             if self.gpio_handle:
                 lgpio.gpiochip_close(self.gpio_handle)
+    
+    def run_edges(self):
+        """Sleep until the kernel reports an edge or the state machine has a deadline."""
+        edges = queue.Queue()
+        # lgpio calls back on its own thread; the handler only timestamps and hands over
+        callback = lgpio.callback(
+            self.gpio_handle, self.pin, lgpio.BOTH_EDGES,
+            lambda chip, gpio, level, timestamp: edges.put((level, time.monotonic()))
+        )
+        try:
+            while True:
+                deadline = self.taps.next_deadline()
+                timeout = None if deadline is None else max(0, deadline - time.monotonic())
+                try:
+                    level, timestamp = edges.get(timeout=timeout)
+                except queue.Empty:
+                    self.handle(self.taps.tick(time.monotonic()))
+                    continue
+                if level > 1:
+                    continue  # Watchdog timeout, not a level change
+                # Same format as before, so scripts/replay_gpio_trace.py can replay --debug logs
+                logger.debug(f"{'PRESS' if level else 'RELEASE'} detected at {timestamp:.3f}")
+                self.handle(self.taps.edge(level, timestamp))
+        finally:
+            callback.cancel()
+    
+    def run_polling(self):
+        """Read the pin every GPIO_SAMPLING_RATE seconds, for hardware without edge alerts."""
+        interval = float(self.config.get('GPIO_SAMPLING_RATE', 0.01))
+        while True:
+            level = lgpio.gpio_read(self.gpio_handle, self.pin)
+            now = time.monotonic()
+            if level != self.taps.raw_level:
+                logger.debug(f"{'PRESS' if level else 'RELEASE'} detected at {now:.3f}")
+                self.handle(self.taps.edge(level, now))
+            else:
+                self.handle(self.taps.tick(now))
+            time.sleep(interval)
 
 def main():
     import time
@@ -0,0 +1,66 @@
+"""
+Create resized WebP/AVIF thumbnails and hover-scrub strips for existing dreams.
+
+New dreams get these during post-processing; this fills them in for dreams
+made before that, or after changing THUMB_FORMAT or THUMB_SCRUB_FRAMES (with
+--force). Assets are cut from each dream's processed video, or resized from
+its PNG thumbnail if the video is missing. Dreams without a thumbnail get one.
+
+Usage:
+  python scripts/backfill_thumbnails.py [--force]
+"""
+import argparse
+import logging
+import os
+import sys
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.config_loader import get_config
+from functions.dream_db import DreamDB
+from functions.video import process_thumb_assets, process_thumbnail, thumb_assets
+
+logger = logging.getLogger('backfill')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--force', action='store_true', help='Recreate assets that already exist')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    dream_db = DreamDB()
+    done = skipped = failed = 0
+    for dream in dream_db.get_all_dreams():
+        video_path = os.path.join(get_config()['VIDEOS_DIR'], dream['video_filename'])
+        thumb_filename = dream.get('thumb_filename')
+        thumb_path = os.path.join(get_config()['THUMBS_DIR'], thumb_filename) if thumb_filename else None
+        try:
+            if not thumb_path or not os.path.exists(thumb_path):
+                if not os.path.exists(video_path):
+                    skipped += 1
+                    logger.info(f"Dream {dream['id']}: no video or thumbnail, skipping")
+                    continue
+                # process_thumbnail writes the resized copies along with the PNG
+                thumb_filename = process_thumbnail(video_path, logger)
+                dream_db.update_dream(dream['id'], {'thumb_filename': thumb_filename})
+            else:
+                assets = thumb_assets(thumb_filename)
+                if assets['srcset'] and (assets['strip'] or not os.path.exists(video_path)) and not args.force:
+                    skipped += 1
+                    continue
+                source = video_path if os.path.exists(video_path) else thumb_path
+                process_thumb_assets(source, thumb_filename, logger)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Dream {dream['id']}: failed: {str(e)}")
+            continue
+        done += 1
+        logger.info(f"Dream {dream['id']}: thumbnails written for {thumb_filename}")
+
+    logger.info(f"Backfilled {done} dreams, {skipped} already done or skipped, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare wire size and server CPU for the two `stream_recording` framings.
+
+The legacy client sends each MediaRecorder chunk as a JSON array of ints; the
+binary client sends it as a Socket.IO attachment. This script encodes one
+recorded minute of synthetic chunks both ways with python-socketio's packet
+encoder, then times the server side decode (packet parse + bytes rebuild).
+
+Usage:
+  python scripts/benchmark_audio_framing.py [--minutes 1] [--bitrate 128000] [--chunk-ms 100]
+"""
+import argparse
+import random
+import time
+
+from socketio import packet
+
+def make_chunks(minutes, bitrate, chunk_ms, seed=0):
+    """Return synthetic Opus-sized chunks (compressed audio is close to random bytes)."""
+    rng = random.Random(seed)
+    chunk_size = int(bitrate / 8 * chunk_ms / 1000)
+    count = int(minutes * 60 * 1000 / chunk_ms)
+    return [rng.randbytes(chunk_size) for _ in range(count)]
+
+def encode_json(seq, chunk):
+    """Encode a chunk the way the legacy client does."""
+    pkt = packet.Packet(packet.EVENT, data=['stream_recording', {
+        'seq': seq, 'data': list(chunk), 'timestamp': 0
+    }])
+    return [pkt.encode()]
+
+def encode_binary(seq, chunk):
+    """Encode a chunk as a binary attachment."""
+    pkt = packet.Packet(packet.EVENT, data=['stream_recording', {
+        'seq': seq, 'data': chunk, 'timestamp': 0
+    }])
+    return pkt.encode()
+
+def wire_bytes(encoded):
+    """Bytes on the wire for one encoded packet (text header plus attachments)."""
+    return sum(len(part.encode('utf-8')) if isinstance(part, str) else len(part) for part in encoded)
+
+def decode(encoded):
+    """Decode a packet and rebuild the audio bytes as the server does."""
+    pkt = packet.Packet(encoded_packet=encoded[0])
+    for attachment in encoded[1:]:
+        pkt.add_attachment(attachment)
+    chunk = pkt.data[1]['data']
+    return chunk if isinstance(chunk, bytes) else bytes(chunk)
+
+def run(name, encoder, chunks, minutes):
+    encoded = [encoder(seq, chunk) for seq, chunk in enumerate(chunks)]
+    total = sum(wire_bytes(e) for e in encoded)
+    start = time.process_time()
+    for e in encoded:
+        decode(e)
+    cpu = time.process_time() - start
+    print(f"{name:<8} {total / minutes / 1024:>10.1f} KiB/min {cpu / minutes * 1000:>10.1f} ms CPU/min")
+    return total, cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=1.0)
+    parser.add_argument('--bitrate', type=int, default=128000, help='MediaRecorder audioBitsPerSecond')
+    parser.add_argument('--chunk-ms', type=int, default=100, help='MediaRecorder timeslice')
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.minutes, args.bitrate, args.chunk_ms)
+    print(f"{len(chunks)} chunks of {len(chunks[0])} bytes ({args.minutes:g} min)")
+    json_bytes, json_cpu = run('json', encode_json, chunks, args.minutes)
+    bin_bytes, bin_cpu = run('binary', encode_binary, chunks, args.minutes)
+    print(f"wire size: {json_bytes / bin_bytes:.2f}x smaller, "
+          f"server CPU: {json_cpu / max(bin_cpu, 1e-9):.1f}x less")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare DreamDB throughput with a connection per call against the shared WAL pool.
+
+Builds two throwaway databases with the same rows and times reads (get_dream,
+get_dreams_page) and inserts (save_dream) on each. The "legacy" side opens a
+fresh connection with the default rollback journal for every call, as DreamDB
+did before it used get_connection_pool.
+
+Usage:
+  python scripts/benchmark_dream_db.py [--rows 500] [--reads 2000] [--inserts 500]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.dream_db import DreamDB
+
+def make_dream(i):
+    return {
+        'user_prompt': f'benchmark dream {i}',
+        'generated_prompt': f'a dreamlike scene number {i}',
+        'audio_filename': f'audio_{i}.wav',
+        'video_filename': f'video_{i}.mp4',
+        'thumb_filename': f'thumb_{i}.png',
+        'status': 'completed',
+    }
+
+class LegacyDreamDB:
+    """The old access pattern: open, query and commit on a new connection each call."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS dreams (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_prompt TEXT NOT NULL,
+                    generated_prompt TEXT NOT NULL,
+                    audio_filename TEXT NOT NULL,
+                    video_filename TEXT NOT NULL,
+                    thumb_filename TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_dreams_created_at ON dreams (created_at DESC, id DESC)')
+
+    def save_dream(self, dream_data):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT INTO dreams (user_prompt, generated_prompt, audio_filename, video_filename, '
+                'thumb_filename, status) VALUES (?, ?, ?, ?, ?, ?)',
+                (dream_data['user_prompt'], dream_data['generated_prompt'], dream_data['audio_filename'],
+                 dream_data['video_filename'], dream_data.get('thumb_filename'), dream_data.get('status'))
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+    def get_dream(self, dream_id):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM dreams WHERE id = ?', (dream_id,)).fetchone()
+            return dict(row) if row else None
+
+    def get_dreams_page(self, limit=24, before=None):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute('SELECT * FROM dreams ORDER BY created_at DESC, id DESC LIMIT ?', (limit + 1,))
+            return [dict(row) for row in rows.fetchall()[:limit]], None
+
+class BenchmarkDreamDB(DreamDB):
+    def _init_sample_dreams(self):
+        # Sample dreams copy media into the repo; the benchmark seeds its own rows
+        pass
+
+def rate(count, func):
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return count / (time.perf_counter() - start)
+
+def run(name, db, args):
+    for i in range(args.rows):
+        db.save_dream(make_dream(i))
+    get_rate = rate(args.reads, lambda i: db.get_dream(i % args.rows + 1))
+    page_rate = rate(args.reads, lambda i: db.get_dreams_page(limit=24))
+    insert_rate = rate(args.inserts, lambda i: db.save_dream(make_dream(args.rows + i)))
+    print(f"{name:<8} {get_rate:>14.0f} {page_rate:>14.0f} {insert_rate:>14.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500, help='Rows to seed before timing')
+    parser.add_argument('--reads', type=int, default=2000, help='Calls per read benchmark')
+    parser.add_argument('--inserts', type=int, default=500, help='Inserts to time')
+    args = parser.parse_args()
+
+    print(f"{'':<8} {'get_dream/s':>14} {'page/s':>14} {'inserts/s':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        run('legacy', LegacyDreamDB(os.path.join(tmp, 'legacy.db')), args)
+        run('pooled', BenchmarkDreamDB(os.path.join(tmp, 'pooled.db')), args)
+
+if __name__ == '__main__':
+    main()
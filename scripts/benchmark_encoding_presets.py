@@ -0,0 +1,64 @@
+"""
+Report post-processing encode time and output size for each encoding profile.
+
+Runs the dream filter chain plus each profile in ENCODING_PROFILES over the
+sample clips in dream_samples/ (or the clips given on the command line) and
+prints wall time, realtime factor and output size.
+
+Usage:
+  python scripts/benchmark_encoding_presets.py [clip.mp4 ...] [--profiles balanced archive]
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ffmpeg
+
+from functions.video import ENCODING_PROFILES, apply_dream_filters, encoding_args
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', 'dream_samples')
+
+def clip_duration(path):
+    try:
+        return float(ffmpeg.probe(path)['format']['duration'])
+    except Exception:
+        return None
+
+def encode(path, profile, output_path):
+    stream = apply_dream_filters(ffmpeg.input(path))
+    stream = ffmpeg.output(stream, output_path, **encoding_args(profile))
+    start = time.perf_counter()
+    ffmpeg.run(stream, overwrite_output=True, quiet=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('clips', nargs='*', help='Clips to encode (default: dream_samples/*.mp4)')
+    parser.add_argument('--profiles', nargs='+', default=list(ENCODING_PROFILES), choices=list(ENCODING_PROFILES))
+    args = parser.parse_args()
+
+    clips = args.clips or sorted(glob.glob(os.path.join(SAMPLES_DIR, '*.mp4')))
+    if not clips:
+        print("No clips found; pass paths or add .mp4 files to dream_samples/")
+        sys.exit(1)
+
+    print(f"{'clip':<20} {'profile':<14} {'encoder':<14} {'seconds':>8} {'x realtime':>10} {'size MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for clip in clips:
+            duration = clip_duration(clip)
+            for profile in args.profiles:
+                output_path = os.path.join(tmp, f"{profile}.mp4")
+                elapsed = encode(clip, profile, output_path)
+                size_mb = os.path.getsize(output_path) / 1e6
+                speed = f"{duration / elapsed:.2f}" if duration else '-'
+                encoder = encoding_args(profile)['vcodec']
+                print(f"{os.path.basename(clip):<20} {profile:<14} {encoder:<14} {elapsed:>8.2f} {speed:>10} {size_mb:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Time dream search on a large library of synthetic dreams.
+
+Builds a throwaway database of --rows generated dreams, indexed through the
+same triggers the app uses, then runs a mix of queries: common and rare
+words, several words at once, and the short prefixes a user types first.
+Prints the median and 95th percentile per query and exits with
+status 1 if any 95th percentile is over --budget milliseconds.
+
+Usage:
+  python scripts/benchmark_search.py [--rows 50000] [--runs 50] [--budget 10] [--seed 1]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.dream_db import DreamDB
+
+PLACES = ['ocean', 'forest', 'castle', 'school', 'train station', 'desert', 'library', 'city', 'mountain',
+          'kitchen', 'hospital', 'airport', 'garden', 'cathedral', 'submarine', 'carnival', 'glacier']
+ACTIONS = ['flying over', 'running through', 'lost in', 'swimming in', 'falling into', 'searching in',
+           'hiding in', 'dancing in', 'climbing', 'floating above', 'driving through', 'sleeping in']
+COMPANIONS = ['my grandmother', 'a talking cat', 'an old friend', 'my teacher', 'a giant owl', 'nobody',
+              'my brother', 'a stranger with no face', 'a pack of wolves', 'my childhood dog']
+DETAILS = ['the sky was green', 'everything was made of glass', 'the clocks ran backwards',
+           'it kept raining upwards', 'I could breathe underwater', 'my teeth were falling out',
+           'the doors led to the same room', 'I had forgotten an exam', 'the moon was enormous',
+           'all the words were in a language I almost knew']
+STYLES = ['surreal', 'dreamlike', 'cinematic', 'hazy', 'luminous', 'melancholy', 'whimsical', 'eerie']
+
+QUERIES = ['ocean', 'grandmother', 'flying castle', 'clocks backwards', 'submarine glacier', 'wolves moon',
+           'the', 'fl', 'o', 'xylophone']
+
+def make_dream(rng, i):
+    place, action = rng.choice(PLACES), rng.choice(ACTIONS)
+    user_prompt = (f"I was {action} a {place} with {rng.choice(COMPANIONS)} and {rng.choice(DETAILS)}. "
+                   f"Then {rng.choice(DETAILS)}.")
+    generated_prompt = (f"A {rng.choice(STYLES)} {rng.choice(STYLES)} scene: a figure {action} a {place}, "
+                        f"{rng.choice(DETAILS)}, soft film grain, slow camera drift.")
+    return (user_prompt, generated_prompt, f'audio_{i}.wav', f'video_{i}.mp4', f'thumb_{i}.png', 'completed')
+
+class BenchmarkDreamDB(DreamDB):
+    def _init_sample_dreams(self):
+        # Sample dreams copy media into the repo; the benchmark seeds its own rows
+        pass
+
+def seed(db, rows, rng):
+    with db._pool.connection() as conn:
+        conn.executemany(
+            'INSERT INTO dreams (user_prompt, generated_prompt, audio_filename, video_filename, '
+            'thumb_filename, status) VALUES (?, ?, ?, ?, ?, ?)',
+            (make_dream(rng, i) for i in range(rows))
+        )
+        conn.execute("INSERT INTO dreams_fts (dreams_fts) VALUES ('optimize')")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000, help='Synthetic dreams to generate')
+    parser.add_argument('--runs', type=int, default=50, help='Times to run each query')
+    parser.add_argument('--budget', type=float, default=10.0, help='Allowed 95th percentile per query, in ms')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the generated dreams')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = BenchmarkDreamDB(os.path.join(tmp, 'search.db'))
+        if not db.search_enabled:
+            sys.exit("This SQLite has no FTS5, so search falls back to a LIKE scan; nothing to benchmark")
+        start = time.perf_counter()
+        seed(db, args.rows, random.Random(args.seed))
+        print(f"Seeded and indexed {args.rows} dreams in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'query':<20} {'matches':>8} {'median ms':>10} {'p95 ms':>8}")
+        over = False
+        for query in QUERIES:
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                dreams, total = db.search_dreams(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            over = over or p95 > args.budget
+            flag = '  OVER BUDGET' if p95 > args.budget else ''
+            print(f"{query:<20} {total:>8} {statistics.median(timings):>10.2f} {p95:>8.2f}{flag}")
+
+    sys.exit(1 if over else 0)
+
+if __name__ == '__main__':
+    main()
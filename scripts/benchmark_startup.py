@@ -0,0 +1,95 @@
+"""
+Measure how long the app and the GPIO service take to import, against a tracked budget.
+
+Each entry point is imported in a fresh interpreter under `python -X importtime`.
+The median of --runs imports is compared with its budget in
+scripts/startup_budget.json. The script also checks that none of the
+budget's deferred modules were imported: the OpenAI and Google SDKs and
+pydantic are only needed once a recording is processed, so they must not
+load at startup. The slowest imports are listed to show where the time goes.
+Exits with status 1 if an entry point is over budget or imports a deferred
+module.
+
+Run it from the directory holding config.json, as the app would be.
+
+Usage:
+  python scripts/benchmark_startup.py [--runs N] [--top N] [--budget PATH] [--scale FACTOR]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+
+def import_times(module):
+    """Import `module` in a fresh interpreter. Returns {imported module: cumulative microseconds}."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        # The import itself failed; its traceback is the last thing on stderr
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed')
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+def is_deferred(name, deferred):
+    return any(name == module or name.startswith(module + '.') for module in deferred)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Imports per entry point; the median is reported')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list')
+    parser.add_argument('--budget', default=DEFAULT_BUDGET, help='Budget file (default: scripts/startup_budget.json)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply the budgets, e.g. 3 on hardware slower than the budget was set on')
+    args = parser.parse_args()
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+    deferred = budget.get('deferred_modules', [])
+
+    failed = False
+    for module, limit_ms in budget['entry_points'].items():
+        limit_ms *= args.scale
+        try:
+            runs = [import_times(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            # gpio_service needs lgpio, which only exists on the Pi
+            print(f"{module}: skipped, import failed ({e})\n")
+            continue
+        total_ms = statistics.median(run.get(module, 0) for run in runs) / 1000
+        over = total_ms > limit_ms
+        print(f"{module}: {total_ms:.0f} ms (budget {limit_ms:.0f} ms){'  OVER BUDGET' if over else ''}")
+
+        loaded = sorted({name for run in runs for name in run if is_deferred(name, deferred)})
+        if loaded:
+            print(f"  deferred modules imported at startup: {', '.join(loaded)}")
+        failed = failed or over or bool(loaded)
+
+        # Median per import across runs, skipping the entry point itself
+        slowest = sorted(
+            ((statistics.median(run.get(name, 0) for run in runs) / 1000, name)
+             for name in runs[0] if name != module),
+            reverse=True
+        )[:args.top]
+        for ms, name in slowest:
+            print(f"  {ms:8.1f} ms  {name}")
+        print()
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Pre-scale the kiosk background images and write a manifest for the client.
+
+Each static/images/background/N.jpg is cropped to the display's native
+1280x400 and encoded as WebP or AVIF (THUMB_FORMAT by default) into
+BACKGROUNDS_DIR, named by content hash so the browser can cache it forever.
+manifest.json lists the files in schedule order with their sizes and hashes.
+Images whose source and settings are unchanged since the last build are kept,
+so re-running is cheap.
+
+Usage:
+  python scripts/build_backgrounds.py [--workers N] [--format webp|avif] [--force]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.backgrounds import (
+    BUILT_FILENAME, SOURCE_DIR, backgrounds_dir, build_background, build_settings, file_sha256, load_manifest,
+    manifest_path
+)
+from functions.video import THUMB_FORMATS, thumb_format
+
+logger = logging.getLogger('backgrounds')
+
+def source_images():
+    """Source paths in schedule order. The numbering must run 0..N-1 without gaps."""
+    numbers = sorted(
+        int(match.group(1))
+        for match in (re.fullmatch(r'(\d+)\.jpg', name) for name in os.listdir(SOURCE_DIR))
+        if match
+    )
+    if numbers != list(range(len(numbers))):
+        missing = sorted(set(range(numbers[-1] + 1)) - set(numbers)) if numbers else []
+        raise SystemExit(f"Background images must be numbered 0..N-1; missing {missing[:10]}")
+    return [os.path.join(SOURCE_DIR, f"{number}.jpg") for number in numbers]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (default: CPU count)')
+    parser.add_argument('--format', choices=sorted(THUMB_FORMATS), help='Image format (default: THUMB_FORMAT)')
+    parser.add_argument('--force', action='store_true', help='Rebuild images that are already up to date')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    fmt = args.format or thumb_format()
+    if fmt is None:
+        raise SystemExit("ffmpeg has no WebP or AVIF encoder")
+    settings = build_settings(fmt)
+    os.makedirs(backgrounds_dir(), exist_ok=True)
+
+    previous = load_manifest() or {}
+    reusable = previous.get('images', []) if previous.get('settings') == settings and not args.force else []
+    sources = source_images()
+    images = [None] * len(sources)
+    todo = []
+    for number, source_path in enumerate(sources):
+        entry = reusable[number] if number < len(reusable) else None
+        if (
+            entry is not None
+            and os.path.exists(os.path.join(backgrounds_dir(), entry['file']))
+            and entry['source_sha256'] == file_sha256(source_path)
+        ):
+            images[number] = entry
+        else:
+            todo.append(number)
+
+    logger.info(f"{len(todo)} to build, {len(sources) - len(todo)} up to date ({fmt}, "
+                f"{settings['width']}x{settings['height']})")
+    failed = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {executor.submit(build_background, sources[number], fmt): number for number in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                number = futures[future]
+                try:
+                    images[number] = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"{sources[number]}: failed: {str(e)}")
+                if done % 100 == 0:
+                    logger.info(f"Built {done}/{len(todo)}")
+    if failed:
+        # Keep the old manifest; the client would otherwise schedule missing images
+        logger.error(f"{failed} images failed, manifest not updated")
+        sys.exit(1)
+
+    manifest = {'settings': settings, 'images': images}
+    tmp_path = manifest_path() + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(tmp_path, manifest_path())
+
+    # Drop images from earlier builds that the new manifest no longer lists. Anything
+    # else in BACKGROUNDS_DIR isn't ours, so it is left alone.
+    current = {entry['file'] for entry in images}
+    for name in os.listdir(backgrounds_dir()):
+        path = os.path.join(backgrounds_dir(), name)
+        if name not in current and BUILT_FILENAME.fullmatch(name) and os.path.isfile(path):
+            os.remove(path)
+
+    source_bytes = sum(os.path.getsize(path) for path in sources)
+    built_bytes = sum(entry['bytes'] for entry in images)
+    logger.info(f"Wrote {manifest_path()}: {len(images)} images, "
+                f"{built_bytes / 1e6:.1f} MB (sources {source_bytes / 1e6:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Recompress the WAV recordings of existing dreams into the audio archive format.
+
+Each dream whose audio_filename is a WAV in RECORDINGS_DIR is encoded to
+AUDIO_ARCHIVE_FORMAT (Opus by default) at AUDIO_ARCHIVE_SAMPLE_RATE, tagged
+with its dream id, and its audio_filename updated. The WAV is removed once the
+database points at the new file, so an interrupted run can simply be restarted.
+Recordings are encoded in parallel worker processes, by default one for
+every two CPUs so the app keeps running smoothly on a Pi.
+
+Usage:
+  python scripts/compress_recordings.py [--workers N] [--format opus|flac] [--keep-wav] [--dry-run]
+"""
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ffmpeg
+
+from functions.audio import ARCHIVE_FORMATS, archive_format, archive_output, recording_tags
+from functions.config_loader import get_config
+from functions.dream_db import DreamDB
+
+logger = logging.getLogger('compress')
+
+def compress_recording(wav_path, fmt, tags):
+    """Encode one WAV next to itself in `fmt`. Returns (filename, bytes) of the new file."""
+    root = os.path.splitext(wav_path)[0]
+    extension = ARCHIVE_FORMATS[fmt]['extension']
+    path = f"{root}.{extension}"
+    # Written under a temporary name so a killed run never leaves a truncated archive
+    temp_path = f"{root}.compressing.{extension}"
+    try:
+        ffmpeg.run(archive_output(ffmpeg.input(wav_path), temp_path, fmt, tags),
+                   overwrite_output=True, capture_stdout=True, capture_stderr=True)
+    except ffmpeg.Error as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise RuntimeError(e.stderr.decode(errors='replace').strip() or 'ffmpeg failed')
+    os.replace(temp_path, path)
+    return os.path.basename(path), os.path.getsize(path)
+
+def recorded_at(dream):
+    try:
+        return datetime.fromisoformat(str(dream['created_at']))
+    except (KeyError, ValueError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help='Worker processes (default: half the CPU count)')
+    parser.add_argument('--format', choices=[name for name in ARCHIVE_FORMATS if name != 'wav'],
+                        help='Archive format (default: AUDIO_ARCHIVE_FORMAT)')
+    parser.add_argument('--keep-wav', action='store_true', help='Leave the WAV files in place')
+    parser.add_argument('--dry-run', action='store_true', help='List the recordings that would be compressed')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    fmt = archive_format(args.format)
+    if fmt == 'wav':
+        raise SystemExit("AUDIO_ARCHIVE_FORMAT is wav; pass --format opus or --format flac")
+    recordings_dir = get_config()['RECORDINGS_DIR']
+    dream_db = DreamDB()
+    todo = []
+    missing = 0
+    for dream in dream_db.get_all_dreams():
+        filename = dream.get('audio_filename') or ''
+        if not filename.lower().endswith('.wav'):
+            continue
+        wav_path = os.path.join(recordings_dir, filename)
+        if not os.path.exists(wav_path):
+            missing += 1
+            continue
+        todo.append((dream, wav_path))
+
+    wav_bytes = sum(os.path.getsize(wav_path) for _, wav_path in todo)
+    logger.info(f"{len(todo)} WAV recordings to compress to {fmt} ({wav_bytes / 1e6:.1f} MB), "
+                f"{missing} missing from {recordings_dir}")
+    if args.dry_run:
+        for dream, wav_path in todo:
+            logger.info(f"Dream {dream['id']}: {wav_path}")
+        return
+    if not todo:
+        return
+
+    before_bytes = after_bytes = done = failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(compress_recording, wav_path, fmt, recording_tags(dream['id'], recorded_at(dream))):
+            (dream, wav_path)
+            for dream, wav_path in todo
+        }
+        for future in as_completed(futures):
+            dream, wav_path = futures[future]
+            try:
+                filename, size = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Dream {dream['id']}: failed: {str(e)}")
+                continue
+            if not dream_db.update_dream(dream['id'], {'audio_filename': filename}):
+                failed += 1
+                logger.error(f"Dream {dream['id']}: could not update audio_filename, keeping {wav_path}")
+                continue
+            before_bytes += os.path.getsize(wav_path)
+            after_bytes += size
+            if not args.keep_wav:
+                os.remove(wav_path)
+            done += 1
+            if done % 50 == 0:
+                logger.info(f"Compressed {done}/{len(todo)}")
+
+    logger.info(f"Compressed {done} recordings from {before_bytes / 1e6:.1f} MB to {after_bytes / 1e6:.1f} MB"
+                + (f" ({before_bytes / after_bytes:.0f}x smaller)" if after_bytes else "")
+                + (f", {failed} failed" if failed else ""))
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,6 @@
 import curses
 import json
 import os
-import requests
 import time
 import subprocess
 
@@ -41,21 +40,11 @@ def load_template():
         return json.load(f)
 
 def save_config(config):
-    with open(OUTPUT_PATH, 'w') as f:
+    # Write then rename, so the app's file watcher never reads a half-written config
+    tmp_path = OUTPUT_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(config, f, indent=2)
-
-    # Notify the app to emit reload event
-    try:
-        port = 5000
-        try:
-            with open(OUTPUT_PATH, 'r') as cf:
-                cfg = json.load(cf)
-                port = int(cfg.get('PORT', 5000))
-        except Exception:
-            pass
-        requests.post(f'http://localhost:{port}/api/notify_config_reload')
-    except Exception as e:
-        print(f"Failed to notify app for config reload: {e}")
+    os.replace(tmp_path, OUTPUT_PATH)
 
 def load_current_config():
     if os.path.exists(OUTPUT_PATH):
@@ -0,0 +1,131 @@
+"""
+A local stand-in for the VEO 3 endpoints of the Google AI API, for offline testing.
+
+Implements the three calls the app makes through google-genai: starting a
+generation (models/*:predictLongRunning), polling its operation, and
+downloading the finished video. Operations finish --delay seconds after they
+start; a prompt containing "[fail]" finishes with an error instead.
+
+Point the app at it by setting VEO3_BASE_URL in config.json to
+http://localhost:8089 (any GOOGLE_AI_API_KEY works).
+
+Usage:
+  python scripts/fake_veo_server.py [--port 8089] [--delay 20] [--video clip.mp4]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ffmpeg
+
+class FakeVeo:
+    def __init__(self, delay, video_bytes):
+        self.delay = delay
+        self.video_bytes = video_bytes
+        self.operations = {}  # operation id -> (model, prompt, started at)
+        self.polls = 0
+        self.lock = threading.Lock()
+
+    def start(self, model, prompt):
+        operation_id = uuid.uuid4().hex[:12]
+        with self.lock:
+            self.operations[operation_id] = (model, prompt, time.time())
+        return {'name': f"{model}/operations/{operation_id}"}
+
+    def get(self, operation_id):
+        with self.lock:
+            self.polls += 1
+            model, prompt, started = self.operations[operation_id]
+        name = f"{model}/operations/{operation_id}"
+        if time.time() - started < self.delay:
+            return {'name': name, 'done': False}
+        if '[fail]' in prompt:
+            return {'name': name, 'done': True, 'error': {'code': 400, 'message': 'Fake generation failure'}}
+        return {
+            'name': name,
+            'done': True,
+            'response': {
+                'generateVideoResponse': {'generatedSamples': [{'video': {'uri': f"files/{operation_id}"}}]}
+            },
+        }
+
+def make_handler(veo):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            path = self.path.split('?')[0]
+            if not path.endswith(':predictLongRunning'):
+                return self._send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            model = path.split('/', 2)[2].rsplit(':', 1)[0]  # /v1beta/models/x:predictLongRunning
+            prompt = (body.get('instances') or [{}])[0].get('prompt', '')
+            self._send_json(200, veo.start(model, prompt))
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if '/operations/' in path:
+                operation_id = path.rsplit('/', 1)[1]
+                if operation_id not in veo.operations:
+                    return self._send_json(404, {'error': {'code': 404, 'message': 'Unknown operation'}})
+                return self._send_json(200, veo.get(operation_id))
+            if '/files/' in path and path.endswith(':download'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'video/mp4')
+                self.send_header('Content-Length', str(len(veo.video_bytes)))
+                self.end_headers()
+                self.wfile.write(veo.video_bytes)
+                return
+            self._send_json(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+        def log_message(self, format, *args):
+            print(f"fake-veo: {format % args}")
+
+    return Handler
+
+def test_video():
+    """Render a short 720p test clip with FFmpeg."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'fake.mp4')
+        stream = ffmpeg.input('testsrc2=size=1280x720:rate=24:duration=4', f='lavfi')
+        ffmpeg.run(ffmpeg.output(stream, path, vcodec='libx264', pix_fmt='yuv420p'), overwrite_output=True, quiet=True)
+        with open(path, 'rb') as f:
+            return f.read()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--delay', type=float, default=20, help='Seconds until each operation is done')
+    parser.add_argument('--video', help='MP4 to return for every generation (default: an FFmpeg test pattern)')
+    args = parser.parse_args()
+
+    if args.video:
+        with open(args.video, 'rb') as f:
+            video_bytes = f.read()
+    else:
+        video_bytes = test_video()
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(FakeVeo(args.delay, video_bytes)))
+    print(f"Fake VEO 3 server on http://127.0.0.1:{args.port} (operations finish after {args.delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
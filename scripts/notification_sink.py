@@ -0,0 +1,134 @@
+"""
+A local SMTP and HTTP sink that prints the notifications it receives, for offline testing.
+
+The SMTP side accepts any login and prints each message's subject and
+recipients; the HTTP side accepts a POST to any path and prints the body.
+--fail N answers the first N deliveries on each side with an error, to
+exercise the outbox's retries.
+
+Point the app at it in config.json:
+  SMTP_SERVER "localhost", SMTP_PORT 8025, SMTP_USE_TLS false (any
+  SMTP_USERNAME/SMTP_PASSWORD), or NOTIFICATION_METHOD "webhook" with
+  NOTIFICATION_WEBHOOK_URL "http://localhost:8026/webhook".
+
+Usage:
+  python scripts/notification_sink.py [--smtp-port 8025] [--http-port 8026] [--fail N]
+"""
+import argparse
+import email
+import json
+import socketserver
+import threading
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Failures:
+    """Counts down the deliveries still to be refused."""
+
+    def __init__(self, count):
+        self.remaining = count
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            if self.remaining > 0:
+                self.remaining -= 1
+                return True
+            return False
+
+def make_smtp_handler(failures):
+    class SMTPHandler(socketserver.StreamRequestHandler):
+        def reply(self, line):
+            self.wfile.write(f"{line}\r\n".encode())
+
+        def handle(self):
+            self.reply('220 notification-sink ESMTP')
+            sender, recipients = None, []
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode(errors='replace').strip()
+                verb = command.split(' ', 1)[0].upper()
+                if verb == 'EHLO':
+                    self.reply('250-notification-sink')
+                    self.reply('250 AUTH PLAIN LOGIN')
+                elif verb == 'HELO':
+                    self.reply('250 notification-sink')
+                elif verb == 'AUTH':
+                    self.reply('235 Authentication successful')
+                elif verb == 'MAIL':
+                    sender, recipients = command[10:], []
+                    self.reply('250 OK')
+                elif verb == 'RCPT':
+                    recipients.append(command[8:])
+                    self.reply('250 OK')
+                elif verb == 'DATA':
+                    self.reply('354 End data with <CR><LF>.<CR><LF>')
+                    lines = []
+                    while True:
+                        data_line = self.rfile.readline()
+                        if data_line in (b'.\r\n', b'.\n', b''):
+                            break
+                        lines.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                    if failures.take():
+                        self.reply('451 Sink refusing this message (--fail)')
+                        continue
+                    message = email.message_from_bytes(b''.join(lines), policy=default_policy)
+                    print(f"smtp: {message['Subject']!r} from {sender} to {', '.join(recipients)}")
+                    self.reply('250 OK: queued')
+                elif verb in ('RSET', 'NOOP'):
+                    self.reply('250 OK')
+                elif verb == 'QUIT':
+                    self.reply('221 Bye')
+                    return
+                else:
+                    self.reply('502 Command not implemented')
+
+    return SMTPHandler
+
+def make_http_handler(failures):
+    class HTTPHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, as the notifiers' sessions expect
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+            status = 503 if failures.take() else 200
+            if status == 200:
+                try:
+                    shown = json.dumps(json.loads(body), indent=2)
+                except ValueError:
+                    shown = body.decode(errors='replace')
+                print(f"http: POST {self.path}\n{shown}")
+            reply = json.dumps({'status': 'ok' if status == 200 else 'refused'}).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, format, *args):
+            print(f"http: {format % args}")
+
+    return HTTPHandler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--smtp-port', type=int, default=8025)
+    parser.add_argument('--http-port', type=int, default=8026)
+    parser.add_argument('--fail', type=int, default=0, help='Refuse the first N deliveries on each side')
+    args = parser.parse_args()
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    smtp = socketserver.ThreadingTCPServer(('127.0.0.1', args.smtp_port), make_smtp_handler(Failures(args.fail)))
+    http = ThreadingHTTPServer(('127.0.0.1', args.http_port), make_http_handler(Failures(args.fail)))
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+    print(f"Notification sink: SMTP on 127.0.0.1:{args.smtp_port}, HTTP on 127.0.0.1:{args.http_port}")
+    try:
+        http.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Replay a recorded GPIO service log through the tap state machine, without hardware.
+
+Reads the PRESS/RELEASE edges and the taps the service detected from a log
+such as gpio_test_log.txt (journalctl output of gpio_service.py --debug),
+feeds the edges to TapStateMachine with the same deadline-driven ticks the
+service uses, and checks it detects the same taps within --tolerance seconds.
+Exits 1 on any difference.
+
+Usage:
+  python scripts/replay_gpio_trace.py [gpio_test_log.txt] [--tolerance 0.1] [--verbose]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+from datetime import datetime
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.tap_detector import TapStateMachine
+
+LOG_TIME = re.compile(r'(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) - \w+ - ')
+EDGE = re.compile(r'(PRESS|RELEASE) detected at ([\d.]+)')
+TAP = re.compile(r'(SINGLE|DOUBLE|LONG) TAP detected')
+
+def parse_trace(path):
+    """Return (edges, taps): [(timestamp, level)] and [(timestamp, tap)], on the edges' clock, in order."""
+    edges, logged_taps, offsets = set(), set(), []
+    with open(path, errors='replace') as f:
+        for line in f:
+            match = LOG_TIME.search(line)
+            if not match:
+                continue
+            logged_at = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S,%f').timestamp()
+            edge = EDGE.search(line)
+            tap = TAP.search(line)
+            if edge:
+                timestamp = float(edge.group(2))
+                edges.add((timestamp, 1 if edge.group(1) == 'PRESS' else 0))
+                offsets.append(timestamp - logged_at)
+            elif tap:
+                logged_taps.add((logged_at, f"{tap.group(1).lower()}_tap"))
+    if not offsets:
+        raise SystemExit(f"No PRESS/RELEASE lines in {path}; record it with gpio_service.py --debug")
+    # Edge timestamps may be on another clock than the log's (monotonic, or another timezone)
+    offset = statistics.median(offsets)
+    taps = sorted((logged_at + offset, tap) for logged_at, tap in logged_taps)
+    return repair(sorted(edges)), taps
+
+def repair(edges):
+    """Fill in releases the log leaves out, so every press is preceded by a release.
+
+    Older versions of the service didn't log the release that ends a double tap.
+    """
+    repaired = []
+    for timestamp, level in edges:
+        if repaired and repaired[-1][1] == level:
+            previous = repaired[-1][0]
+            repaired.append(((previous + timestamp) / 2, 1 - level))
+        repaired.append((timestamp, level))
+    return repaired
+
+def replay(edges, machine):
+    """Run the edges through `machine` as the service would; return [(timestamp, tap)]."""
+    taps = []
+    for timestamp, level in edges:
+        deadline = machine.next_deadline()
+        while deadline is not None and deadline < timestamp:
+            taps.extend((deadline, tap) for tap in machine.tick(deadline))
+            deadline = machine.next_deadline()
+        taps.extend((timestamp, tap) for tap in machine.edge(level, timestamp))
+    deadline = machine.next_deadline()
+    while deadline is not None:
+        taps.extend((deadline, tap) for tap in machine.tick(deadline))
+        deadline = machine.next_deadline()
+    return taps
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('log', nargs='?', default='gpio_test_log.txt', help='Log file (default: gpio_test_log.txt)')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed timing difference per tap in seconds')
+    parser.add_argument('--verbose', action='store_true', help='Print every edge as well as the taps')
+    args = parser.parse_args()
+
+    edges, expected = parse_trace(args.log)
+    replayed = replay(edges, TapStateMachine())
+    start = edges[0][0]
+    if args.verbose:
+        for timestamp, level in edges:
+            print(f"{timestamp - start:9.3f}  {'press' if level else 'release'}")
+
+    print(f"{len(edges)} edges, {len(expected)} taps logged, {len(replayed)} replayed")
+    print(f"{'logged':>9} {'':<11} {'replayed':>9} {'':<11} {'delta':>7}")
+    mismatches = 0
+    for i in range(max(len(expected), len(replayed))):
+        logged = expected[i] if i < len(expected) else None
+        ours = replayed[i] if i < len(replayed) else None
+        ok = logged and ours and logged[1] == ours[1] and abs(logged[0] - ours[0]) <= args.tolerance
+        mismatches += not ok
+        left = f"{logged[0] - start:9.3f} {logged[1]:<11}" if logged else f"{'-':>9} {'':<11}"
+        right = f"{ours[0] - start:9.3f} {ours[1]:<11}" if ours else f"{'-':>9} {'':<11}"
+        delta = f"{ours[0] - logged[0]:+7.3f}" if logged and ours else ''
+        print(f"{left} {right} {delta}{'' if ok else '  MISMATCH'}")
+    if mismatches:
+        print(f"{mismatches} taps differ")
+        sys.exit(1)
+    print("Replay matches the log")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Re-run post-processing and thumbnail generation for every dream in the library.
+
+Use after changing FFMPEG_VIBRANCE, FFMPEG_NOISE_STRENGTH, the encoding profile
+or the filter chain in functions/video.py. Each dream is rebuilt from its
+unfiltered VEO 3 download in RAW_VIDEOS_DIR, so filters never stack; dreams
+without a raw download (older dreams, the samples) are skipped.
+
+Work is spread over a process pool and checkpointed per dream in the
+reprocess_state table: a dream whose raw input hash and post-processing
+settings match its last run is skipped, so an interrupted run picks up where
+it stopped. Reprocessed videos and thumbnails get new filenames, since the
+old ones are served with immutable caching.
+
+Usage:
+  python scripts/reprocess_dreams.py [--workers N] [--force] [--dry-run]
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Ensure parent directory is in sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from functions.config_loader import get_config
+from functions.dream_db import DreamDB, get_connection_pool
+from functions.video import (
+    new_video_path, post_process_signature, process_video_and_thumbnail, raw_video_path, thumb_asset_filenames
+)
+
+logger = logging.getLogger('reprocess')
+
+def load_state(pool):
+    with pool.connection() as conn:
+        return {row['dream_id']: dict(row) for row in conn.execute('SELECT * FROM reprocess_state')}
+
+def save_state(pool, dream_id, raw_filename, input_hash, params_hash, video_filename):
+    with pool.connection() as conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO reprocess_state '
+            '(dream_id, raw_filename, input_hash, params_hash, video_filename) VALUES (?, ?, ?, ?, ?)',
+            (dream_id, raw_filename, input_hash, params_hash, video_filename)
+        )
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def reprocess(raw_path):
+    """Worker process: rebuild one dream from its raw download. Returns (video_filename, thumb_filename)."""
+    video_filename, video_path = new_video_path()
+    try:
+        thumb_filename = process_video_and_thumbnail(raw_path, output_path=video_path)
+    except Exception:
+        os.remove(video_path)
+        raise
+    return video_filename, thumb_filename
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Reprocess dreams that are already up to date')
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would be reprocessed')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    dream_db = DreamDB()
+    pool = get_connection_pool(dream_db.db_path)
+    state = load_state(pool)
+    params_hash = post_process_signature()
+
+    todo = []  # (dream, raw_filename, input_hash)
+    up_to_date = no_raw = 0
+    for dream in dream_db.get_all_dreams():
+        previous = state.get(dream['id'])
+        raw_filename = previous['raw_filename'] if previous else dream['video_filename']
+        raw_path = raw_video_path(raw_filename)
+        if not raw_path or not os.path.exists(raw_path):
+            no_raw += 1
+            continue
+        input_hash = file_hash(raw_path)
+        unchanged = (
+            previous is not None
+            and previous['input_hash'] == input_hash
+            and previous['params_hash'] == params_hash
+            and previous['video_filename'] == dream['video_filename']
+        )
+        if unchanged and not args.force:
+            up_to_date += 1
+            continue
+        todo.append((dream, raw_filename, input_hash))
+
+    logger.info(f"{len(todo)} to reprocess, {up_to_date} up to date, {no_raw} without a raw download")
+    if args.dry_run or not todo:
+        return
+
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(reprocess, raw_video_path(raw_filename)): (dream, raw_filename, input_hash)
+            for dream, raw_filename, input_hash in todo
+        }
+        for future in as_completed(futures):
+            dream, raw_filename, input_hash = futures[future]
+            try:
+                video_filename, thumb_filename = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Dream {dream['id']}: failed: {str(e)}")
+                continue
+            dream_db.update_dream(dream['id'], {'video_filename': video_filename, 'thumb_filename': thumb_filename})
+            # Checkpoint before removing the old files, so a crash never loses track of a dream
+            save_state(pool, dream['id'], raw_filename, input_hash, params_hash, video_filename)
+            remove_quietly(os.path.join(get_config()['VIDEOS_DIR'], dream['video_filename']))
+            if dream.get('thumb_filename'):
+                for thumb_name in [dream['thumb_filename']] + thumb_asset_filenames(dream['thumb_filename']):
+                    remove_quietly(os.path.join(get_config()['THUMBS_DIR'], thumb_name))
+            done += 1
+            logger.info(f"Dream {dream['id']}: {dream['video_filename']} -> {video_filename} ({done}/{len(todo)})")
+
+    logger.info(f"Reprocessed {done} dreams, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
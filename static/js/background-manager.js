@@ -6,29 +6,41 @@ class BackgroundManager {
         this.updateInterval = 60000; // 1 minute in milliseconds
         this.isLoading = false;
         this.totalImages = parseInt(document.body.dataset.totalBackgroundImages);
-        
-        // Preload the first image
-        this.preloadNextImage().then(() => {
+        this.manifestUrl = document.body.dataset.backgroundManifest;
+        this.images = null; // Display-sized images from the manifest, in schedule order
+        this.preloaded = null; // { path, promise } for the image fetched ahead of time
+
+        this.loadManifest().then(() => {
+            return this.preloadImage(this.getImagePath());
+        }).then(() => {
             this.start();
         });
     }
 
-    async preloadNextImage() {
-        const newImagePath = this.getImagePath();
-        if (newImagePath === this.currentImage) return;
+    async loadManifest() {
+        if (!this.manifestUrl) return;
+        try {
+            const response = await fetch(this.manifestUrl);
+            if (!response.ok) return;
+            const manifest = await response.json();
+            this.images = manifest.images;
+            this.totalImages = this.images.length;
+        } catch (error) {
+            console.warn('Background manifest unavailable, using full-size images', error);
+        }
+    }
 
-        return new Promise((resolve) => {
-            const img = new Image();
-            img.onload = () => {
-                this.nextImage = img;
-                resolve();
-            };
-            img.src = newImagePath;
-        });
+    preloadImage(path) {
+        // Fetch and decode off the critical path, so the fade starts on a ready image
+        if (this.preloaded && this.preloaded.path === path) return this.preloaded.promise;
+        const img = new Image();
+        img.src = path;
+        const promise = img.decode().catch(() => {});
+        this.preloaded = { path, img, promise };
+        return promise;
     }
 
-    getImageNumberForTime() {
-        const now = new Date();
+    getImageNumberForTime(now = new Date()) {
         const minutesInDay = now.getHours() * 60 + now.getMinutes();
         const totalMinutes = 24 * 60;
         
@@ -37,8 +49,12 @@ class BackgroundManager {
         return Math.min(Math.max(imageNumber, 0), this.totalImages - 1);
     }
 
-    getImagePath() {
-        const imageNumber = this.getImageNumberForTime();
+    getImagePath(when = new Date()) {
+        const imageNumber = this.getImageNumberForTime(when);
+        if (this.images) {
+            // Content-hashed names, so the browser caches them as immutable
+            return `/backgrounds/${this.images[imageNumber].file}`;
+        }
         return `/static/images/background/${imageNumber}.jpg`;
     }
 
@@ -80,21 +96,12 @@ class BackgroundManager {
         this.isLoading = true;
 
         try {
-            // If we have a preloaded image, use it
-            if (this.nextImage && this.nextImage.src === newImagePath) {
-                await this.fadeToNewBackground(newImagePath);
-            } else {
-                // Otherwise, load the new image
-                const img = new Image();
-                await new Promise((resolve) => {
-                    img.onload = resolve;
-                    img.src = newImagePath;
-                });
-                await this.fadeToNewBackground(newImagePath);
-            }
+            // Normally already fetched and decoded by the previous change
+            await this.preloadImage(newImagePath);
+            await this.fadeToNewBackground(newImagePath);
 
-            // Preload the next image
-            await this.preloadNextImage();
+            // Fetch the image due at the next change while this one is showing
+            this.preloadImage(this.getImagePath(new Date(Date.now() + this.updateInterval)));
         } finally {
             this.isLoading = false;
         }
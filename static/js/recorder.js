@@ -6,6 +6,11 @@ let mediaRecorder = null;
 let audioContext = null;
 let analyser = null;
 let animationFrame = null;
+let chunkSequence = 0;
+
+// Send audio chunks as binary Socket.IO attachments. Set to false to fall back
+// to the legacy JSON array framing.
+window.AUDIO_BINARY_FRAMES = window.AUDIO_BINARY_FRAMES !== false;
 
 // Remove resizeCanvas and window resize event
 // function resizeCanvas() { ... }
@@ -95,22 +100,26 @@ window.startRecording = async function() {
         // Handle audio data
         mediaRecorder.ondataavailable = (event) => {
             if (event.data.size > 0) {
+                // Number the chunk now so ordering survives the async read
+                const seq = chunkSequence++;
                 // Convert blob to array buffer before sending
                 event.data.arrayBuffer().then(buffer => {
                     const audioData = {
-                        data: Array.from(new Uint8Array(buffer)),
+                        seq: seq,
+                        data: window.AUDIO_BINARY_FRAMES ? buffer : Array.from(new Uint8Array(buffer)),
                         timestamp: Date.now()
                     };
                     // Emit through the global socket object
                     if (window.socket) {
                         window.socket.emit('stream_recording', audioData);
-                        // console.log('Sent audio_data chunk, size:', audioData.data.length);
+                        // console.log('Sent audio_data chunk', seq, 'size:', buffer.byteLength);
                     }
                 });
             }
         };
 
         // Start recording
+        chunkSequence = 0;
         mediaRecorder.start(100); // Send chunks every 100ms
         if (window.socket) {
             window.socket.emit('start_recording');
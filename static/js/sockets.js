@@ -85,6 +85,13 @@ window.socket.on('video_prompt_update', (data) => {
     window.loadingDiv.style.display = 'none';
 });
 
+window.socket.on('video_progress', (data) => {
+    console.log('Received video_progress:', data);
+    if (data.status === 'pending') {
+        window.messageDiv.textContent = `Generating dream video... ${data.elapsed}s`;
+    }
+});
+
 window.socket.on('video_ready', (data) => {
     console.log('Received video_ready:', data);
     window.videoContainer.style.display = 'block';
@@ -154,6 +161,10 @@ window.socket.on('recording_state', (data) => {
 
 window.socket.on('device_event', (data) => {
     console.log('Received device_event:', data);
+    if (data.detectedAt) {
+        // Kiosk browser and GPIO service share the Pi's clock
+        console.log(`Button-to-UI latency: ${(Date.now() - data.detectedAt * 1000).toFixed(1)} ms`);
+    }
     if (window.StateManager) {
         // Prefer camelCase, fallback to snake_case for compatibility
         const eventType = data.eventType;
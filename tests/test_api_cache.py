@@ -0,0 +1,76 @@
+import pytest
+from functions import api_cache
+from functions.api_cache import ApiCache
+from functions.metrics import API_CACHE_REQUESTS
+
+@pytest.fixture
+def config(monkeypatch):
+    config = {'API_CACHE_MAX_ENTRIES': 3, 'API_CACHE_TTL_DAYS': 30}
+    monkeypatch.setattr(api_cache, 'get_config', lambda: config)
+    return config
+
+@pytest.fixture
+def cache(tmp_path, config):
+    return ApiCache(str(tmp_path / 'cache.db'))
+
+def requests(kind, result):
+    return API_CACHE_REQUESTS._values.get((kind, result), 0)
+
+def test_miss_computes_and_hit_reuses(cache):
+    calls = []
+
+    def transcribe():
+        calls.append(1)
+        return 'I was flying over the sea'
+
+    key = ApiCache.make_key('transcription', b'audio bytes', 'whisper-1')
+    hits, misses = requests('transcription', 'hit'), requests('transcription', 'miss')
+    assert cache.get_or_compute('transcription', key, transcribe) == 'I was flying over the sea'
+    assert cache.get_or_compute('transcription', key, transcribe) == 'I was flying over the sea'
+    assert len(calls) == 1
+    assert requests('transcription', 'hit') == hits + 1
+    assert requests('transcription', 'miss') == misses + 1
+
+def test_failed_results_are_not_cached(cache):
+    key = ApiCache.make_key('prompt', 'flying', 'gpt-4')
+    assert cache.get_or_compute('prompt', key, lambda: None) is None
+    assert cache.get('prompt', key) is None
+
+def test_entries_expire_after_ttl(cache, config):
+    cache.put('prompt', 'old', 'a whale over the city')
+    cache.put('prompt', 'new', 'a forest of clocks')
+    with cache._pool.connection() as conn:
+        conn.execute("UPDATE api_cache SET created_at = datetime('now', '-31 days') WHERE key = 'old'")
+    assert cache.get('prompt', 'new') == 'a forest of clocks'
+    assert cache.get('prompt', 'old') is None
+    # Storing it again starts a fresh lifetime
+    cache.put('prompt', 'old', 'a whale over the city')
+    assert cache.get('prompt', 'old') == 'a whale over the city'
+
+def test_ttl_of_zero_never_expires(cache, config):
+    config['API_CACHE_TTL_DAYS'] = 0
+    cache.put('prompt', 'old', 'a whale over the city')
+    with cache._pool.connection() as conn:
+        conn.execute("UPDATE api_cache SET created_at = datetime('now', '-400 days')")
+    assert cache.get('prompt', 'old') == 'a whale over the city'
+
+def test_least_recently_used_entry_is_evicted_at_the_cap(cache):
+    for key in ('a', 'b', 'c'):
+        cache.put('prompt', key, key.upper())
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get('prompt', 'a') == 'A'
+    cache.put('prompt', 'd', 'D')
+    assert [cache.get('prompt', key) for key in ('a', 'b', 'c', 'd')] == ['A', None, 'C', 'D']
+
+def test_cache_is_bypassed_when_disabled(cache, config):
+    config['API_CACHE_MAX_ENTRIES'] = 0
+    assert cache.get_or_compute('prompt', 'key', lambda: 'fresh') == 'fresh'
+    assert cache.get_or_compute('prompt', 'key', lambda: 'fresher') == 'fresher'
+
+def test_key_is_stable_across_dict_ordering():
+    settings = {'model': 'gpt-4', 'temperature': 0.7}
+    reordered = {'temperature': 0.7, 'model': 'gpt-4'}
+    assert ApiCache.make_key('prompt', 'flying', settings) == ApiCache.make_key('prompt', 'flying', reordered)
+    assert ApiCache.make_key('prompt', 'flying', settings) != ApiCache.make_key('transcription', 'flying', settings)
+    # Parts are length-prefixed, so moving bytes between them changes the key
+    assert ApiCache.make_key('prompt', 'ab', 'c') != ApiCache.make_key('prompt', 'a', 'bc')
@@ -0,0 +1,87 @@
+import os
+import shutil
+import subprocess
+import wave
+from datetime import datetime
+import pytest
+from functions import audio
+from scripts import compress_recordings
+
+@pytest.fixture
+def config(monkeypatch):
+    config = {'AUDIO_ARCHIVE_FORMAT': 'opus', 'AUDIO_ARCHIVE_SAMPLE_RATE': 16000, 'AUDIO_ARCHIVE_BITRATE': '24k'}
+    monkeypatch.setattr(audio, 'get_config', lambda: config)
+    return config
+
+@pytest.fixture
+def encoders(monkeypatch):
+    available = {'libopus', 'flac', 'pcm_s16le'}
+    monkeypatch.setattr(audio, 'available_encoders', lambda kind='V': available)
+    return available
+
+@pytest.mark.parametrize('configured, name, expected', [
+    ('opus', None, 'opus'),
+    ('flac', None, 'flac'),
+    ('wav', None, 'wav'),
+    ('mp3', None, audio.FALLBACK_ARCHIVE_FORMAT),
+    ('', None, audio.FALLBACK_ARCHIVE_FORMAT),
+    ('wav', 'opus', 'opus'),
+])
+def test_archive_format_from_config_or_name(config, encoders, configured, name, expected):
+    config['AUDIO_ARCHIVE_FORMAT'] = configured
+    assert audio.archive_format(name) == expected
+
+def test_falls_back_to_flac_without_an_opus_encoder(config, encoders):
+    encoders.discard('libopus')
+    assert audio.archive_format() == audio.FALLBACK_ARCHIVE_FORMAT
+    assert audio.recording_filename().endswith('.flac')
+
+def test_keeps_the_format_when_encoders_cannot_be_listed(config, monkeypatch):
+    monkeypatch.setattr(audio, 'available_encoders', lambda kind='V': set())
+    assert audio.archive_format() == 'opus'
+
+@pytest.mark.parametrize('filename, fmt', [('recording_1.ogg', 'opus'), ('a.FLAC', 'flac'), ('b.wav', 'wav')])
+def test_format_of_extension(filename, fmt):
+    assert audio.format_of(filename) == fmt
+
+def test_format_of_rejects_other_files():
+    with pytest.raises(ValueError):
+        audio.format_of('recording.webm')
+
+def test_recording_tags():
+    assert audio.recording_tags(42, datetime(2025, 3, 1, 6, 30)) == {
+        'dream_id': 42, 'title': 'Dream 42', 'date': '2025-03-01 06:30:00',
+    }
+
+def test_archive_output_maps_settings_and_tags_to_ffmpeg_arguments(config, encoders):
+    tags = audio.recording_tags(42, datetime(2025, 3, 1, 6, 30))
+    args = audio.archive_output(audio.ffmpeg.input('in.webm'), 'out.ogg', 'opus', tags).get_args()
+    options = dict(zip(args[2:-1:2], args[3:-1:2]))
+    assert options['-acodec'] == 'libopus' and options['-b:a'] == '24k'
+    assert options['-ac'] == '1' and options['-ar'] == '16000'
+    assert [options[f'-metadata:g:{n}'] for n in range(3)] == [
+        'dream_id=42', 'title=Dream 42', 'date=2025-03-01 06:30:00',
+    ]
+    flac = audio.archive_output(audio.ffmpeg.input('in.webm'), 'out.flac', 'flac').get_args()
+    assert '-b:a' not in flac and 'flac' in flac and 's16' in flac
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+def test_compress_recording_writes_a_tagged_archive(tmp_path, config):
+    wav_path = str(tmp_path / 'recording_20250301_063000.wav')
+    with wave.open(wav_path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(b'\0\0' * 44100)
+    filename, size = compress_recordings.compress_recording(wav_path, 'flac', audio.recording_tags(7))
+    assert filename == 'recording_20250301_063000.flac'
+    assert size == os.path.getsize(tmp_path / filename)
+    archive = str(tmp_path / filename)
+    metadata = subprocess.run(['ffmpeg', '-v', 'error', '-i', archive, '-f', 'ffmetadata', '-'],
+                              capture_output=True, text=True, check=True).stdout
+    assert 'dream_id=7' in metadata.splitlines()
+    # One second of 16-bit mono decodes to 32000 bytes at its stored 16 kHz rate
+    pcm = subprocess.run(['ffmpeg', '-v', 'error', '-i', archive, '-f', 's16le', '-'],
+                         capture_output=True, check=True).stdout
+    assert len(pcm) == 2 * 16000
+    assert not os.path.exists(tmp_path / 'recording_20250301_063000.compressing.flac')
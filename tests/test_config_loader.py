@@ -0,0 +1,114 @@
+import json
+import logging
+import pytest
+from functions import config_loader
+from functions.config_loader import ConfigError, build_config, get_config, load_config, subscribe
+
+TEMPLATE = {
+    'VIDEO_HISTORY_LIMIT': {'name': 'VIDEO_HISTORY_LIMIT', 'type': 'integer', 'default': 7},
+    'VAD_ENABLED': {'name': 'VAD_ENABLED', 'type': 'boolean', 'default': True},
+    'VAD_PADDING_SECONDS': {'name': 'VAD_PADDING_SECONDS', 'type': 'float', 'default': 0.3},
+    'GPT_MODEL': {'name': 'GPT_MODEL', 'type': 'string', 'default': 'gpt-4'},
+    'VIDEO_ENCODING_PROFILE': {'name': 'VIDEO_ENCODING_PROFILE', 'type': 'string', 'default': 'balanced',
+                               'options': ['fast', 'balanced', 'quality']},
+}
+
+@pytest.fixture(autouse=True)
+def template(monkeypatch):
+    monkeypatch.setattr(config_loader, '_template', TEMPLATE)
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / 'config.json'
+    monkeypatch.setattr(config_loader, 'CONFIG_FILE', str(path))
+    monkeypatch.setattr(config_loader, '_config', None)
+    monkeypatch.setattr(config_loader, '_subscribers', [])
+    return path
+
+def test_fills_in_defaults_and_passes_unknown_keys_through():
+    config = build_config({'GPT_MODEL': 'gpt-4o', 'CUSTOM': [1, 2]})
+    assert config['VIDEO_HISTORY_LIMIT'] == 7 and config['VAD_ENABLED'] is True
+    assert config['GPT_MODEL'] == 'gpt-4o'
+    assert config['CUSTOM'] == [1, 2]
+
+@pytest.mark.parametrize('name, raw, value', [
+    ('VIDEO_HISTORY_LIMIT', '12', 12),
+    ('VIDEO_HISTORY_LIMIT', 12.0, 12),
+    ('VAD_ENABLED', 'false', False),
+    ('VAD_ENABLED', ' Yes ', True),
+    ('VAD_ENABLED', 0, False),
+    ('VAD_PADDING_SECONDS', '0.5', 0.5),
+    ('VAD_PADDING_SECONDS', 1, 1.0),
+    ('GPT_MODEL', 4, '4'),
+    ('GPT_MODEL', None, None),
+])
+def test_values_are_converted_to_their_template_type(name, raw, value):
+    converted = build_config({name: raw})[name]
+    assert converted == value and type(converted) is type(value)
+
+@pytest.mark.parametrize('name, raw', [
+    ('VIDEO_HISTORY_LIMIT', 2.5),
+    ('VIDEO_HISTORY_LIMIT', True),
+    ('VIDEO_HISTORY_LIMIT', 'seven'),
+    ('VAD_ENABLED', 'maybe'),
+    ('VAD_ENABLED', 1.5),
+    ('VAD_PADDING_SECONDS', 'soon'),
+])
+def test_bad_values_are_rejected(name, raw):
+    with pytest.raises(ConfigError, match=name):
+        build_config({name: raw})
+
+def test_value_outside_options_is_only_a_warning(caplog):
+    with caplog.at_level(logging.WARNING, logger='functions.config_loader'):
+        assert build_config({'VIDEO_ENCODING_PROFILE': 'ultra'})['VIDEO_ENCODING_PROFILE'] == 'ultra'
+    assert 'VIDEO_ENCODING_PROFILE' in caplog.text
+
+def test_config_is_read_only():
+    config = build_config({})
+    with pytest.raises(TypeError):
+        config['GPT_MODEL'] = 'gpt-3.5'
+    with pytest.raises(AttributeError):
+        config.update({'GPT_MODEL': 'gpt-3.5'})
+
+def test_subscribers_fire_only_when_a_reload_changes_the_config(config_file):
+    config_file.write_text(json.dumps({'VIDEO_HISTORY_LIMIT': 7}))
+    calls = []
+    subscribe(lambda new, old: calls.append((old['VIDEO_HISTORY_LIMIT'], new['VIDEO_HISTORY_LIMIT'])))
+    load_config()
+    load_config()
+    assert calls == []
+    config_file.write_text(json.dumps({'VIDEO_HISTORY_LIMIT': '9'}))
+    assert load_config()['VIDEO_HISTORY_LIMIT'] == 9
+    assert calls == [(7, 9)]
+
+def test_failing_subscriber_does_not_stop_the_others(config_file):
+    config_file.write_text(json.dumps({'GPT_MODEL': 'gpt-4'}))
+    load_config()
+    calls = []
+
+    @subscribe
+    def broken(new, old):
+        raise RuntimeError('boom')
+
+    subscribe(lambda new, old: calls.append(new['GPT_MODEL']))
+    config_file.write_text(json.dumps({'GPT_MODEL': 'gpt-4o'}))
+    load_config()
+    assert calls == ['gpt-4o']
+
+@pytest.mark.parametrize('contents', ['{"VIDEO_HISTORY_LIMIT": ', '{"VIDEO_HISTORY_LIMIT": "seven"}'])
+def test_bad_reload_keeps_the_last_good_config(config_file, contents):
+    config_file.write_text(json.dumps({'VIDEO_HISTORY_LIMIT': 7}))
+    good = load_config()
+    config_file.write_text(contents)
+    with pytest.raises(ConfigError):
+        load_config()
+    assert get_config() is good
+    # The watcher logs the error and carries on
+    config_loader._reload()
+    assert get_config() is good
+
+def test_example_config_builds_against_the_real_template(monkeypatch):
+    monkeypatch.setattr(config_loader, '_template', None)
+    with open(config_loader.TEMPLATE_PATH.replace('config.template.json', 'config.example.json')) as f:
+        config = build_config(json.load(f))
+    assert set(config_loader.load_template()) <= set(config)
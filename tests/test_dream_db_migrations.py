@@ -0,0 +1,121 @@
+import sqlite3
+import pytest
+from functions import dream_db as dream_db_module
+from functions.dream_db import DreamDB, MIGRATIONS, SEARCH_SCHEMA
+
+# The schema DreamDB created before it had migrations: user_version 0
+V0_SCHEMA = (
+    '''
+    CREATE TABLE dreams (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_prompt TEXT NOT NULL,
+        generated_prompt TEXT NOT NULL,
+        audio_filename TEXT NOT NULL,
+        video_filename TEXT NOT NULL,
+        thumb_filename TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT
+    )
+    ''',
+    'CREATE INDEX idx_dreams_created_at ON dreams (created_at DESC, id DESC)',
+) + SEARCH_SCHEMA
+
+class MigrationTestDB(DreamDB):
+    def _init_sample_dreams(self):
+        pass
+
+@pytest.fixture
+def v0_path(tmp_path):
+    path = str(tmp_path / 'dreams.db')
+    conn = sqlite3.connect(path)
+    for statement in V0_SCHEMA:
+        conn.execute(statement)
+    conn.executemany(
+        'INSERT INTO dreams (user_prompt, generated_prompt, audio_filename, video_filename, thumb_filename, status) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        [(f'flying dream {i}', f'a scene {i}', f'audio_{i}.wav', f'video_{i}.mp4', f'thumb_{i}.png', 'completed')
+         for i in range(1, 6)]
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+def test_upgrades_v0_database(v0_path):
+    db = MigrationTestDB(v0_path)
+    assert db.schema_version() == MIGRATIONS[-1][0]
+    dreams = db.get_all_dreams()
+    assert len(dreams) == 5
+    assert {dream['user_prompt'] for dream in dreams} == {f'flying dream {i}' for i in range(1, 6)}
+    assert all(dream['duration'] is None and dream['file_size'] is None for dream in dreams)
+    if db.search_enabled:
+        assert db.search_dreams('flying')[1] == 5
+
+    dream_id = db.save_dream({
+        'user_prompt': 'new', 'generated_prompt': 'new', 'audio_filename': 'a.wav', 'video_filename': 'v.mp4',
+        'duration': 8.0, 'file_size': 1024,
+    })
+    assert db.get_dream(dream_id)['duration'] == 8.0
+
+def test_migrating_twice_is_a_no_op(v0_path):
+    MigrationTestDB(v0_path)
+    db = MigrationTestDB(v0_path)
+    assert db.schema_version() == MIGRATIONS[-1][0]
+    assert len(db.get_all_dreams()) == 5
+
+def test_failed_migration_rolls_back(v0_path, monkeypatch):
+    db = MigrationTestDB(v0_path)
+    version = db.schema_version()
+
+    def broken(cursor):
+        cursor.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError('migration failed')
+
+    monkeypatch.setattr(dream_db_module, 'MIGRATIONS', MIGRATIONS + ((version + 1, 'broken', broken),))
+    with pytest.raises(RuntimeError):
+        db.migrate()
+    assert db.schema_version() == version
+    with db._pool.connection() as conn:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+
+def test_backfill_resumes_after_interruption(v0_path, monkeypatch):
+    db = MigrationTestDB(v0_path)
+    batches = []
+
+    def compute(dreams):
+        batches.append([dream['id'] for dream in dreams])
+        if len(batches) == 2:
+            raise RuntimeError('interrupted')
+        return {dream['id']: {'duration': 8.0, 'file_size': dream['id'] * 100} for dream in dreams}
+
+    monkeypatch.setattr(dream_db_module, 'BACKFILLS', {'video_metadata': compute})
+    with pytest.raises(RuntimeError):
+        db.run_backfills(batch_size=2, pause=0)
+    # Restarted, it picks up at the batch that failed
+    db.run_backfills(batch_size=2, pause=0)
+    assert batches == [[1, 2], [3, 4], [3, 4], [5]]
+    dreams = sorted(db.get_all_dreams(), key=lambda dream: dream['id'])
+    assert [dream['file_size'] for dream in dreams] == [100, 200, 300, 400, 500]
+    with db._pool.connection() as conn:
+        assert conn.execute("SELECT completed_at FROM backfills WHERE name = 'video_metadata'").fetchone()[0]
+    # Finished backfills don't run again
+    db.run_backfills(batch_size=2, pause=0)
+    assert len(batches) == 4
+
+def test_deleting_a_reprocessed_dream_finds_its_raw_download(v0_path):
+    # reprocess_dreams.py used to create its state table itself
+    conn = sqlite3.connect(v0_path)
+    conn.execute(
+        'CREATE TABLE reprocess_state (dream_id INTEGER PRIMARY KEY, raw_filename TEXT NOT NULL, '
+        'input_hash TEXT NOT NULL, params_hash TEXT NOT NULL, video_filename TEXT NOT NULL, '
+        'updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'
+    )
+    conn.execute("INSERT INTO reprocess_state VALUES (2, 'video_2.mp4', 'a', 'b', 'generated_2.mp4', NULL)")
+    conn.execute("UPDATE dreams SET video_filename = 'generated_2.mp4' WHERE id = 2")
+    conn.commit()
+    conn.close()
+    db = MigrationTestDB(v0_path)
+    assert db.raw_video_filename(db.get_dream(1)) == 'video_1.mp4'
+    assert db.raw_video_filename(db.get_dream(2)) == 'video_2.mp4'
+    assert db.delete_dream(2)
+    with db._pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM reprocess_state').fetchone()[0] == 0
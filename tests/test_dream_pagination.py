@@ -0,0 +1,77 @@
+import pytest
+import dream_recorder
+from functions.dream_db import DreamDB
+
+class PageTestDB(DreamDB):
+    def _init_sample_dreams(self):
+        pass
+
+# Dreams 2-4 share a created_at, so only the id orders them
+CREATED_AT = ['2025-01-01 08:00:00', '2025-01-02 08:00:00', '2025-01-02 08:00:00', '2025-01-02 08:00:00',
+              '2025-01-03 08:00:00', '2025-01-04 08:00:00', '2025-01-04 08:00:00']
+
+@pytest.fixture
+def db(tmp_path):
+    db = PageTestDB(str(tmp_path / 'dreams.db'))
+    for i, created_at in enumerate(CREATED_AT, 1):
+        dream_id = db.save_dream({
+            'user_prompt': f'dream {i}', 'generated_prompt': f'scene {i}',
+            'audio_filename': f'audio_{i}.ogg', 'video_filename': f'video_{i}.mp4',
+        })
+        db.update_dream(dream_id, {'created_at': created_at})
+    return db
+
+# Newest first, ties broken by the higher id
+NEWEST_FIRST = [7, 6, 5, 4, 3, 2, 1]
+
+def all_pages(db, limit):
+    pages, before = [], None
+    while True:
+        dreams, before = db.get_dreams_page(limit=limit, before=before)
+        pages.append([dream['id'] for dream in dreams])
+        if before is None:
+            return pages
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 7, 10])
+def test_cursor_walks_every_dream_once_in_order(db, limit):
+    pages = all_pages(db, limit)
+    assert [dream_id for page in pages for dream_id in page] == NEWEST_FIRST
+    assert all(len(page) == limit for page in pages[:-1])
+
+def test_cursor_round_trips(db):
+    dream = db.get_dream(3)
+    assert DreamDB.decode_cursor(DreamDB.encode_cursor(dream)) == ('2025-01-02 08:00:00', 3)
+    # A page resumes right after a tie, not after the whole second
+    dreams, _ = db.get_dreams_page(limit=10, before=DreamDB.encode_cursor(dream))
+    assert [dream['id'] for dream in dreams] == [2, 1]
+
+def test_dream_deleted_between_pages_does_not_shift_the_next_page(db):
+    dreams, before = db.get_dreams_page(limit=3)
+    db.delete_dream(dreams[-1]['id'])
+    assert [dream['id'] for dream in db.get_dreams_page(limit=3, before=before)[0]] == [4, 3, 2]
+
+@pytest.mark.parametrize('cursor', ['garbage', '2025-01-02 08:00:00|three', '|3'])
+def test_malformed_cursor_raises(db, cursor):
+    with pytest.raises(ValueError):
+        db.get_dreams_page(before=cursor)
+
+@pytest.fixture
+def api(db, monkeypatch, test_client):
+    monkeypatch.setattr(dream_recorder, 'dream_db', db)
+    return test_client
+
+def test_api_pages_through_the_library(api):
+    first = api.get('/api/dreams?limit=4').get_json()
+    assert [dream['id'] for dream in first['dreams']] == NEWEST_FIRST[:4]
+    assert first['total'] == 7
+    second = api.get('/api/dreams', query_string={'limit': 4, 'before': first['next_cursor']}).get_json()
+    assert [dream['id'] for dream in second['dreams']] == NEWEST_FIRST[4:]
+    assert second['next_cursor'] is None
+    # The total is only counted for the first page
+    assert 'total' not in second
+
+@pytest.mark.parametrize('query', [{'before': 'garbage'}, {'before': 'x|y'}, {'limit': 'ten'}])
+def test_api_rejects_malformed_parameters(api, query):
+    response = api.get('/api/dreams', query_string=query)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,83 @@
+import pytest
+import dream_recorder
+from functions.dream_db import DreamDB
+
+class SearchTestDB(DreamDB):
+    def _init_sample_dreams(self):
+        pass
+
+PROMPTS = [
+    ('I was flying over the sea', 'A dreamer soars above a calm ocean at dawn'),
+    ('A whale swam through my kitchen', 'A blue whale glides between cupboards, flying fish around it'),
+    ('Lost in a library of <script> books', 'Endless shelves under a 100% cloudy sky'),
+    ('My teeth fell out', 'Close-up of a mirror in a dim_bathroom'),
+]
+
+@pytest.fixture(params=['fts5', 'like'])
+def db(request, tmp_path):
+    db = SearchTestDB(str(tmp_path / 'dreams.db'))
+    if request.param == 'fts5' and not db.search_enabled:
+        pytest.skip('this SQLite has no FTS5')
+    # Search as an SQLite without FTS5 would
+    db.search_enabled = request.param == 'fts5'
+    for i, (user_prompt, generated_prompt) in enumerate(PROMPTS, 1):
+        db.save_dream({
+            'user_prompt': user_prompt, 'generated_prompt': generated_prompt,
+            'audio_filename': f'audio_{i}.ogg', 'video_filename': f'video_{i}.mp4',
+        })
+    return db
+
+def ids(result):
+    return sorted(dream['id'] for dream in result[0])
+
+@pytest.mark.parametrize('text, query', [
+    ('flying whale', '"flying" "whale"*'),
+    ('whale" OR sea', '"whale" "OR" "sea"*'),
+    ('-sea* NEAR(fish', '"sea" "NEAR" "fish"*'),
+    ('teeth a', '"teeth" "a"'),
+    ('"*()', None),
+    ('', None),
+])
+def test_search_query_quotes_every_word(text, query):
+    assert DreamDB.search_query(text) == query
+
+def test_matches_every_word_in_either_prompt(db):
+    assert ids(db.search_dreams('flying')) == [1, 2]
+    assert ids(db.search_dreams('flying whale')) == [2]
+    assert db.search_dreams('flying whale')[1] == 1
+
+def test_last_word_matches_as_a_prefix(db):
+    assert ids(db.search_dreams('libr')) == [3]
+    assert ids(db.search_dreams('whale kitch')) == [2]
+
+@pytest.mark.parametrize('text', ['whale" OR "sea', 'whale)', 'NOT whale', 'whale AND', '100%', "it's", 'dim_'])
+def test_special_characters_in_input_are_not_syntax(db, text):
+    dreams, total = db.search_dreams(text)
+    assert total == len(dreams)
+
+def test_percent_and_underscore_match_literally(db):
+    assert ids(db.search_dreams('dim_bathroom')) == [4]
+    assert db.search_dreams('e_t')[1] == 0
+
+def test_input_without_words_matches_nothing(db):
+    assert db.search_dreams('"*() ') == ([], 0)
+
+def test_snippet_marks_matches_and_escapes_html(db):
+    [dream], _ = db.search_dreams('library')
+    assert '<mark>library</mark>' in dream['snippet'].lower()
+    assert '&lt;script&gt;' in dream['snippet'] and '<script>' not in dream['snippet']
+
+def test_pages_with_offset(db):
+    first, total = db.search_dreams('a', limit=2)
+    second, _ = db.search_dreams('a', limit=2, offset=2)
+    assert total == 4
+    assert len(first) == 2 and len(second) == 2
+    assert not {dream['id'] for dream in first} & {dream['id'] for dream in second}
+
+def test_api_search(db, monkeypatch, test_client):
+    monkeypatch.setattr(dream_recorder, 'dream_db', db)
+    page = test_client.get('/api/dreams/search', query_string={'q': 'whale', 'limit': 1}).get_json()
+    assert [dream['id'] for dream in page['dreams']] == [2]
+    assert page['total'] == 1 and page['next_offset'] is None
+    assert '<mark>' in page['dreams'][0]['snippet']
+    assert test_client.get('/api/dreams/search', query_string={'q': 'a', 'offset': 'x'}).status_code == 400
@@ -0,0 +1,51 @@
+import importlib
+import logging
+import sys
+import time
+import types
+import pytest
+
+CONFIG = {'GPIO_FLASK_URL': 'http://localhost:5000', 'GPIO_SINGLE_TAP_ENDPOINT': '/api/single_tap'}
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+@pytest.fixture
+def gpio_service(monkeypatch):
+    # gpio_service drives the button through lgpio, which only installs on the Pi;
+    # EventSender never touches it, so an empty module is enough to import it
+    monkeypatch.setitem(sys.modules, 'lgpio', types.ModuleType('lgpio'))
+    monkeypatch.delitem(sys.modules, 'gpio_service', raising=False)
+    return importlib.import_module('gpio_service')
+
+def make_sender(gpio_service, statuses):
+    sender = gpio_service.EventSender(CONFIG)
+    sender.MAX_RETRY_DELAY = 0.01
+    sender.MAX_EVENT_AGE = 0.5
+    posts = []
+
+    def post(url, json, timeout):
+        posts.append(url)
+        return Response(statuses[min(len(posts), len(statuses)) - 1])
+
+    sender.session.post = post
+    return sender, posts
+
+def test_non_2xx_response_is_retried_until_accepted(gpio_service, caplog):
+    sender, posts = make_sender(gpio_service, [503, 502, 200])
+    with caplog.at_level(logging.INFO, logger='gpio_service'):
+        sender._deliver('single_tap', time.time())
+    assert posts == ['http://localhost:5000/api/single_tap'] * 3
+    assert [record.levelname for record in caplog.records] == ['WARNING', 'WARNING', 'INFO']
+    assert 'single_tap sent: 200' in caplog.records[-1].getMessage()
+
+def test_event_still_rejected_after_max_age_is_dropped_with_an_error(gpio_service, caplog):
+    sender, posts = make_sender(gpio_service, [500])
+    with caplog.at_level(logging.INFO, logger='gpio_service'):
+        sender._deliver('single_tap', time.time())
+    assert len(posts) > 1
+    assert not any('sent' in record.getMessage() for record in caplog.records)
+    dropped = caplog.records[-1]
+    assert dropped.levelname == 'ERROR'
+    assert 'Dropped single_tap' in dropped.getMessage() and 'HTTP 500' in dropped.getMessage()
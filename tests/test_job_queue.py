@@ -0,0 +1,76 @@
+import time
+import gevent
+import pytest
+from functions.job_queue import JobQueue, PermanentJobError
+
+def make_queue(tmp_path, handlers, errors=None, **kwargs):
+    queue = JobQueue(db_path=str(tmp_path / 'jobs.db'), on_error=lambda payload, e: errors.append(str(e)),
+                     **kwargs)
+    for name, handler in handlers:
+        queue.add_stage(name, handler)
+    return queue
+
+def wait_for(queue, job_id, status, timeout=2.0):
+    with gevent.Timeout(timeout):
+        while queue.get_job(job_id)['status'] != status:
+            gevent.sleep(0.01)
+    return queue.get_job(job_id)
+
+def test_failed_stage_is_retried_with_backoff_and_keeps_earlier_results(tmp_path):
+    calls = {'transcribe': 0, 'generate': []}
+
+    def transcribe(payload):
+        calls['transcribe'] += 1
+        return dict(payload, transcription='flying')
+
+    def generate(payload):
+        calls['generate'].append(time.monotonic())
+        if len(calls['generate']) < 3:
+            raise RuntimeError('VEO 3 unavailable')
+        return dict(payload, video='dream.mp4')
+
+    errors = []
+    queue = make_queue(tmp_path, [('transcribe', transcribe), ('generate', generate)], errors,
+                       max_attempts=3, retry_delay=0.05)
+    queue.start()
+    job = wait_for(queue, queue.enqueue({}), 'completed')
+    assert job['payload'] == {'transcription': 'flying', 'video': 'dream.mp4'}
+    assert calls['transcribe'] == 1
+    first, second, third = calls['generate']
+    assert second - first >= 0.04 and third - second >= 0.09
+    assert errors == []
+
+def test_job_fails_after_max_attempts(tmp_path):
+    def generate(payload):
+        raise RuntimeError('still down')
+
+    errors = []
+    queue = make_queue(tmp_path, [('generate', generate)], errors, max_attempts=2, retry_delay=0.01)
+    queue.start()
+    job = wait_for(queue, queue.enqueue({}), 'failed')
+    assert job['attempts'] == 2
+    gevent.sleep(0.05)
+    assert errors == ['still down']
+
+def test_permanent_error_is_not_retried(tmp_path):
+    def transcribe(payload):
+        raise PermanentJobError('no speech')
+
+    errors = []
+    queue = make_queue(tmp_path, [('transcribe', transcribe)], errors, max_attempts=3, retry_delay=0.01)
+    queue.start()
+    assert wait_for(queue, queue.enqueue({}), 'failed')['attempts'] == 1
+    assert errors == ['no speech']
+
+@pytest.mark.parametrize('retention_days, kept', [(7, 2), (0, 3)])
+def test_prune_removes_old_finished_jobs(tmp_path, retention_days, kept):
+    queue = make_queue(tmp_path, [('transcribe', lambda payload: payload)], retention_days=retention_days)
+    for _ in range(3):
+        queue.enqueue({})
+    with queue._pool.connection() as conn:
+        conn.execute("UPDATE jobs SET status = 'completed', updated_at = datetime('now', '-30 days') WHERE id = 1")
+        conn.execute("UPDATE jobs SET status = 'failed' WHERE id = 2")
+        conn.commit()
+    queue.prune()
+    with queue._pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0] == kept
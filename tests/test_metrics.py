@@ -0,0 +1,76 @@
+import pytest
+from functions import metrics
+from functions.metrics import Counter, Histogram, counted, timed
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    # Keep test metrics out of the app's /metrics output
+    monkeypatch.setattr(metrics, '_registry', [])
+
+def test_counter_renders_each_label_set():
+    counter = Counter('dream_events_total', 'Events seen.', ['event'])
+    counter.inc(event='single_tap')
+    counter.inc(2, event='single_tap')
+    counter.inc(event='double_tap')
+    assert counter.render() == [
+        '# HELP dream_events_total Events seen.',
+        '# TYPE dream_events_total counter',
+        'dream_events_total{event="double_tap"} 1',
+        'dream_events_total{event="single_tap"} 3',
+    ]
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    histogram = Histogram('dream_step_seconds', 'Step time.', ['step'], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe(value, step='gpt')
+    assert histogram.render() == [
+        '# HELP dream_step_seconds Step time.',
+        '# TYPE dream_step_seconds histogram',
+        'dream_step_seconds_bucket{step="gpt",le="0.1"} 1',
+        'dream_step_seconds_bucket{step="gpt",le="1"} 3',
+        'dream_step_seconds_bucket{step="gpt",le="+Inf"} 4',
+        'dream_step_seconds_sum{step="gpt"} 6.05',
+        'dream_step_seconds_count{step="gpt"} 4',
+    ]
+
+def test_label_values_are_escaped():
+    counter = Counter('dream_errors_total', 'Errors.', ['message'])
+    counter.inc(message='bad "quote" \\ and\nnewline')
+    assert counter.render()[-1] == r'dream_errors_total{message="bad \"quote\" \\ and\nnewline"} 1'
+
+def test_render_joins_every_registered_metric():
+    Counter('first_total', 'First.').inc()
+    Counter('second_total', 'Second.').inc()
+    assert metrics.render() == (
+        '# HELP first_total First.\n# TYPE first_total counter\nfirst_total 1\n'
+        '# HELP second_total Second.\n# TYPE second_total counter\nsecond_total 1\n'
+    )
+
+def test_timed_records_even_when_the_function_raises():
+    histogram = Histogram('dream_step_seconds', 'Step time.', ['step'])
+
+    @timed(histogram, step='whisper')
+    def transcribe(fail):
+        if fail:
+            raise RuntimeError('Whisper unavailable')
+        return 'flying'
+
+    assert transcribe(False) == 'flying'
+    with pytest.raises(RuntimeError):
+        transcribe(True)
+    assert histogram._values[('whisper',)][2] == 2
+    assert transcribe.__name__ == 'transcribe'
+
+def test_counted_counts_calls_that_run_including_ones_that_raise():
+    counter = Counter('dream_socketio_events_total', 'Events.', ['event'])
+
+    @counted(counter, event='start_recording')
+    def handler(data):
+        raise ValueError('bad payload')
+
+    with pytest.raises(ValueError):
+        handler({})
+    # A call with the wrong arguments never runs, so it isn't counted
+    with pytest.raises(TypeError):
+        handler()
+    assert counter._values == {('start_recording',): 1}
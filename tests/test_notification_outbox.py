@@ -0,0 +1,140 @@
+import sqlite3
+import time
+import gevent
+import pytest
+from functions import notification_outbox
+from functions.notification_outbox import NotificationOutbox
+
+class StubNotifier:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    def send_dreams(self, dreams):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('SMTP server unavailable')
+        self.sent.append([dream['id'] for dream in dreams])
+
+@pytest.fixture
+def config(monkeypatch):
+    config = {'NOTIFICATION_DIGEST_WINDOW': 0.05, 'NOTIFICATION_RETRY_DELAY': 30, 'NOTIFICATION_MAX_ATTEMPTS': 3,
+              'NOTIFICATION_RETENTION_DAYS': 7}
+    monkeypatch.setattr(notification_outbox, 'get_config', lambda: config)
+    return config
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'outbox.db')
+
+def statuses(outbox):
+    return [(row['channel'], row['status']) for row in outbox.get_notifications()]
+
+def test_quick_enqueues_become_one_digest(db_path, config):
+    notifier = StubNotifier()
+    outbox = NotificationOutbox(db_path, notifiers={'simple': notifier})
+    outbox.start()
+    try:
+        for dream_id in (1, 2, 3):
+            outbox.enqueue({'id': dream_id})
+        gevent.sleep(0.3)
+    finally:
+        outbox.stop()
+    assert notifier.sent == [[1, 2, 3]]
+    assert statuses(outbox) == [('simple', 'sent')] * 3
+
+def test_failing_notifier_backs_off_then_gives_up(db_path, config):
+    outbox = NotificationOutbox(db_path, notifiers={'email': StubNotifier(failures=10)})
+    outbox.enqueue({'id': 1})
+    for attempt, delay in enumerate([30, 60], 1):
+        before = time.time()
+        outbox._deliver('email', outbox.get_notifications())
+        row = outbox.get_notifications()[0]
+        assert (row['status'], row['attempts']) == ('pending', attempt)
+        # Due again after NOTIFICATION_RETRY_DELAY, doubling each time
+        assert row['due_at'] - before == pytest.approx(delay, abs=1)
+        assert row['error'] == 'SMTP server unavailable'
+    outbox._deliver('email', outbox.get_notifications())
+    row = outbox.get_notifications()[0]
+    assert (row['status'], row['attempts']) == ('failed', 3)
+
+def test_pending_rows_are_delivered_after_a_restart(db_path, config):
+    NotificationOutbox(db_path, notifiers={'simple': StubNotifier()}).enqueue({'id': 7})
+    notifier = StubNotifier()
+    restarted = NotificationOutbox(db_path, notifiers={'simple': notifier})
+    restarted.start()
+    try:
+        gevent.sleep(0.3)
+    finally:
+        restarted.stop()
+    assert notifier.sent == [[7]]
+
+def test_rows_for_a_removed_channel_fail_at_once(db_path, config):
+    # Email switched from SMTP to Resend while a notification was pending
+    NotificationOutbox(db_path, notifiers={'email': StubNotifier()}).enqueue({'id': 3})
+    resend = StubNotifier()
+    outbox = NotificationOutbox(db_path, notifiers={'resend': resend})
+    outbox.enqueue({'id': 4})
+    outbox.start()
+    try:
+        gevent.sleep(0.3)
+    finally:
+        outbox.stop()
+    assert resend.sent == [[4]]
+    email = [row for row in outbox.get_notifications() if row['channel'] == 'email']
+    assert [(row['status'], row['attempts']) for row in email] == [('failed', 1)]
+
+def test_attempts_are_counted_per_row(db_path, config):
+    outbox = NotificationOutbox(db_path, notifiers={'email': StubNotifier(failures=10)})
+    outbox.enqueue({'id': 1})
+    for _ in range(2):
+        outbox._deliver('email', outbox.get_notifications(status='pending'))
+    outbox.enqueue({'id': 2})
+    outbox._deliver('email', outbox.get_notifications(status='pending'))
+    rows = outbox.get_notifications()
+    # The old row is given up; the one queued just now has only had one try
+    assert [(row['status'], row['attempts']) for row in rows] == [('failed', 3), ('pending', 1)]
+
+def test_delivery_loop_survives_errors(db_path, config, monkeypatch):
+    monkeypatch.setattr(notification_outbox, 'LOOP_ERROR_DELAY', 0.05)
+    notifier = StubNotifier()
+    outbox = NotificationOutbox(db_path, notifiers={'simple': notifier})
+    pending = outbox._pending
+    calls = []
+
+    def locked_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        return pending()
+
+    monkeypatch.setattr(outbox, '_pending', locked_once)
+    outbox.enqueue({'id': 1})
+    with outbox._pool.connection() as conn:
+        conn.execute("UPDATE notifications SET dream = 'not json'")
+    outbox.enqueue({'id': 2})
+    outbox.start()
+    try:
+        gevent.sleep(0.3)
+        # A broken row is retried like any failed delivery, and the greenlet keeps going
+        assert [row['status'] for row in outbox.get_notifications()] == ['pending', 'pending']
+        outbox.enqueue({'id': 3})
+        with outbox._pool.connection() as conn:
+            conn.execute("DELETE FROM notifications WHERE dream = 'not json'")
+        outbox._wakeup.set()
+        gevent.sleep(0.3)
+    finally:
+        outbox.stop()
+    assert notifier.sent == [[2, 3]]
+
+def test_old_sent_and_failed_rows_are_pruned(db_path, config):
+    outbox = NotificationOutbox(db_path, notifiers={'simple': StubNotifier()})
+    for dream_id in (1, 2, 3, 4):
+        outbox.enqueue({'id': dream_id})
+    with outbox._pool.connection() as conn:
+        conn.execute("UPDATE notifications SET created_at = datetime('now', '-30 days') WHERE id IN (1, 2, 3)")
+        conn.execute("UPDATE notifications SET status = 'sent' WHERE id IN (1, 4)")
+        conn.execute("UPDATE notifications SET status = 'failed' WHERE id = 2")
+    assert outbox.prune() == 2
+    # Pending rows are kept however old they are
+    assert [row['id'] for row in outbox.get_notifications()] == [3, 4]
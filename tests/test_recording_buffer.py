@@ -0,0 +1,61 @@
+import hashlib
+import io
+import os
+import pytest
+from functions.recording_buffer import RecordingBuffer
+
+MB = 1024 * 1024
+
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def read_back(buffer):
+    out = io.BytesIO()
+    buffer.write_to(out)
+    return out.getvalue()
+
+@pytest.mark.parametrize('memory_limit', [1024, MB])
+def test_late_chunks_are_read_back_in_sequence_order(tmp_path, memory_limit):
+    buffer = RecordingBuffer(memory_limit=memory_limit, directory=str(tmp_path))
+    for seq in [0, 1, 3, 4, 2, 6, 5]:
+        buffer.append(bytes([seq]) * 300, seq)
+    assert buffer.spilled == (memory_limit < buffer.size)
+    assert read_back(buffer) == b''.join(bytes([seq]) * 300 for seq in range(7))
+    assert len(buffer) == 7
+    buffer.close()
+    assert buffer.size == 0 and read_back(buffer) == b''
+
+def test_unnumbered_chunks_keep_arrival_order():
+    buffer = RecordingBuffer(memory_limit=10)
+    for chunk in [b'webm', b'-header', b'-cluster']:
+        buffer.append(chunk)
+    assert [bytes(chunk) for chunk in buffer.chunks()] == [b'webm', b'-header', b'-cluster']
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason='needs /proc to read RSS')
+def test_hour_long_stream_keeps_memory_flat(tmp_path):
+    # An hour of 128 kbit/s chunks every 100 ms, about 58 MB, against a 4 MB ceiling
+    chunk_size, count = 1600, 36000
+    pool = os.urandom(MB)
+    buffer = RecordingBuffer(memory_limit=4 * MB, directory=str(tmp_path))
+    digest = hashlib.sha256()
+    baseline = peak = rss()
+    for seq in range(count):
+        start = (seq * chunk_size) % (len(pool) - chunk_size)
+        chunk = pool[start:start + chunk_size]
+        digest.update(chunk)
+        buffer.append(chunk, seq)
+        if seq % 500 == 0:
+            peak = max(peak, rss())
+    assert buffer.spilled
+    assert buffer.size == chunk_size * count
+    assert peak - baseline < 16 * MB
+
+    class Sink:
+        def write(self, data):
+            digest_back.update(data)
+
+    digest_back = hashlib.sha256()
+    buffer.write_to(Sink())
+    assert digest_back.hexdigest() == digest.hexdigest()
+    buffer.close()
@@ -0,0 +1,76 @@
+import pytest
+import dream_recorder
+
+TIMESTAMPED = 'dream_20250101_120000.png'
+PLAIN = 'dream_1.png'
+CONTENT = b'\x89PNG fake thumbnail bytes'
+
+@pytest.fixture
+def serve_with(tmp_path, monkeypatch):
+    """Serve thumbnails from tmp_path with the given MEDIA_SERVER."""
+    for filename in (TIMESTAMPED, PLAIN):
+        (tmp_path / filename).write_bytes(CONTENT)
+
+    def configure(media_server):
+        config = dict(dream_recorder.get_config(), THUMBS_DIR=str(tmp_path), MEDIA_SERVER=media_server)
+        monkeypatch.setattr(dream_recorder, 'get_config', lambda: config)
+    return configure
+
+@pytest.fixture(params=['flask', 'nginx'])
+def media_server(request, serve_with):
+    serve_with(request.param)
+    return request.param
+
+@pytest.fixture
+def flask_server(serve_with):
+    serve_with('flask')
+
+@pytest.fixture
+def nginx_server(serve_with):
+    serve_with('nginx')
+
+def test_timestamped_file_is_cached_as_immutable(test_client, media_server):
+    response = test_client.get(f'/media/thumbs/{TIMESTAMPED}')
+    assert response.status_code == 200
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == dream_recorder.IMMUTABLE_MEDIA_MAX_AGE
+
+def test_other_files_are_revalidated(test_client, media_server):
+    response = test_client.get(f'/media/thumbs/{PLAIN}')
+    assert response.status_code == 200
+    assert response.cache_control.no_cache and not response.cache_control.immutable
+    assert response.cache_control.max_age == 0
+
+def test_etag_gives_304(test_client, flask_server):
+    response = test_client.get(f'/media/thumbs/{TIMESTAMPED}')
+    assert response.data == CONTENT
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    etag = response.headers['ETag']
+    revalidated = test_client.get(f'/media/thumbs/{TIMESTAMPED}', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+def test_range_gives_206(test_client, flask_server):
+    response = test_client.get(f'/media/thumbs/{TIMESTAMPED}', headers={'Range': 'bytes=4-7'})
+    assert response.status_code == 206
+    assert response.data == CONTENT[4:8]
+    assert response.headers['Content-Range'] == f'bytes 4-7/{len(CONTENT)}'
+
+def test_nginx_mode_hands_the_file_to_nginx(test_client, nginx_server):
+    response = test_client.get(f'/media/thumbs/{TIMESTAMPED}')
+    assert response.headers['X-Accel-Redirect'] == dream_recorder.X_ACCEL_THUMBS_PREFIX + TIMESTAMPED
+    assert response.content_type == 'image/png'
+    assert response.data == b''
+    assert response.cache_control.public
+
+@pytest.mark.parametrize('path', [
+    '/media/thumbs/missing.png',
+    '/media/thumbs/..%2Fsecret.png',
+    '/media/thumbs/..%2F..%2F..%2Fetc%2Fpasswd',
+    '/media/..%2Fdream_recorder.py',
+])
+def test_missing_files_and_path_traversal_are_404(test_client, media_server, tmp_path, path):
+    (tmp_path.parent / 'secret.png').write_bytes(b'secret')
+    response = test_client.get(path)
+    assert response.status_code == 404
+    assert 'X-Accel-Redirect' not in response.headers
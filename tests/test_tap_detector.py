@@ -0,0 +1,61 @@
+import os
+import pytest
+from functions.tap_detector import TapStateMachine
+from scripts.replay_gpio_trace import parse_trace, replay
+
+TRACE = os.path.join(os.path.dirname(__file__), '..', 'gpio_test_log.txt')
+
+def taps(replayed):
+    return [tap for _, tap in replayed]
+
+def test_replays_recorded_trace():
+    edges, logged = parse_trace(TRACE)
+    assert len(logged) == 11
+    replayed = replay(edges, TapStateMachine())
+    assert taps(replayed) == taps(logged)
+    for (ours, _), (theirs, _) in zip(replayed, logged):
+        assert ours == pytest.approx(theirs, abs=0.1)
+
+def test_single_tap_is_decided_when_the_double_tap_window_ends():
+    machine = TapStateMachine(double_tap_window=0.8)
+    assert machine.edge(1, 0.0) == []
+    assert machine.edge(0, 0.15) == []
+    assert machine.next_deadline() == pytest.approx(0.801)
+    assert machine.tick(0.5) == []
+    assert machine.tick(machine.next_deadline()) == ['single_tap']
+    assert machine.next_deadline() is None
+
+def test_double_tap_inside_the_window():
+    machine = TapStateMachine(double_tap_window=0.8)
+    assert machine.edge(1, 0.0) == []
+    assert machine.edge(0, 0.1) == []
+    assert machine.edge(1, 0.4) == ['double_tap']
+    assert machine.edge(0, 0.5) == []
+    assert machine.next_deadline() is None
+    assert machine.tick(5.0) == []
+
+def test_presses_further_apart_than_the_window_are_two_single_taps():
+    edges = [(0.0, 1), (0.1, 0), (1.0, 1), (1.1, 0)]
+    assert taps(replay(edges, TapStateMachine(double_tap_window=0.8))) == ['single_tap', 'single_tap']
+
+def test_long_tap_at_long_tap_duration():
+    machine = TapStateMachine(long_tap_duration=3.0)
+    assert machine.edge(1, 0.0) == []
+    assert machine.next_deadline() == pytest.approx(3.001)
+    assert machine.tick(2.9) == []
+    assert machine.tick(3.0) == ['long_tap']
+    # Releasing a long tap doesn't also count as a single tap
+    assert machine.edge(0, 4.0) == []
+    assert machine.next_deadline() is None
+    assert machine.tick(10.0) == []
+
+def test_contact_bounce_inside_the_debounce_window_is_ignored():
+    machine = TapStateMachine(debounce=0.05)
+    assert machine.edge(1, 0.0) == []
+    assert machine.edge(0, 0.01) == []
+    # The bounce is pending until the debounce window ends
+    assert machine.next_deadline() == pytest.approx(0.051)
+    assert machine.edge(1, 0.02) == []
+    assert machine.edge(0, 0.15) == []
+    edges = [(0.0, 1), (0.01, 0), (0.02, 1), (0.03, 0), (0.04, 1), (0.15, 0)]
+    assert taps(replay(edges, TapStateMachine(debounce=0.05))) == ['single_tap']
@@ -0,0 +1,85 @@
+import os
+import shutil
+import wave
+import numpy as np
+import pytest
+from functions import audio
+from functions.vad import analyse_wav, read_ranges
+
+RATE = 16000
+
+def silence(seconds, rng, level=0.0005):
+    return rng.normal(0, level, int(seconds * RATE))
+
+def speech(seconds, rng):
+    """Voiced syllables at ~4 per second with a 140 Hz pitch, plus a fricative after every third one."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    voice = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 6))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    signal = 0.2 * voice * syllables
+    fricatives = (np.sin(2 * np.pi * 4 / 3 * t) > 0.9) * rng.normal(0, 0.03, len(t))
+    return signal + fricatives
+
+def write_wav(path, *parts):
+    samples = np.concatenate(parts)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes())
+    return str(path)
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+def test_trims_leading_trailing_silence_and_long_pauses(tmp_path, rng):
+    # 2s silence, 3s speech, a 4s pause, 2s speech, 3s silence
+    path = write_wav(tmp_path / 'dream.wav', silence(2, rng), speech(3, rng), silence(4, rng), speech(2, rng),
+                     silence(3, rng))
+    analysis = analyse_wav(path, padding=0.3, max_gap=1.5)
+    assert analysis['duration'] == pytest.approx(14)
+    assert 3.5 < analysis['speech_seconds'] < 5.5
+    # 5s of speech, 0.3s padding at each end and the pause shortened to 1.5s
+    assert analysis['kept_seconds'] == pytest.approx(5 + 0.6 + 1.5, abs=0.5)
+    trim_ratio = analysis['kept_seconds'] / analysis['duration']
+    assert trim_ratio < 0.6
+    assert len(read_ranges(path, analysis['ranges'])) == sum(end - start for start, end in analysis['ranges']) * 2
+
+def test_keeps_short_pauses(tmp_path, rng):
+    path = write_wav(tmp_path / 'dream.wav', speech(2, rng), silence(1, rng), speech(2, rng))
+    analysis = analyse_wav(path, padding=0.3, max_gap=1.5)
+    assert analysis['kept_seconds'] == pytest.approx(5, abs=0.2)
+
+@pytest.mark.parametrize('level', [0.0005, 0.03])
+def test_no_speech_in_silence_or_steady_noise(tmp_path, rng, level):
+    path = write_wav(tmp_path / 'empty.wav', silence(6, rng, level=level))
+    assert analyse_wav(path)['speech_seconds'] < 0.5
+
+def test_empty_recording_is_rejected_before_upload(tmp_path, rng, monkeypatch):
+    write_wav(tmp_path / 'empty.wav', silence(6, rng))
+    monkeypatch.setattr(audio, 'get_config', lambda: {'RECORDINGS_DIR': str(tmp_path)})
+    with pytest.raises(ValueError, match='No speech'):
+        audio.trimmed_upload({'audio_filename': 'empty.wav'})
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+def test_trimmed_upload_is_smaller(tmp_path, rng, monkeypatch):
+    path = write_wav(tmp_path / 'dream.wav', silence(5, rng), speech(4, rng), silence(6, rng))
+    monkeypatch.setattr(audio, 'get_config', lambda: {'RECORDINGS_DIR': str(tmp_path)})
+    filename, data = audio.trimmed_upload({'audio_filename': 'dream.wav'})
+    assert filename == 'recording.ogg'
+    assert data.startswith(b'OggS')
+    assert len(data) < os.path.getsize(path) / 10
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+def test_trims_compressed_archive(tmp_path, rng, monkeypatch):
+    wav_path = write_wav(tmp_path / 'dream.wav', silence(5, rng), speech(4, rng), silence(6, rng))
+    monkeypatch.setattr(audio, 'get_config', lambda: {'RECORDINGS_DIR': str(tmp_path)})
+    fmt = audio.archive_format('opus')
+    archived = f"dream.{audio.ARCHIVE_FORMATS[fmt]['extension']}"
+    stream = audio.archive_output(audio.ffmpeg.input(wav_path), str(tmp_path / archived), fmt, {'dream_id': 5})
+    audio.ffmpeg.run(stream, quiet=True)
+    assert os.path.getsize(tmp_path / archived) < os.path.getsize(wav_path) / 2
+    # Jobs queued before the rename still carry `wav_filename`
+    filename, data = audio.trimmed_upload({'wav_filename': archived})
+    assert data.startswith(b'OggS')
@@ -0,0 +1,117 @@
+import os
+import time
+import gevent
+import pytest
+from types import SimpleNamespace
+from functions import veo_tracker, video
+from functions.veo_tracker import VeoOperationTracker
+
+class StubClient:
+    """Stands in for google-genai's Client: operations finish after `polls_to_finish` polls."""
+
+    def __init__(self, polls_to_finish=2, error=None):
+        self.polls_to_finish = polls_to_finish
+        self.error = error
+        self.submitted = []
+        self.polls = {}  # operation name -> times polled
+        self.models = SimpleNamespace(generate_videos=self._generate_videos)
+        self.operations = SimpleNamespace(get=self._get)
+        self.files = SimpleNamespace(download=lambda file: None)
+
+    def _generate_videos(self, model, prompt):
+        self.submitted.append(prompt)
+        return SimpleNamespace(name=f'operations/{len(self.submitted)}', done=False)
+
+    def _get(self, operation):
+        times = self.polls.setdefault(operation.name, [])
+        times.append(time.time())
+        if self.polls_to_finish is None or len(times) < self.polls_to_finish:
+            return SimpleNamespace(name=operation.name, done=False)
+        sample = SimpleNamespace(video=SimpleNamespace(save=lambda path: open(path, 'wb').write(b'mp4')))
+        return SimpleNamespace(
+            name=operation.name, done=True, error=self.error,
+            response=SimpleNamespace(generated_videos=[sample])
+        )
+
+@pytest.fixture
+def config(monkeypatch, tmp_path):
+    config = {
+        'VEO3_MODEL': 'veo-test', 'VEO3_POLL_INITIAL_INTERVAL': 0.02, 'VEO3_POLL_INTERVAL': 0.08,
+        'VEO3_MAX_POLL_ATTEMPTS': 100, 'VIDEOS_DIR': str(tmp_path / 'videos'),
+    }
+    monkeypatch.setattr(veo_tracker, 'get_config', lambda: config)
+    monkeypatch.setattr(video, 'get_config', lambda: config)
+    return config
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'veo.db')
+
+def make_tracker(db_path, client, progress=None):
+    def on_progress(operation):
+        if progress is not None:
+            progress.append((operation['key'], operation['status']))
+
+    tracker = VeoOperationTracker(db_path, client=client, on_progress=on_progress)
+    tracker.start()
+    return tracker
+
+def test_poll_delay_backs_off_to_the_poll_interval(db_path, config):
+    tracker = VeoOperationTracker(db_path, client=StubClient())
+    assert [tracker.poll_delay(polls) for polls in range(5)] == pytest.approx([0.02, 0.03, 0.045, 0.0675, 0.08])
+
+def test_submit_resolves_with_the_downloaded_filename(db_path, config):
+    client = StubClient(polls_to_finish=4)
+    progress = []
+    tracker = make_tracker(db_path, client, progress)
+    try:
+        filename = tracker.submit('dream-1', 'a flying whale').get(timeout=2)
+    finally:
+        tracker.stop()
+    assert os.path.exists(os.path.join(config['VIDEOS_DIR'], filename))
+    assert tracker.get_operation('dream-1')['status'] == 'completed'
+    assert progress == [('dream-1', 'pending')] * 3 + [('dream-1', 'completed')]
+    first, *rest = client.polls['operations/1']
+    gaps = [later - earlier for earlier, later in zip([first] + rest, rest)]
+    # Each poll waits longer than the one before
+    assert gaps == sorted(gaps) and gaps[0] >= 0.025
+
+def test_restart_resumes_in_flight_operations_without_resubmitting(db_path, config):
+    client = StubClient(polls_to_finish=None)
+    tracker = make_tracker(db_path, client)
+    result = tracker.submit('dream-1', 'a flying whale', meta={'sid': 'abc'})
+    gevent.sleep(0.1)
+    tracker.stop()
+    assert not result.ready()
+    assert tracker.get_operation('dream-1')['status'] == 'pending'
+
+    client.polls_to_finish = 1
+    restarted = make_tracker(db_path, client)
+    try:
+        # Resubmitting the same key reattaches to the resumed operation
+        filename = restarted.submit('dream-1', 'a flying whale').get(timeout=2)
+        assert restarted.submit('dream-1', 'a flying whale').get(timeout=0) == filename
+    finally:
+        restarted.stop()
+    assert client.submitted == ['a flying whale']
+    assert restarted.get_operation('dream-1')['meta'] == {'sid': 'abc'}
+
+def test_failed_generation_raises_from_the_result(db_path, config):
+    tracker = make_tracker(db_path, StubClient(polls_to_finish=1, error='safety filter'))
+    try:
+        with pytest.raises(Exception, match='safety filter'):
+            tracker.submit('dream-1', 'a flying whale').get(timeout=2)
+    finally:
+        tracker.stop()
+    assert tracker.get_operation('dream-1')['status'] == 'failed'
+
+def test_operation_times_out_after_max_poll_attempts(db_path, config):
+    config['VEO3_MAX_POLL_ATTEMPTS'] = 2
+    tracker = make_tracker(db_path, StubClient(polls_to_finish=None))
+    try:
+        with pytest.raises(Exception, match='timed out'):
+            tracker.submit('dream-1', 'a flying whale').get(timeout=2)
+    finally:
+        tracker.stop()
+    operation = tracker.get_operation('dream-1')
+    assert operation['status'] == 'failed' and operation['polls'] > 1